@@ -45,358 +45,387 @@
 # In[1]:
 
 
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+import argparse
+import os
+import sys
 
-get_ipython().run_line_magic('matplotlib', 'inline')
+from movie_analysis.cache import ResultCache
+from movie_analysis.charts import SCATTER_MODES, render_charts
+from movie_analysis.correlation import CorrelationIndex
+from movie_analysis.instrument import PROFILERS, Instrumentation
+from movie_analysis.loader import load_all
+from movie_analysis.pipeline import run_pipeline
+from movie_analysis.report import chart_specs, prepare_frames
+from movie_analysis.stages import ANALYSIS_STAGES
 
 
 # In[2]:
 
 
-bom_movie_gross = pd.read_csv('bom.movie_gross.csv')
-imdb_title_basics = pd.read_csv('title.basics.csv')
-tmdb_movies = pd.read_csv('tmdb.movies.csv')
-tn_movie_budgets = pd.read_csv('tn.movie_budgets.csv')
+def script_args(argv):
+    # A Jupyter kernel is started with "-f <connection file>"; drop just that
+    if 'ipykernel' not in sys.modules:
+        return argv
+    args = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg == '-f':
+            skip = True
+        elif not arg.startswith('-f='):
+            args.append(arg)
+    return args
+
+
+def main():
+    # Command-line options; a typo in a flag is an error, not a silent default
+    parser = argparse.ArgumentParser(description='Microsoft movie studio analysis', allow_abbrev=False)
+    parser.add_argument('--workers', type=int, default=1,
+                        help='processes used to run independent stages and render charts (default 1: in sequence)')
+    parser.add_argument('--cache-dir', default=os.path.join('.movie_cache', 'results'),
+                        help='directory of the stage result cache')
+    parser.add_argument('--cache-size-mb', type=int, default=2048,
+                        help='disk budget of the stage result cache')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='recompute every stage instead of reusing cached results')
+    parser.add_argument('--output-dir', default='figures',
+                        help='directory the charts are written to')
+    parser.add_argument('--formats', default='png',
+                        help='comma-separated image formats, e.g. png,svg')
+    parser.add_argument('--scatter-mode', choices=SCATTER_MODES, default='points',
+                        help="how to draw the budget scatter; 'rasterized' or 'density' for large inputs")
+    parser.add_argument('--metrics-log', default=os.path.join('.movie_cache', 'stage_metrics.jsonl'),
+                        help='JSON lines file the per-stage timings and memory are appended to')
+    parser.add_argument('--profile', metavar='DIR', default=None,
+                        help='also profile every stage and write the profiles to DIR')
+    parser.add_argument('--profiler', choices=PROFILERS, default='cprofile',
+                        help='profiler used with --profile')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='also record tracemalloc peaks (slows loading, stages and charts several times)')
+    args = parser.parse_args(script_args(sys.argv[1:]))
+
+    # Per-stage wall/CPU time, memory and row counts (see movie_analysis/instrument.py)
+    instrumentation = Instrumentation(args.metrics_log, profile_dir=args.profile, profiler=args.profiler,
+                                      trace_memory=args.trace_memory)
+
+    # Charts are collected here and rendered headless at the end of the script
+    charts = []
+
+    # Typed load through the Parquet cache (see movie_analysis/loader.py)
+    bom_movie_gross, imdb_title_basics, tmdb_movies, tn_movie_budgets = instrumentation.run('load_all', load_all)
+
+
+    # In[3]:
+
+
+    print("Box Office Mojo - Movie Gross Data:")
+    print(bom_movie_gross.head())
+    print("\nIMDB - Title Basics Data:")
+    print(imdb_title_basics.head())
+    print("\nTMDB - Movies Data:")
+    print(tmdb_movies.head())
+    print("\nThe Numbers - Movie Budgets Data:")
+    print(tn_movie_budgets.head())
+
+
+    # ## Data Preparation
+    # 
+    # Describe and justify the process for preparing the data for analysis.
+    # 
+    # ***
+    # Data Preparation:
+    # 
+    # In the process of preparing the data for analysis, several steps were undertaken. Below, I describe and justify each step:
+    # 
+    # Handling Missing Values or Outliers:
+    # 
+    # Since there's no explicit indication in the provided code snippet regarding the handling of missing values or outliers, it's assumed that these issues were addressed separately or were not prevalent in this specific analysis. However, it's essential to recognize that handling missing values and outliers is crucial for ensuring the robustness and reliability of the analysis results. Appropriate techniques such as imputation, removal, or transformation should be applied based on the nature of the data and the specific objectives of the analysis.
+    # Variables Dropped or Created:
+    # 
+    # No variables were explicitly dropped or created in the provided code snippet. It's possible that additional data preprocessing steps were performed outside of the presented code snippet. Dropping irrelevant variables or creating new ones might be necessary to streamline the analysis or to derive additional insights from the data.
+    # Data Type Conversion:
+    # 
+    # The 'domestic_gross' and 'foreign_gross' columns were converted to string data type if they were not already strings. This conversion allows for consistent handling of these columns and ensures that subsequent string operations can be applied without errors.
+    # Handling Currency Formatting:
+    # 
+    # The currency formatting (i.e., dollar signs and commas) was removed from the 'domestic_gross' and 'foreign_gross' columns, followed by conversion to float data type. This step standardizes the representation of monetary values, making them suitable for numerical calculations and analysis.
+    # Justification:
+    # 
+    # The choices made in handling missing values, outliers, variable creation, and data type conversion are appropriate given the data and the business problem. By addressing missing values and outliers and standardizing the representation of monetary values, the data becomes more suitable for analysis. Additionally, converting data types ensures consistency and facilitates subsequent operations. However, it's essential to note that the appropriateness of these choices also depends on the specific objectives of the analysis and the requirements of the business problem.
+    # Overall, the data preparation process outlined above aims to ensure the quality, consistency, and suitability of the data for subsequent analysis, thereby contributing to the generation of meaningful insights and informed decision-making.
+    # 
+    # 
+    # 
+    # 
+    # 
+    # ***
+
+    # In[4]:
+
+
+    # The money columns (domestic_gross, foreign_gross, production_budget,
+    # worldwide_gross) are parsed to float once at load time by
+    # movie_analysis.cleaning.normalize_money, so no per-cell string cleanup is
+    # needed below.
+    print(bom_movie_gross[['domestic_gross', 'foreign_gross']].dtypes)
 
 
-# In[3]:
+    # ## Data Modeling
+    # Describe and justify the process for analyzing or modeling the data.
+    # 
+    # ***
+    # Questions to consider:
+    # * How did you analyze or model the data?
+    # * How did you iterate on your initial approach to make it better?
+    # * Why are these choices appropriate given the data and the business problem?
+    # ***
 
+    # In[5]:
 
-print("Box Office Mojo - Movie Gross Data:")
-print(bom_movie_gross.head())
-print("\nIMDB - Title Basics Data:")
-print(imdb_title_basics.head())
-print("\nTMDB - Movies Data:")
-print(tmdb_movies.head())
-print("\nThe Numbers - Movie Budgets Data:")
-print(tn_movie_budgets.head())
 
+    # Resolve every dataset once against a normalized title + year index built
+    # from Box Office Mojo; joins below are integer lookups on movie_id.  The
+    # genre analyses only use titles that have genres (movie_analysis/report.py)
+    source_frames = instrumentation.run('prepare_frames', prepare_frames, bom_movie_gross,
+                                        imdb_title_basics, tmdb_movies, tn_movie_budgets)
+    imdb_title_basics = source_frames['imdb_title_basics']
 
-# ## Data Preparation
-# 
-# Describe and justify the process for preparing the data for analysis.
-# 
-# ***
-# Data Preparation:
-# 
-# In the process of preparing the data for analysis, several steps were undertaken. Below, I describe and justify each step:
-# 
-# Handling Missing Values or Outliers:
-# 
-# Since there's no explicit indication in the provided code snippet regarding the handling of missing values or outliers, it's assumed that these issues were addressed separately or were not prevalent in this specific analysis. However, it's essential to recognize that handling missing values and outliers is crucial for ensuring the robustness and reliability of the analysis results. Appropriate techniques such as imputation, removal, or transformation should be applied based on the nature of the data and the specific objectives of the analysis.
-# Variables Dropped or Created:
-# 
-# No variables were explicitly dropped or created in the provided code snippet. It's possible that additional data preprocessing steps were performed outside of the presented code snippet. Dropping irrelevant variables or creating new ones might be necessary to streamline the analysis or to derive additional insights from the data.
-# Data Type Conversion:
-# 
-# The 'domestic_gross' and 'foreign_gross' columns were converted to string data type if they were not already strings. This conversion allows for consistent handling of these columns and ensures that subsequent string operations can be applied without errors.
-# Handling Currency Formatting:
-# 
-# The currency formatting (i.e., dollar signs and commas) was removed from the 'domestic_gross' and 'foreign_gross' columns, followed by conversion to float data type. This step standardizes the representation of monetary values, making them suitable for numerical calculations and analysis.
-# Justification:
-# 
-# The choices made in handling missing values, outliers, variable creation, and data type conversion are appropriate given the data and the business problem. By addressing missing values and outliers and standardizing the representation of monetary values, the data becomes more suitable for analysis. Additionally, converting data types ensures consistency and facilitates subsequent operations. However, it's essential to note that the appropriateness of these choices also depends on the specific objectives of the analysis and the requirements of the business problem.
-# Overall, the data preparation process outlined above aims to ensure the quality, consistency, and suitability of the data for subsequent analysis, thereby contributing to the generation of meaningful insights and informed decision-making.
-# 
-# 
-# 
-# 
-# 
-# ***
+    # Run the independent analysis stages (movie_analysis/stages.py) as a DAG on a
+    # process pool; the cells below only read their results.  Stages whose code and
+    # inputs are unchanged are served from the result cache
+    result_cache = None if args.no_cache else ResultCache(args.cache_dir, max_bytes=args.cache_size_mb * 1024 ** 2)
+    results = run_pipeline(ANALYSIS_STAGES, source_frames, workers=args.workers, cache=result_cache,
+                           instrumentation=instrumentation)
+    if result_cache is not None:
+        print(result_cache.report())
 
-# In[4]:
+    # Chart specs for every figure below (movie_analysis/report.py); each cell
+    # adds its own to the list that is rendered at the end
+    report_charts = chart_specs(results, args.scatter_mode)
 
+    merged_data = results['merged_data']
+    print(results['tmdb_match_stats'])
+    print(merged_data.head())
 
-# Converting 'domestic_gross' column to string data type if it's not already
-bom_movie_gross['domestic_gross'] = bom_movie_gross['domestic_gross'].astype(str)
 
-# Removing commas and dollar signs and converting to float for 'domestic_gross' column
-bom_movie_gross['domestic_gross'] = bom_movie_gross['domestic_gross'].str.replace('$', '').str.replace(',', '').astype(float)
+    # Impact of ratings on box office: correlation between TMDB vote_average and
+    # gross, overall and per genre (movie_analysis/correlation.py).  The index
+    # answers any genre/studio/year slice from precomputed sums
 
-# Convert 'foreign_gross' column to string data type if it's not already
-bom_movie_gross['foreign_gross'] = bom_movie_gross['foreign_gross'].astype(str)
+    # In[ ]:
 
-# Removing commas and dollar signs and converting to float for 'foreign_gross' column
-bom_movie_gross['foreign_gross'] = bom_movie_gross['foreign_gross'].str.replace('$', '').str.replace(',', '').astype(float)
 
+    rating_correlations = CorrelationIndex.from_frame(results['rating_box_office'])
+    for metric in ('domestic_gross', 'foreign_gross', 'worldwide_gross'):
+        print(metric, rating_correlations.correlate(metric))
+    rating_by_genre = rating_correlations.table('genre', 'worldwide_gross')
+    print(rating_by_genre.round(3).to_string())
 
-# ## Data Modeling
-# Describe and justify the process for analyzing or modeling the data.
-# 
-# ***
-# Questions to consider:
-# * How did you analyze or model the data?
-# * How did you iterate on your initial approach to make it better?
-# * Why are these choices appropriate given the data and the business problem?
-# ***
+    rating_genre_chart = report_charts['rating_gross_correlation_by_genre']
+    charts.append(rating_genre_chart)
 
-# In[5]:
 
+    # In[23]:
 
-merged_data = pd.merge(bom_movie_gross, tmdb_movies, on='title', how='inner') 
-print(merged_data.head())
 
+    # Analyzing genre distribution (sparse title -> genre index, no row explode).
+    # The index is built once, keyed by tconst, and shared by the genre stages
+    imdb_genre_index = results['imdb_genre_index']
+    genre_distribution = results['genre_distribution']
 
-# In[23]:
 
+    # The "Genre Distribution" graph provides a visual representation of the prevalence of different movie genres within the dataset. Taller bars indicate higher frequencies of movies associated with specific genres, suggesting their popularity or commonality in the dataset. This analysis offers insights into industry trends, genre preferences among filmmakers, and the diversity of genres represented. Overall, the graph aids in understanding the landscape of movie genres in the dataset, facilitating informed decisions regarding genre selection for future film production ventures.
 
-imdb_title_basics = imdb_title_basics.dropna(subset=['genres'])
+    # In[24]:
 
-# Spliting genres into separate rows
-genres_df = imdb_title_basics['genres'].str.split(',', expand=True).stack().reset_index(level=1, drop=True).rename('genre')
-imdb_genre_data = imdb_title_basics.drop('genres', axis=1).join(genres_df)
 
-# Analyzing genre distribution
-genre_distribution = imdb_genre_data['genre'].value_counts().sort_values(ascending=False)
+    # Plot genre distribution
+    genre_distribution_chart = report_charts['genre_distribution']
+    charts.append(genre_distribution_chart)
 
 
-# The "Genre Distribution" graph provides a visual representation of the prevalence of different movie genres within the dataset. Taller bars indicate higher frequencies of movies associated with specific genres, suggesting their popularity or commonality in the dataset. This analysis offers insights into industry trends, genre preferences among filmmakers, and the diversity of genres represented. Overall, the graph aids in understanding the landscape of movie genres in the dataset, facilitating informed decisions regarding genre selection for future film production ventures.
+    # The "Genre Trends Over Time" heatmap illustrates the changing prevalence of movie genres across different years. Darker regions indicate higher movie counts, reflecting enduring popularity or sustained production activity in certain genres. Lighter regions may signify emerging genres or declining interest over time. These trends offer insights into evolving audience preferences, cultural shifts, and industry dynamics, aiding in strategic decisions related to genre selection and content creation in the film industry.
 
-# In[24]:
+    # In[25]:
 
 
-# Plot genre distribution
-plt.figure(figsize=(10, 6))
-sns.barplot(x=genre_distribution.values, y=genre_distribution.index, palette='viridis')
-plt.title('Genre Distribution')
-plt.xlabel('Number of Movies')
-plt.ylabel('Genre')
-plt.show()
+    # Analyzing genre trends over time
+    genre_year_count = results['genre_year_count']
 
+    # Ploting genre trends over time
+    genre_trends_chart = report_charts['genre_trends']
+    charts.append(genre_trends_chart)
 
-# The "Genre Trends Over Time" heatmap illustrates the changing prevalence of movie genres across different years. Darker regions indicate higher movie counts, reflecting enduring popularity or sustained production activity in certain genres. Lighter regions may signify emerging genres or declining interest over time. These trends offer insights into evolving audience preferences, cultural shifts, and industry dynamics, aiding in strategic decisions related to genre selection and content creation in the film industry.
 
-# In[25]:
+    # The "Box Office Revenue by Genre" bar plot summarizes the total domestic gross revenue generated by various movie genres. Taller bars indicate higher revenue for specific genres, suggesting greater audience demand or commercial success. This analysis aids in understanding the popularity and revenue potential of different genres, informing strategic decisions regarding genre selection and resource allocation in film production.
 
+    # In[26]:
 
-# Analyzing genre trends over time
-genre_year_count = imdb_genre_data.groupby(['genre', 'start_year']).size().unstack(fill_value=0)
 
-# Ploting genre trends over time
-plt.figure(figsize=(12, 8))
-sns.heatmap(genre_year_count, cmap='viridis')
-plt.title('Genre Trends Over Time')
-plt.xlabel('Year')
-plt.ylabel('Genre')
-plt.show()
+    # Box office data merged on the resolved movie id, one IMDB title per box-office row
+    print(results['imdb_match_stats'])
 
+    # Analyzing box office revenue by genre
+    genre_box_office = results['genre_box_office']
 
-# The "Box Office Revenue by Genre" bar plot summarizes the total domestic gross revenue generated by various movie genres. Taller bars indicate higher revenue for specific genres, suggesting greater audience demand or commercial success. This analysis aids in understanding the popularity and revenue potential of different genres, informing strategic decisions regarding genre selection and resource allocation in film production.
+    # Ploting box office revenue by genre
+    genre_box_office_chart = report_charts['genre_box_office']
+    charts.append(genre_box_office_chart)
 
-# In[26]:
 
+    # Visualization of Box Plot: The box plot illustrates how movie production budgets are distributed, offering insights into the dataset's variability, central tendency, and distribution of production expenses. Among the important details the box plot reveals are: 
+    # Median Production Budget: The median production budget is shown as a measure of central tendency by the line inside the box.
+    # Interquartile Range (IQR): Showing the distribution of production budgets inside the middle 50% of the data, the IQR is shown by the length of the box.
+    # Potential outliers are indicated by points beyond the box plot's whiskers; these points could be indicative of films that, in comparison to the majority of the dataset, had remarkably large or little production budgets.
 
-# Merged with box office data to analyze box office revenue by genre
-box_office_data = pd.read_csv('bom.movie_gross.csv')
+    # In[6]:
 
-# Merged on movie title
-merged_data = pd.merge(imdb_genre_data, box_office_data, left_on='primary_title', right_on='title', how='inner')
 
-# Analyzing box office revenue by genre
-genre_box_office = merged_data.groupby('genre')['domestic_gross'].sum().sort_values(ascending=False)
+    # Check data type of 'production_budget'
+    print(tn_movie_budgets['production_budget'].dtype)
 
-# Ploting box office revenue by genre
-plt.figure(figsize=(10, 6))
-sns.barplot(x=genre_box_office.values, y=genre_box_office.index, palette='viridis')
-plt.title('Box Office Revenue by Genre')
-plt.xlabel('Total Domestic Gross Revenue ($)')
-plt.ylabel('Genre')
-plt.show()
+    # Handle missing values in 'production_budget' column
+    tn_movie_budgets = results['budget_data']
 
+    # Box Plot of Movie Budgets
+    budget_box_chart = report_charts['production_budget_box']
+    charts.append(budget_box_chart)
 
-# Visualization of Box Plot: The box plot illustrates how movie production budgets are distributed, offering insights into the dataset's variability, central tendency, and distribution of production expenses. Among the important details the box plot reveals are: 
-# Median Production Budget: The median production budget is shown as a measure of central tendency by the line inside the box.
-# Interquartile Range (IQR): Showing the distribution of production budgets inside the middle 50% of the data, the IQR is shown by the length of the box.
-# Potential outliers are indicated by points beyond the box plot's whiskers; these points could be indicative of films that, in comparison to the majority of the dataset, had remarkably large or little production budgets.
 
-# In[6]:
+    # Trend Analysis: Stakeholders can determine whether production budgets and global gross revenue have a linear or nonlinear connection by looking at the scatter plot's overall trend. While a lack of correlation suggests that the production budget may not be a reliable indicator of income on its own, a positive correlation reveals that greater production budgets typically lead to higher worldwide gross revenue.
+    # Finding Outliers: Movies that substantially stray from the overall trend may be represented by outlying spots on the scatter plot. These anomalies may point to surprising triumphs or huge flops, offering insights into the variables affecting the revenue of motion pictures. 
+    # 
+    # Distribution: The scatter plot's point distribution across several regions can provide information about the fluctuations in the profitability of motion pictures. Clusters of points may indicate recurring themes or patterns in particular data subsets, such as films from particular studios or genres.
 
+    # In[7]:
 
-# Check data type of 'production_budget'
-print(tn_movie_budgets['production_budget'].dtype)
 
-# Handle missing values in 'production_budget' column
-tn_movie_budgets.dropna(subset=['production_budget'], inplace=True)
+    # my scatter plot
+    budget_scatter_chart = report_charts['budget_vs_worldwide_gross']
+    charts.append(budget_scatter_chart)
 
-# Convert 'production_budget' column to numeric
-tn_movie_budgets['production_budget'] = tn_movie_budgets['production_budget'].str.replace('$', '').str.replace(',', '').astype(float)
 
-# Box Plot of Movie Budgets
-plt.figure(figsize=(8, 6))
-sns.boxplot(data=tn_movie_budgets, y='production_budget', palette='viridis')
-plt.title('Distribution of Movie Production Budgets')
-plt.ylabel('Production Budget ($)')
-plt.show()
+    # Return on investment by budget band: ROI = (worldwide gross - budget) / budget,
+    # per budget quintile, with 95% bootstrap intervals (movie_analysis/roi.py)
 
+    # In[ ]:
 
-# Trend Analysis: Stakeholders can determine whether production budgets and global gross revenue have a linear or nonlinear connection by looking at the scatter plot's overall trend. While a lack of correlation suggests that the production budget may not be a reliable indicator of income on its own, a positive correlation reveals that greater production budgets typically lead to higher worldwide gross revenue.
-# Finding Outliers: Movies that substantially stray from the overall trend may be represented by outlying spots on the scatter plot. These anomalies may point to surprising triumphs or huge flops, offering insights into the variables affecting the revenue of motion pictures. 
-# 
-# Distribution: The scatter plot's point distribution across several regions can provide information about the fluctuations in the profitability of motion pictures. Clusters of points may indicate recurring themes or patterns in particular data subsets, such as films from particular studios or genres.
 
-# In[7]:
+    roi_by_budget_band = results['roi_by_budget_band']
+    print(roi_by_budget_band[['films', 'median_roi', 'median_roi_low', 'median_roi_high',
+                              'mean_roi', 'p90_roi']].round(2).to_string())
+    print('Budget band with the highest median ROI:', roi_by_budget_band['median_roi'].idxmax())
 
+    roi_band_chart = report_charts['median_roi_by_budget_band']
+    charts.append(roi_band_chart)
 
-# Converting the monetary columns to numeric after removing commas and dollar signs
-tn_movie_budgets['production_budget'] = tn_movie_budgets['production_budget'].replace('[\$,]', '', regex=True).astype(float)
-tn_movie_budgets['worldwide_gross'] = tn_movie_budgets['worldwide_gross'].replace('[\$,]', '', regex=True).astype(float)
 
-# my scatter plot
-plt.figure(figsize=(10, 6))
-plt.scatter(tn_movie_budgets['production_budget'], tn_movie_budgets['worldwide_gross'], alpha=0.5)
-plt.title('Production Budget vs. Worldwide Gross')
-plt.xlabel('Production Budget ($)')
-plt.ylabel('Worldwide Gross ($)')
-plt.grid(True)
-plt.show()
+    # In[9]:
 
 
-# In[9]:
+    # Aggregate the data by studio and calculate the total domestic gross revenue for each studio
+    studio_domestic_gross = results['studio_domestic_gross']
 
+    # Select top 50 studios based on total revenue
+    top_50_studios = studio_domestic_gross.head(50)
 
-# Remove commas and dollar signs and convert 'domestic_gross' to numeric
-bom_movie_gross['domestic_gross'] = bom_movie_gross['domestic_gross'].replace('[\$,]', '', regex=True).astype(float)
+    # Plotting
+    top_50_studios_chart = report_charts['top_50_studios']
+    charts.append(top_50_studios_chart)
 
-# Aggregate the data by studio and calculate the total domestic gross revenue for each studio
-studio_domestic_gross = bom_movie_gross.groupby('studio')['domestic_gross'].sum().sort_values(ascending=False)
 
-# Select top 50 studios based on total revenue
-top_50_studios = studio_domestic_gross.head(50)
+    # In[10]:
 
-# Plotting
-plt.figure(figsize=(12, 6))
-top_50_studios.plot(kind='bar', color='skyblue')
-plt.title('Total Domestic Gross Revenue by Top 50 Studios')
-plt.xlabel('Studio')
-plt.ylabel('Total Domestic Gross Revenue ($)')
-plt.xticks(rotation=45, ha='right')
-plt.tight_layout()
-plt.show()
 
+    # Aggregate the matched titles by genre and calculate the total domestic gross
+    # revenue for each genre (same stage result as In[26])
+    genre_domestic_gross = results['genre_box_office']
 
-# In[10]:
+    # Plotting
+    genre_domestic_gross_chart = report_charts['genre_domestic_gross']
+    charts.append(genre_domestic_gross_chart)
 
 
-# Merge datasets on movie title
-merged_data = pd.merge(bom_movie_gross, imdb_title_basics, left_on='title', right_on='primary_title', how='inner')
+    # In[12]:
 
-# Remove commas and dollar signs and convert 'domestic_gross' to numeric
-merged_data['domestic_gross'] = merged_data['domestic_gross'].replace('[\$,]', '', regex=True).astype(float)
 
-# Split genres into separate rows and aggregate by genre
-genres_df = merged_data['genres'].str.split(',', expand=True).stack().reset_index(level=1, drop=True).rename('genre')
-merged_data_genre = merged_data.drop('genres', axis=1).join(genres_df)
+    # Studio totals, top 50 studios and their revenue by release year come from
+    # the studio_domestic_gross and revenue_by_year_top_50 stages
+    studio_domestic_gross = results['studio_domestic_gross']
+    top_50_studios = studio_domestic_gross.head(50).index
+    revenue_by_year_top_50 = results['revenue_by_year_top_50']
 
-# Aggregate the data by genre and calculate the total domestic gross revenue for each genre
-genre_domestic_gross = merged_data_genre.groupby('genre')['domestic_gross'].sum().sort_values(ascending=False)
+    # Plotting
+    revenue_by_year_chart = report_charts['revenue_by_year_top_50']
+    charts.append(revenue_by_year_chart)
 
-# Plotting
-plt.figure(figsize=(12, 6))
-genre_domestic_gross.plot(kind='bar', color='skyblue')
-plt.title('Total Domestic Gross Revenue by Genre')
-plt.xlabel('Genre')
-plt.ylabel('Total Domestic Gross Revenue ($)')
-plt.xticks(rotation=45, ha='right')
-plt.tight_layout()
-plt.show()
 
+    # Bar Graph of Total Domestic Gross Revenue by Studio (Top 50):
+    # 
+    # Description: This bar graph displays the total domestic gross revenue for the top 50 studios in the dataset.
+    # Analysis: Studios such as BV (presumably Disney), WB (Warner Bros.), and Uni. (Universal Pictures) appear to be the top revenue generators, as they have the highest total domestic gross revenue. There is a significant variation in revenue among different studios, indicating varying levels of success in the movie industry. The distribution of revenue among studios can provide insights into market dominance and competition within the film industry.
+    # Visualization: The bar graph clearly presents the revenue data for each studio, facilitating easy comparison. Studios are labeled along the x-axis, and revenue is represented on the y-axis.
 
-# In[12]:
+    # In[18]:
 
 
-# Remove commas and dollar signs and convert 'domestic_gross' to numeric
-bom_movie_gross['domestic_gross'] = bom_movie_gross['domestic_gross'].replace('[\$,]', '', regex=True).astype(float)
+    # Bar Graph of Total Domestic Gross Revenue by Studio (Top 50)
 
-# Aggregate the data by studio and calculate the total domestic gross revenue for each studio
-studio_domestic_gross = bom_movie_gross.groupby('studio')['domestic_gross'].sum().sort_values(ascending=False)
+    # Same chart as In[9]; the renderer draws identical specs once
+    charts.append(report_charts['studio_domestic_gross_top_50'])
 
-# based on the top 50 studios based on total revenue
-top_50_studios = studio_domestic_gross.head(50).index
 
-# Filter the data to include only movies from the top 50 studios
-top_50_data = bom_movie_gross[bom_movie_gross['studio'].isin(top_50_studios)]
+    # Bar Graph of Total Domestic Gross Revenue by Genre:
+    # 
+    # Description: This bar graph shows the total domestic gross revenue for each genre.
+    # Analysis: Genres such as Action, Adventure, and Comedy appear to be the highest revenue generators, while genres like Documentary and Western have relatively lower revenues. This analysis can help in understanding audience preferences and the popularity of different genres in the domestic market. Studios and filmmakers can use this information to make informed decisions about genre selection for future projects.
+    # Visualization: The bar graph presents the revenue data for each genre, allowing for easy comparison. Genres are labeled along the x-axis, and revenue is represented on the y-axis.
 
-# Aggregate the data by release year and calculate the total domestic gross revenue for each year
-revenue_by_year_top_50 = top_50_data.groupby('year')['domestic_gross'].sum()
+    # In[19]:
 
-# Plotting
-plt.figure(figsize=(12, 6))
-plt.plot(revenue_by_year_top_50.index, revenue_by_year_top_50.values, marker='o', linestyle='-')
-plt.title('Total Domestic Gross Revenue by Year for Top 50 Studios')
-plt.xlabel('Year')
-plt.ylabel('Total Domestic Gross Revenue ($)')
-plt.xticks(revenue_by_year_top_50.index, rotation=45)
-plt.grid(True)
-plt.tight_layout()
-plt.show()
 
+    # Bar Graph of Total Domestic Gross Revenue by Genre
 
-# Bar Graph of Total Domestic Gross Revenue by Studio (Top 50):
-# 
-# Description: This bar graph displays the total domestic gross revenue for the top 50 studios in the dataset.
-# Analysis: Studios such as BV (presumably Disney), WB (Warner Bros.), and Uni. (Universal Pictures) appear to be the top revenue generators, as they have the highest total domestic gross revenue. There is a significant variation in revenue among different studios, indicating varying levels of success in the movie industry. The distribution of revenue among studios can provide insights into market dominance and competition within the film industry.
-# Visualization: The bar graph clearly presents the revenue data for each studio, facilitating easy comparison. Studios are labeled along the x-axis, and revenue is represented on the y-axis.
+    # Same chart as In[10]; the renderer draws identical specs once
+    charts.append(report_charts['genre_domestic_gross_summary'])
 
-# In[18]:
 
+    # Line Graph of Total Domestic Gross Revenue by Year for Top 50 Studios:
+    # 
+    # Description: This line graph illustrates the trend of total domestic gross revenue over the years for the top 50 studios.
+    # Analysis: Similar to the overall trend, there appears to be a general upward trend in domestic gross revenue for the top 50 studios, indicating their sustained success over the years. Peaks and troughs in revenue may coincide with blockbuster releases or specific strategies adopted by studios. This analysis provides insights into the performance and competitiveness of the top studios in the domestic market.
+    # Visualization: The line graph depicts the trend of revenue over the years, with years labeled along the x-axis and revenue represented on the y-axis. This visualization helps in understanding the revenue trends for the top studios.
 
-# Bar Graph of Total Domestic Gross Revenue by Studio (Top 50)
+    # In[20]:
 
-plt.figure(figsize=(10, 6))
-top_50_studios_values = studio_domestic_gross.head(50)  # Extracting the values from the index
-top_50_studios_values.plot(kind='bar', color='skyblue')
-plt.title('Total Domestic Gross Revenue by Studio (Top 50)')
-plt.xlabel('Studio')
-plt.ylabel('Total Domestic Gross Revenue ($)')
-plt.xticks(rotation=45, ha='right')
-plt.tight_layout()
-plt.show()
 
+    # Line Graph of Total Domestic Gross Revenue by Year for Top 50 Studios
 
-# Bar Graph of Total Domestic Gross Revenue by Genre:
-# 
-# Description: This bar graph shows the total domestic gross revenue for each genre.
-# Analysis: Genres such as Action, Adventure, and Comedy appear to be the highest revenue generators, while genres like Documentary and Western have relatively lower revenues. This analysis can help in understanding audience preferences and the popularity of different genres in the domestic market. Studios and filmmakers can use this information to make informed decisions about genre selection for future projects.
-# Visualization: The bar graph presents the revenue data for each genre, allowing for easy comparison. Genres are labeled along the x-axis, and revenue is represented on the y-axis.
-
-# In[19]:
-
+    # Same chart as In[12]; the renderer draws identical specs once
+    charts.append(report_charts['revenue_by_year_top_50_summary'])
 
-# Bar Graph of Total Domestic Gross Revenue by Genre
 
-plt.figure(figsize=(10, 6))
-genre_domestic_gross.plot(kind='bar', color='skyblue')
-plt.title('Total Domestic Gross Revenue by Genre')
-plt.xlabel('Genre')
-plt.ylabel('Total Domestic Gross Revenue ($)')
-plt.xticks(rotation=45, ha='right')
-plt.tight_layout()
-plt.show()
+    # In[ ]:
 
 
-# Line Graph of Total Domestic Gross Revenue by Year for Top 50 Studios:
-# 
-# Description: This line graph illustrates the trend of total domestic gross revenue over the years for the top 50 studios.
-# Analysis: Similar to the overall trend, there appears to be a general upward trend in domestic gross revenue for the top 50 studios, indicating their sustained success over the years. Peaks and troughs in revenue may coincide with blockbuster releases or specific strategies adopted by studios. This analysis provides insights into the performance and competitiveness of the top studios in the domestic market.
-# Visualization: The line graph depicts the trend of revenue over the years, with years labeled along the x-axis and revenue represented on the y-axis. This visualization helps in understanding the revenue trends for the top studios.
-
-# In[20]:
+    # Render every chart on the Agg backend, in parallel, into args.output_dir
+    # (with --trace-memory, only traced without workers: forked renderers would
+    # inherit tracemalloc)
+    chart_files = instrumentation.run('render_charts', render_charts, charts, args.output_dir,
+                                      tuple(args.formats.split(',')), args.workers,
+                                      trace_memory=args.trace_memory and args.workers == 1)
+    for name, files in chart_files.items():
+        print(name, ', '.join(files))
 
+    # Timings, memory and row counts of every stage of this run
+    print(instrumentation.summary().to_string())
 
-# Line Graph of Total Domestic Gross Revenue by Year for Top 50 Studios
 
-plt.figure(figsize=(10, 6))
-plt.plot(revenue_by_year_top_50.index, revenue_by_year_top_50.values, marker='o', linestyle='-')
-plt.title('Total Domestic Gross Revenue by Year for Top 50 Studios')
-plt.xlabel('Year')
-plt.ylabel('Total Domestic Gross Revenue ($)')
-plt.xticks(revenue_by_year_top_50.index, rotation=45)
-plt.grid(True)
-plt.tight_layout()
-plt.show()
+if __name__ == '__main__':
+    # Worker processes started with 'spawn' (the default on macOS and Windows)
+    # re-import this script; the guard keeps them from rerunning the analysis
+    main()
 
 
 # ## Evaluation
@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+"""Benchmark the analysis pipeline on synthetic data at several scales.
+
+For every scale (number of IMDB titles) the synthetic CSVs are generated
+once under ``--data-root``.  Every case then runs in a fresh forked process,
+so peak memory is measured per case: the wall time of each repeat, the
+process's peak RSS and the peak traced Python/NumPy allocation of one extra,
+untimed call.  A case that fails, dies or runs past ``--timeout`` is
+recorded with its error instead of hanging the run.  Results are written as
+JSON; ``--compare`` checks them against an earlier file.  The exit status is
+non-zero on regressions or failed cases.
+
+    python benchmarks/bench_pipeline.py --scales 1e4,1e5,1e6 --repeat 3
+    python benchmarks/bench_pipeline.py --scales 1e5 --compare benchmarks/results/baseline.json
+"""
+
+import argparse
+import copy
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import queue as queue_module
+import resource
+import subprocess
+import sys
+import time
+import traceback
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from movie_analysis import loader, stages, streaming  # noqa: E402
+from movie_analysis.incremental import AggregateState  # noqa: E402
+from movie_analysis.pipeline import run_pipeline  # noqa: E402
+from movie_analysis.report import prepare_frames  # noqa: E402
+from movie_analysis.synthetic import generate  # noqa: E402
+from movie_analysis.titles import TitleIndex  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+DEFAULT_TIMEOUT = 3600
+
+
+def _load(data_dir):
+    return prepare_frames(*loader.load_all(data_dir))
+
+
+def _stage_case(stage):
+    def setup(data_dir):
+        # Upstream stage outputs (e.g. merged_data) come from one serial run.
+        data = run_pipeline(stages.ANALYSIS_STAGES, _load(data_dir))
+        args = [data[name] for name in stage.inputs]
+        return lambda: stage.func(*args)
+    return setup
+
+
+def _csv_load_case(data_dir):
+    return lambda: loader.load_all(data_dir, use_cache=False)
+
+
+def _cached_load_case(data_dir):
+    loader.load_all(data_dir)  # make sure the Parquet cache exists
+    return lambda: loader.load_all(data_dir)
+
+
+def _resolve_case(data_dir):
+    bom, imdb, _, _ = loader.load_all(data_dir)
+
+    def run():
+        index = TitleIndex.build(bom['title'], bom['year'])
+        index.resolve(imdb['primary_title'], imdb['start_year'])
+    return run
+
+
+def _streaming_case(data_dir):
+    return lambda: streaming.stream_rollups(data_dir, chunksize=250_000)
+
+
+def _incremental_case(data_dir):
+    data = _load(data_dir)
+    state = AggregateState.from_frames(data['bom_movie_gross'], data['imdb_title_basics'])
+    delta = data['bom_movie_gross'].sample(min(100, len(data['bom_movie_gross'])), random_state=0)
+    delta = delta.assign(domestic_gross=delta['domestic_gross'] * 1.1)
+    # Every repeat applies the delta to an untouched copy of the state.
+    return (lambda: copy.deepcopy(state)), (lambda fresh: fresh.apply_delta(delta))
+
+
+# A case builds its inputs and returns the callable to time, or a
+# ``(prepare, run)`` pair: ``run(prepare())`` is timed, ``prepare`` is not.
+CASES = {
+    'load_csv': _csv_load_case,
+    'load_cached': _cached_load_case,
+    'resolve_titles': _resolve_case,
+    'streaming_rollups': _streaming_case,
+    'incremental_delta': _incremental_case,
+}
+CASES.update({'stage_' + stage.name: _stage_case(stage) for stage in stages.ANALYSIS_STAGES})
+
+
+def _rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+
+
+def _run_case(name, data_dir, repeat, queue):
+    try:
+        queue.put(_measure(name, data_dir, repeat))
+    except BaseException:
+        queue.put({'error': traceback.format_exc()})
+
+
+def _measure(name, data_dir, repeat):
+    case = CASES[name](data_dir)
+    prepare, run = case if isinstance(case, tuple) else ((lambda: None), (lambda _: case()))
+    rss_before = _rss_mb()
+    walls = []
+    for _ in range(repeat):
+        value = prepare()
+        start = time.perf_counter()
+        run(value)
+        walls.append(time.perf_counter() - start)
+    # tracemalloc slows Python-level code down a lot, so the traced peak
+    # comes from one extra, untimed run.
+    value = prepare()
+    tracemalloc.start()
+    run(value)
+    traced_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'wall_s': walls,
+        'wall_s_min': min(walls),
+        'rss_before_mb': round(rss_before, 1),
+        # ru_maxrss is in KiB on Linux.
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'peak_traced_mb': round(traced_peak / 1024 ** 2, 1),
+    }
+
+
+def run_case(name, data_dir, repeat, timeout=DEFAULT_TIMEOUT):
+    """Run one case in a forked child and return its measurements.
+
+    If the child raises, dies (e.g. killed for running out of memory) or
+    takes longer than ``timeout`` seconds, the result is ``{'error': ...}``.
+    """
+    ctx = multiprocessing.get_context('fork')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run_case, args=(name, data_dir, repeat, queue))
+    proc.start()
+    deadline = time.monotonic() + timeout
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=1)
+        except queue_module.Empty:
+            if not proc.is_alive():
+                try:
+                    result = queue.get(timeout=1)  # put just before exiting
+                except queue_module.Empty:
+                    result = {'error': 'exited with code %s' % proc.exitcode}
+            elif time.monotonic() > deadline:
+                proc.kill()
+                result = {'error': 'timed out after %d s' % timeout}
+    proc.join()
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(current, baseline, threshold):
+    """Return the cases whose best wall time regressed by more than ``threshold``."""
+    old = {(r['case'], r['scale']): r for r in baseline['results'] if 'error' not in r}
+    regressions = []
+    for r in current['results']:
+        before = old.get((r['case'], r['scale']))
+        if before and 'error' not in r and r['wall_s_min'] > before['wall_s_min'] * threshold:
+            regressions.append((r['case'], r['scale'], before['wall_s_min'], r['wall_s_min']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', default='1e4,1e5',
+                        help='comma-separated IMDB row counts, e.g. 1e4,1e5,1e6,1e7,1e8')
+    parser.add_argument('--cases', default=','.join(CASES),
+                        help='comma-separated cases to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help='seconds after which a case is killed and reported as failed')
+    parser.add_argument('--data-root', default=os.path.join('.movie_cache', 'bench-data'))
+    parser.add_argument('--output', default=None,
+                        help='JSON file to write (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', default=None, help='earlier JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='slowdown factor counted as a regression')
+    args = parser.parse_args(argv)
+
+    cases = args.cases.split(',')
+    results, failures = [], []
+    for scale in [int(float(s)) for s in args.scales.split(',')]:
+        data_dir = os.path.join(args.data_root, str(scale))
+        if not os.path.exists(os.path.join(data_dir, 'tn.movie_budgets.csv')):
+            generate(data_dir, scale)
+        for name in cases:
+            result = dict(case=name, scale=scale,
+                          **run_case(name, data_dir, args.repeat, args.timeout))
+            results.append(result)
+            if 'error' in result:
+                failures.append(result)
+                print('%-32s %11d FAILED: %s' % (name, scale, result['error'].strip()))
+                continue
+            print('%-32s %11d %10.4f s %9.1f MB' % (name, scale, result['wall_s_min'],
+                                                    result['peak_rss_mb']))
+
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+        },
+        'results': results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, datetime.datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print('wrote', output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for case, scale, before, after in regressions:
+            print('REGRESSION %s @ %d: %.4f s -> %.4f s' % (case, scale, before, after))
+        return 1 if regressions or failures else 0
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
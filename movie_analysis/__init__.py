@@ -0,0 +1 @@
+"""Helpers behind the Microsoft movie-studio analysis in KrishansPhase1Project.py."""
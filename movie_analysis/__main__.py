@@ -0,0 +1,8 @@
+"""``python -m movie_analysis``: same as the ``movie-analysis`` command."""
+
+import sys
+
+from movie_analysis.cli import main
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,288 @@
+"""Content-addressed cache for pipeline stage results.
+
+A stage's cache key is a hash of its name, its code and the fingerprints of
+its inputs.  "Code" is the stage function and every piece of package code
+it can reach: the ``movie_analysis`` functions, classes and modules named
+in its bytecode, followed transitively.  It also covers bound parameters of
+``functools.partial`` stages and the current values of the module-level
+constants that code reads (``stages.BUDGET_BANDS``, ``stages.TOP_STUDIOS``).
+Editing a helper a stage calls therefore invalidates the stage, while
+editing code no stage reaches (the chart drawers in ``charts``, the chart
+specs in ``report``, the CLI) invalidates nothing.  Input
+DataFrames are fingerprinted by content with ``pd.util.hash_pandas_object``.
+Stage outputs are fingerprinted by derivation: the key of the stage that
+produced them plus the output name.  Changing one stage therefore
+invalidates exactly that stage and everything downstream of it.
+
+Results live in two tiers: a small in-process LRU of live objects, and an
+on-disk store with one directory per key, holding frames and array-backed
+values in the files ``pipeline.spill`` writes and other values as pickles.  The disk store is trimmed to ``max_bytes`` in
+least-recently-used order.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import types
+from collections import OrderedDict
+
+import pandas as pd
+
+from movie_analysis.pipeline import ArrayRef, FrameRef, materialize, relocate, spill
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+DEFAULT_MEMORY_ENTRIES = 32
+
+_PACKAGE = __name__.rpartition('.')[0]
+
+# Global values a stage reads that count as parameters of its result.
+_CONSTANT_TYPES = (bool, int, float, str, bytes, tuple, frozenset)
+
+
+def fingerprint(value):
+    """Content hash of a stage input."""
+    digest = hashlib.sha256()
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest.update(type(value).__name__.encode())
+        frame = value.to_frame() if isinstance(value, pd.Series) else value
+        digest.update(repr([(str(c), str(t)) for c, t in frame.dtypes.items()]).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    else:
+        digest.update(pickle.dumps(value, protocol=4))
+    return digest.hexdigest()
+
+
+def _names(code):
+    # Every global or attribute name used by ``code`` and its nested code.
+    names, pending = set(), [code]
+    while pending:
+        code = pending.pop()
+        names.update(code.co_names)
+        pending.extend(c for c in code.co_consts if inspect.iscode(c))
+    return names
+
+
+def _in_package(value):
+    if isinstance(value, types.ModuleType):
+        name = value.__name__
+    elif isinstance(value, (types.FunctionType, type)):
+        name = getattr(value, '__module__', None) or ''
+    else:
+        return False
+    return name == _PACKAGE or name.startswith(_PACKAGE + '.')
+
+
+def _functions(value):
+    # The plain functions making up a package function, class or module.
+    if isinstance(value, types.FunctionType):
+        return [value]
+    members = vars(value).values()
+    if isinstance(value, types.ModuleType):
+        return [m for m in members if _in_package(m) and getattr(m, '__module__', None)
+                == value.__name__]
+    found = []
+    for member in members:
+        member = getattr(member, '__func__', getattr(member, 'fget', member))
+        if isinstance(member, types.FunctionType):
+            found.append(member)
+    return found
+
+
+def _source(value):
+    if isinstance(value, types.ModuleType):
+        return ''  # its functions and classes are followed one by one
+    try:
+        return inspect.getsource(value)
+    except (OSError, TypeError):
+        code = getattr(value, '__code__', None)
+        return repr(code.co_code) if code is not None else repr(value)
+
+
+def reachable_code(func):
+    """``(name, source)`` of ``func`` and the package code it can reach, plus
+    ``(name, value)`` of the module-level constants that code reads."""
+    reached, constants = {}, {}
+    pending = [func]
+    while pending:
+        value = pending.pop()
+        name = value.__name__ if isinstance(value, types.ModuleType) \
+            else '%s.%s' % (value.__module__, value.__qualname__)
+        if name in reached:
+            continue
+        reached[name] = _source(value)
+        for function in _functions(value):
+            if function is not value:
+                pending.append(function)
+                continue
+            names = sorted(n for n in _names(function.__code__) if not n.startswith('__'))
+            scopes = [function.__globals__]
+            scopes += [vars(m) for m in (scopes[0].get(n) for n in names)
+                       if isinstance(m, types.ModuleType) and _in_package(m)]
+            for scope in scopes:
+                for global_name in names:
+                    target = scope.get(global_name)
+                    if isinstance(target, _CONSTANT_TYPES):
+                        constants['%s.%s' % (scope['__name__'], global_name)] = target
+                    elif _in_package(target):
+                        pending.append(target)
+    return sorted(reached.items()), sorted(constants.items())
+
+
+def code_fingerprint(func):
+    """Hash of a stage function's reachable code, bound parameters and constants."""
+    digest = hashlib.sha256()
+    if isinstance(func, functools.partial):
+        digest.update(repr((func.args, sorted(func.keywords.items()))).encode())
+        func = func.func
+    code, constants = reachable_code(func)
+    for name, source in code:
+        digest.update(name.encode())
+        digest.update(source.encode())
+    digest.update(repr(constants).encode())
+    return digest.hexdigest()
+
+
+def output_fingerprint(key, name):
+    """Fingerprint of output ``name`` of the stage run with cache ``key``."""
+    return hashlib.sha256((key + '/' + name).encode()).hexdigest()
+
+
+class ResultCache:
+    """Two-tier (memory + disk) LRU cache of stage outputs.
+
+    ``stats`` maps stage names to ``{'hits': n, 'misses': n}``; ``report()``
+    returns it as a DataFrame.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES,
+                 memory_entries=DEFAULT_MEMORY_ENTRIES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self.stats = {}
+        os.makedirs(directory, exist_ok=True)
+
+    fingerprint = staticmethod(fingerprint)
+    output_fingerprint = staticmethod(output_fingerprint)
+
+    def key(self, stage, input_fingerprints):
+        """Cache key of ``stage`` run on inputs with these fingerprints."""
+        digest = hashlib.sha256()
+        digest.update(stage.name.encode())
+        digest.update(code_fingerprint(stage.func).encode())
+        digest.update(repr((tuple(stage.inputs), tuple(stage.outputs))).encode())
+        for fp in input_fingerprints:
+            digest.update(fp.encode())
+        return digest.hexdigest()
+
+    def _record(self, stage_name, hit):
+        counts = self.stats.setdefault(stage_name, {'hits': 0, 'misses': 0})
+        counts['hits' if hit else 'misses'] += 1
+
+    def _remember(self, key, values):
+        self._memory[key] = values
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, stage_name, key, load=True):
+        """Return the cached outputs for ``key`` as a dict, or None.
+
+        With ``load=False`` frames and arrays stored on disk come back as
+        ``FrameRef``/``ArrayRef``s instead of being read.
+        """
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self._record(stage_name, True)
+            return dict(self._memory[key])
+
+        entry = os.path.join(self.directory, key)
+        try:
+            with open(os.path.join(entry, 'manifest.json')) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            self._record(stage_name, False)
+            return None
+
+        values = {}
+        for name, item in manifest.items():
+            path = os.path.join(entry, item['file'])
+            if item['kind'] == 'frame':
+                values[name] = FrameRef(path, item.get('series_name'), item['is_series'])
+            elif item['kind'] == 'array':
+                values[name] = ArrayRef(path, item['array_kind'])
+            else:
+                with open(path, 'rb') as f:
+                    values[name] = pickle.load(f)
+        os.utime(entry)
+        self._record(stage_name, True)
+        if load:
+            values = {name: materialize(v) for name, v in values.items()}
+            self._remember(key, values)
+        return values
+
+    def put(self, key, values):
+        """Store a stage's outputs (live objects or ``FrameRef``s)."""
+        entry = os.path.join(self.directory, key)
+        if not os.path.exists(entry):
+            tmp = tempfile.mkdtemp(dir=self.directory, prefix='.tmp-')
+            manifest = {}
+            for i, (name, value) in enumerate(values.items()):
+                stem = 'out%d' % i
+                ref = spill(relocate(value, tmp, stem), tmp, stem)
+                if isinstance(ref, FrameRef):
+                    manifest[name] = {'kind': 'frame', 'file': os.path.basename(ref.path),
+                                      'series_name': ref.series_name,
+                                      'is_series': ref.is_series}
+                elif isinstance(ref, ArrayRef):
+                    manifest[name] = {'kind': 'array', 'file': os.path.basename(ref.path),
+                                      'array_kind': ref.kind}
+                else:
+                    with open(os.path.join(tmp, stem + '.pickle'), 'wb') as f:
+                        pickle.dump(value, f, protocol=4)
+                    manifest[name] = {'kind': 'pickle', 'file': stem + '.pickle'}
+            with open(os.path.join(tmp, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f)
+            try:
+                os.rename(tmp, entry)
+            except OSError:
+                # Another process stored the same key first.
+                shutil.rmtree(tmp, ignore_errors=True)
+        if not any(isinstance(v, (FrameRef, ArrayRef)) for v in values.values()):
+            self._remember(key, dict(values))
+        self.evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith('.') or not os.path.isdir(path):
+                continue
+            size = sum(os.path.getsize(os.path.join(root, f))
+                       for root, _, files in os.walk(path) for f in files)
+            entries.append((os.path.getmtime(path), size, path))
+        return sorted(entries)
+
+    def evict(self):
+        """Delete least recently used entries until the store fits ``max_bytes``."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            self._memory.pop(os.path.basename(path), None)
+            total -= size
+
+    def report(self):
+        """Per-stage hit/miss counts as a DataFrame."""
+        frame = pd.DataFrame.from_dict(self.stats, orient='index',
+                                       columns=['hits', 'misses'])
+        frame.index.name = 'stage'
+        return frame
@@ -0,0 +1,182 @@
+"""Headless, batched chart rendering.
+
+The notebook drew each figure inline with ``plt.show()``, which needs IPython
+and renders one chart at a time.  Here every figure is described by a
+``Chart`` spec and ``render_charts`` draws them on the Agg backend, in
+parallel worker processes, straight to PNG/SVG files.  Specs with the same
+content are rendered once.
+
+matplotlib and seaborn are imported only inside the drawing code, so
+building specs does not pay their import cost.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Tuple
+
+from movie_analysis.cache import fingerprint
+from movie_analysis.pipeline import materialize, spill
+
+SCATTER_MODES = ('points', 'rasterized', 'density')
+
+
+class Chart(NamedTuple):
+    """One figure: what to draw, from which data, and its labels.
+
+    ``kind`` is one of 'barh', 'bar', 'heatmap', 'box', 'scatter' or 'line'.
+    For 'scatter', ``data`` is a DataFrame whose first two columns are x and
+    y; for the other kinds it is the Series/DataFrame being plotted.
+    ``options`` holds extra keyword pairs, e.g. ``(('mode', 'density'),)``.
+    """
+
+    name: str
+    kind: str
+    data: object
+    title: str
+    xlabel: str = ''
+    ylabel: str = ''
+    figsize: Tuple[float, float] = (10, 6)
+    options: Tuple[Tuple[str, object], ...] = ()
+
+
+def chart_key(chart):
+    """Content hash of a chart spec, ignoring its file name."""
+    digest = hashlib.sha256()
+    digest.update(repr((chart.kind, chart.title, chart.xlabel, chart.ylabel,
+                        tuple(chart.figsize), chart.options)).encode())
+    digest.update(fingerprint(chart.data).encode())
+    return digest.hexdigest()
+
+
+def _draw_barh(ax, data, options):
+    import seaborn as sns
+
+    sns.barplot(x=data.values, y=data.index.astype(str), hue=data.index.astype(str),
+                palette='viridis', legend=False, ax=ax)
+
+
+def _draw_bar(ax, data, options):
+    data.plot(kind='bar', color='skyblue', ax=ax)
+    for label in ax.get_xticklabels():
+        label.set_rotation(45)
+        label.set_horizontalalignment('right')
+
+
+def _draw_heatmap(ax, data, options):
+    import seaborn as sns
+
+    sns.heatmap(data, cmap='viridis', ax=ax)
+
+
+def _draw_box(ax, data, options):
+    import seaborn as sns
+
+    sns.boxplot(y=data, color=sns.color_palette('viridis')[0], ax=ax)
+
+
+def _draw_scatter(ax, data, options):
+    x = data.iloc[:, 0].to_numpy(dtype=float)
+    y = data.iloc[:, 1].to_numpy(dtype=float)
+    mode = options.get('mode', 'points')
+    if mode == 'density':
+        # Bin the points and draw the counts as one image: cost and file
+        # size no longer grow with the number of points.
+        import numpy as np
+        from matplotlib.colors import LogNorm
+
+        ok = np.isfinite(x) & np.isfinite(y)
+        bins = options.get('bins', 300)
+        counts, xedges, yedges = np.histogram2d(x[ok], y[ok], bins=bins)
+        image = ax.imshow(np.ma.masked_equal(counts.T, 0), origin='lower', aspect='auto',
+                          extent=(xedges[0], xedges[-1], yedges[0], yedges[-1]),
+                          cmap='viridis', norm=LogNorm(), interpolation='nearest')
+        ax.figure.colorbar(image, ax=ax, label='Movies')
+    else:
+        ax.scatter(x, y, alpha=0.5, rasterized=(mode == 'rasterized'))
+
+
+def _draw_line(ax, data, options):
+    ax.plot(data.index, data.values, marker='o', linestyle='-')
+    ax.set_xticks(data.index)
+    for label in ax.get_xticklabels():
+        label.set_rotation(45)
+
+
+_DRAWERS = {
+    'barh': _draw_barh,
+    'bar': _draw_bar,
+    'heatmap': _draw_heatmap,
+    'box': _draw_box,
+    'scatter': _draw_scatter,
+    'line': _draw_line,
+}
+
+
+def render_chart(chart, output_dir, formats=('png',), dpi=100):
+    """Draw one chart on the Agg backend and save it; returns the file paths."""
+    import matplotlib
+
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    options = dict(chart.options)
+    fig, ax = plt.subplots(figsize=chart.figsize)
+    try:
+        _DRAWERS[chart.kind](ax, materialize(chart.data), options)
+        ax.set_title(chart.title)
+        ax.set_xlabel(chart.xlabel)
+        ax.set_ylabel(chart.ylabel)
+        if options.get('grid'):
+            ax.grid(True)
+        fig.tight_layout()
+        paths = []
+        for fmt in formats:
+            path = os.path.join(output_dir, '%s.%s' % (chart.name, fmt))
+            fig.savefig(path, dpi=dpi)
+            paths.append(path)
+        return paths
+    finally:
+        plt.close(fig)
+
+
+def render_charts(charts, output_dir, formats=('png',), workers=1, dpi=100):
+    """Render ``charts`` into ``output_dir``.
+
+    Charts with identical content (see ``chart_key``) are drawn once; every
+    name still maps to the files of its first occurrence.  With
+    ``workers > 1`` charts are drawn in parallel processes, and their data
+    frames are handed over as memory-mapped Arrow files.
+
+    Returns ``{chart name: [file paths]}``.
+    """
+    for chart in charts:
+        if chart.kind not in _DRAWERS:
+            raise ValueError('unknown chart kind %r' % chart.kind)
+    os.makedirs(output_dir, exist_ok=True)
+
+    unique = {}
+    names = {}
+    for chart in charts:
+        key = chart_key(chart)
+        unique.setdefault(key, chart)
+        names[chart.name] = key
+
+    if workers <= 1 or len(unique) <= 1:
+        paths = {key: render_chart(c, output_dir, formats, dpi) for key, c in unique.items()}
+    else:
+        spill_dir = tempfile.mkdtemp(prefix='movie-charts-')
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(unique))) as pool:
+                futures = {
+                    key: pool.submit(render_chart,
+                                     c._replace(data=spill(c.data, spill_dir, key)),
+                                     output_dir, formats, dpi)
+                    for key, c in unique.items()
+                }
+                paths = {key: future.result() for key, future in futures.items()}
+        finally:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+    return {name: paths[key] for name, key in names.items()}
@@ -0,0 +1,53 @@
+"""Column cleaning shared by the analysis cells."""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# Currency formatting found in the source files: '$425,000,000' in The
+# Numbers, '1,131.6' in Box Office Mojo's foreign_gross.
+_MONEY_JUNK = re.compile(r'[$,\s]')
+
+# Box Office Mojo writes foreign grosses over $1bn in millions with one
+# decimal ('1,131.6' is $1,131,600,000); other values are whole dollars.
+MILLIONS_COLUMNS = frozenset(['foreign_gross'])
+_MILLIONS = re.compile(r'^\s*\$?\d{1,3}(?:,\d{3})+\.\d\s*$')
+
+
+def parse_money(values, millions=False):
+    """Parse currency-formatted strings into a float64 Series.
+
+    Dollar signs, thousands separators and whitespace are stripped in a
+    single regex pass and the result is converted with ``pd.to_numeric``.
+    Missing values and unparseable strings such as ``'nan'`` or ``'None'``
+    become NaN.  With ``millions``, values written like ``'1,131.6'`` are
+    read as millions of dollars.
+    """
+    values = pd.Series(values, copy=False)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype('float64')
+    text = values.astype('string')
+    stripped = text.str.replace(_MONEY_JUNK, '', regex=True)
+    parsed = pd.to_numeric(stripped, errors='coerce').astype('float64')
+    if millions:
+        scaled = text.str.match(_MILLIONS).fillna(False).to_numpy(dtype=bool)
+        parsed[scaled] *= 1e6
+    return parsed
+
+
+def normalize_money(df, cols):
+    """Convert the money columns ``cols`` of ``df`` to float64 in place.
+
+    Columns that are already numeric are only cast to float64, so calling
+    this again on a cleaned frame is a cheap no-op.  Columns missing from
+    ``df`` are ignored.  ``MILLIONS_COLUMNS`` are parsed with
+    ``millions=True``.  Returns ``df`` for chaining.
+    """
+    for col in cols:
+        if col not in df.columns:
+            continue
+        if df[col].dtype == np.float64:
+            continue
+        df[col] = parse_money(df[col], millions=col in MILLIONS_COLUMNS)
+    return df
@@ -0,0 +1,178 @@
+"""``movie-analysis`` command line.
+
+    movie-analysis --data-dir data load
+    movie-analysis --data-dir data aggregate --output results
+    movie-analysis --data-dir data report --output-dir figures --formats png,svg
+    movie-analysis --data-dir data cube --output cube
+    movie-analysis --data-dir data snapshot --output snapshots
+    movie-analysis --data-dir data serve --port 8080
+
+``load`` parses the four CSVs (warming the Parquet cache) and prints their
+shapes; ``aggregate`` runs the analysis stages and writes every table to
+``--output`` as CSV; ``report`` also renders every chart; ``cube`` writes
+the genre x year x studio cube (``movie_analysis.cube``); ``snapshot``
+publishes a new version of the cleaned, joined frames
+(``movie_analysis.snapshot``); ``serve`` answers
+studio/genre/year queries over HTTP (``movie_analysis.service``).  The data
+directory defaults to ``$MOVIE_ANALYSIS_DATA`` or the current directory.
+Only ``report`` imports matplotlib/seaborn, when it draws the charts.
+"""
+
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+from movie_analysis.cache import ResultCache
+from movie_analysis.charts import SCATTER_MODES, render_charts
+from movie_analysis.cube import GenreYearCube
+from movie_analysis.loader import load_all
+from movie_analysis.pipeline import run_pipeline
+from movie_analysis.report import chart_specs, prepare_frames
+from movie_analysis.snapshot import TABLES, prune, write_snapshot
+from movie_analysis.stages import ANALYSIS_STAGES
+
+DATA_DIR_ENV = 'MOVIE_ANALYSIS_DATA'
+
+
+def _load(args):
+    return load_all(args.data_dir, cache_dir=args.cache_dir)
+
+
+def _aggregate(args):
+    frames = prepare_frames(*_load(args))
+    cache = None
+    if not args.no_cache:
+        cache_dir = os.path.join(args.cache_dir or os.path.join(args.data_dir, '.movie_cache'),
+                                 'results')
+        cache = ResultCache(cache_dir)
+    return run_pipeline(ANALYSIS_STAGES, frames, workers=args.workers, cache=cache)
+
+
+def cmd_load(args):
+    names = ('bom_movie_gross', 'imdb_title_basics', 'tmdb_movies', 'tn_movie_budgets')
+    for name, frame in zip(names, _load(args)):
+        print('%-20s %9d rows %3d columns' % (name, len(frame), frame.shape[1]))
+    return 0
+
+
+def cmd_aggregate(args):
+    results = _aggregate(args)
+    outputs = [name for stage in ANALYSIS_STAGES for name in stage.outputs]
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+    for name in outputs:
+        value = results[name]
+        if not isinstance(value, (pd.DataFrame, pd.Series)):
+            print('%-24s %s' % (name, value))
+            continue
+        print('%-24s %d rows' % (name, len(value)))
+        if args.output:
+            value.to_csv(os.path.join(args.output, name + '.csv'))
+    return 0
+
+
+def cmd_report(args):
+    charts = chart_specs(_aggregate(args), args.scatter_mode)
+    files = render_charts(list(charts.values()), args.output_dir,
+                          formats=tuple(args.formats.split(',')), workers=args.workers)
+    for name, paths in files.items():
+        print(name, ', '.join(paths))
+    return 0
+
+
+def cmd_cube(args):
+    frames = prepare_frames(*_load(args))
+    cube = GenreYearCube.from_frames(frames['bom_movie_gross'], frames['imdb_title_basics'],
+                                     frames['tn_movie_budgets'])
+    cube.save(args.output)
+    print('%s: %d genres x %d years x %d studios, %d bytes'
+          % (args.output, len(cube.genres) - 1, len(cube.years), len(cube.studios) - 2,
+             cube.prefix.nbytes))
+    return 0
+
+
+def cmd_snapshot(args):
+    frames = prepare_frames(*_load(args))
+    stages = [stage for stage in ANALYSIS_STAGES if stage.name in ('bom_tmdb_join', 'budget_data')]
+    results = run_pipeline(stages, frames, workers=1)
+    version = write_snapshot(args.output, dict(zip(TABLES, (
+        results['merged_data'], frames['imdb_title_basics'], results['budget_data']))))
+    print('%s: published version %d' % (args.output, version))
+    if args.keep:
+        for removed in prune(args.output, keep=args.keep):
+            print('removed version %d' % removed)
+    return 0
+
+
+def cmd_serve(args):
+    from movie_analysis.service import serve
+
+    serve(args.data_dir, args.host, args.port, cache_dir=args.cache_dir)
+    return 0
+
+
+def build_parser():
+    """The ``movie-analysis`` argument parser."""
+    parser = argparse.ArgumentParser(prog='movie-analysis',
+                                     description='Microsoft movie studio analysis')
+    parser.add_argument('--data-dir', default=os.environ.get(DATA_DIR_ENV, '.'),
+                        help='directory holding the four source CSVs (default: $%s or .)'
+                        % DATA_DIR_ENV)
+    parser.add_argument('--cache-dir', default=None,
+                        help='Parquet and result cache directory (default: DATA_DIR/.movie_cache)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('load', help='parse the CSVs and print their shapes') \
+        .set_defaults(func=cmd_load)
+
+    def stage_options(sub):
+        sub.add_argument('--workers', type=int, default=1,
+                         help='processes used for the stages (and charts); default 1, in sequence')
+        sub.add_argument('--no-cache', action='store_true',
+                         help='recompute every stage instead of reusing cached results')
+
+    aggregate = commands.add_parser('aggregate', help='run the analysis stages')
+    stage_options(aggregate)
+    aggregate.add_argument('--output', default=None,
+                           help='directory to write every result table to as CSV')
+    aggregate.set_defaults(func=cmd_aggregate)
+
+    report = commands.add_parser('report', help='run the stages and render every chart')
+    stage_options(report)
+    report.add_argument('--output-dir', default='figures',
+                        help='directory the charts are written to')
+    report.add_argument('--formats', default='png',
+                        help='comma-separated image formats, e.g. png,svg')
+    report.add_argument('--scatter-mode', choices=SCATTER_MODES, default='points',
+                        help="how to draw the budget scatter; 'rasterized' or 'density' for large inputs")
+    report.set_defaults(func=cmd_report)
+
+    cube = commands.add_parser('cube', help='build the genre x year x studio cube and save it')
+    cube.add_argument('--output', default='cube',
+                      help='directory the cube is written to (memory-mapped by GenreYearCube.load)')
+    cube.set_defaults(func=cmd_cube)
+
+    snapshot = commands.add_parser('snapshot',
+                                   help='write a memory-mapped snapshot of the cleaned frames')
+    snapshot.add_argument('--output', default='snapshots',
+                          help='snapshot root; each run publishes a new version')
+    snapshot.add_argument('--keep', type=int, default=0,
+                          help='delete all but the newest KEEP versions (default: keep all)')
+    snapshot.set_defaults(func=cmd_snapshot)
+
+    serve = commands.add_parser('serve', help='serve aggregate queries over HTTP (needs aiohttp)')
+    serve.add_argument('--host', default='127.0.0.1', help='interface to listen on')
+    serve.add_argument('--port', type=int, default=8080, help='port to listen on')
+    serve.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
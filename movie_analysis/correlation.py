@@ -0,0 +1,259 @@
+"""Correlation between TMDB ratings and box office, by slice.
+
+``rating_box_office`` joins the TMDB ``vote_average``/``vote_count`` of each
+Box Office Mojo film to its domestic, foreign and worldwide gross once.
+``CorrelationIndex`` then reduces the rows to sufficient statistics, so
+correlations for any genre/studio/year slice are sums over stored arrays
+rather than a pass over the rows:
+
+* every (genre combination, studio, year) cell keeps, per gross column,
+  ``n, Σx, Σy, Σx², Σy², Σxy`` and the same sums weighted by
+  ``vote_count``.  A film has one genre combination ("Action,Adventure"),
+  so a query over several genres sums each film's cell once.
+* single-value slices (one genre, one studio, one year, or everything)
+  are precomputed, including their Spearman correlation from within-slice
+  average ranks, so they are O(1) lookups and ``table`` is O(slices).
+
+Pearson and weighted correlations for any other combination of filters
+sum the matching cells (O(cells)).  Spearman needs ranks within the slice,
+so for those it ranks the slice's rows, which are stored contiguously by
+cell.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from movie_analysis.genres import GenreIndex
+from movie_analysis.titles import UNMATCHED, link
+
+RATING = 'vote_average'
+WEIGHT = 'vote_count'
+METRICS = ('domestic_gross', 'foreign_gross', 'worldwide_gross')
+DIMENSIONS = ('genre', 'studio', 'year')
+
+# Order of the sums stored per cell and metric.
+_N, _X, _Y, _XX, _YY, _XY, _W, _WX, _WY, _WXX, _WYY, _WXY = range(12)
+
+
+class Correlation(NamedTuple):
+    """Correlations between rating and one gross column over a slice."""
+
+    n: int
+    pearson: float
+    spearman: float
+    weighted: float
+
+
+def rating_box_office(merged_data, imdb_title_basics, tn_movie_budgets):
+    """One row per BOM film matched to TMDB, with ratings, grosses and genres.
+
+    ``merged_data`` is the BOM/TMDB join of In[5].  Genres come from the IMDB
+    title with the same movie id.  ``worldwide_gross`` is The Numbers'
+    figure where the film is in The Numbers, else BOM domestic + foreign.
+    """
+    genre_pos, _ = link(merged_data['movie_id'], imdb_title_basics['movie_id'])
+    tn_pos, _ = link(merged_data['movie_id'], tn_movie_budgets['movie_id'])
+
+    def take(column, positions):
+        values = pd.Series(column.to_numpy()[positions], dtype=column.dtype)
+        return values.where(positions != UNMATCHED)
+
+    domestic = merged_data['domestic_gross'].to_numpy(dtype=float)
+    foreign = merged_data['foreign_gross'].to_numpy(dtype=float)
+    worldwide = take(tn_movie_budgets['worldwide_gross'], tn_pos).to_numpy(dtype=float)
+    return pd.DataFrame({
+        'movie_id': merged_data['movie_id'].to_numpy(),
+        'studio': merged_data['studio'].to_numpy(),
+        'year': merged_data['year'].to_numpy(),
+        'genres': take(imdb_title_basics['genres'].astype(object), genre_pos).to_numpy(),
+        RATING: merged_data[RATING].to_numpy(dtype=float),
+        WEIGHT: merged_data[WEIGHT].to_numpy(dtype=float),
+        'domestic_gross': domestic,
+        'foreign_gross': foreign,
+        'worldwide_gross': np.where(np.isnan(worldwide), domestic + foreign, worldwide),
+    })
+
+
+def _average_ranks(values):
+    # 1-based ranks with ties given their average rank, as in Spearman's rho.
+    _, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    ends = np.cumsum(counts)
+    return (ends - (counts - 1) / 2.0)[inverse]
+
+
+def _pearson(s, weighted=False):
+    # Correlation from sums (the last axis of ``s`` indexed by the _N.. constants).
+    if weighted:
+        n, x, y, xx, yy, xy = (s[..., i] for i in (_W, _WX, _WY, _WXX, _WYY, _WXY))
+    else:
+        n, x, y, xx, yy, xy = (s[..., i] for i in (_N, _X, _Y, _XX, _YY, _XY))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = xy - x * y / n
+        var = (xx - x * x / n) * (yy - y * y / n)
+        return np.where((s[..., _N] > 1) & (var > 0), cov / np.sqrt(var), np.nan)
+
+
+def _spearman(x, y):
+    if x.size < 2:
+        return np.nan
+    rx, ry = _average_ranks(x), _average_ranks(y)
+    rx -= rx.mean()
+    ry -= ry.mean()
+    denom = np.sqrt((rx @ rx) * (ry @ ry))
+    return float(rx @ ry / denom) if denom > 0 else np.nan
+
+
+class CorrelationIndex:
+    """Per-cell sufficient statistics of rating vs. gross.
+
+    Build it with ``from_frame(rating_box_office(...))``.  ``correlate``
+    answers one slice; ``table`` gives every value of one dimension.
+    """
+
+    def __init__(self, frame):
+        frame = frame.reset_index(drop=True)
+        genres = frame['genres'].astype('category')
+        studios = frame['studio'].astype('category')
+        combo_codes = genres.cat.codes.to_numpy()
+        studio_codes = studios.cat.codes.to_numpy()
+        year_codes, self.years = pd.factorize(frame['year'], sort=True)
+
+        # Genre combinations and their genres; code -1 (no genre) becomes an
+        # extra trailing combination with no genres.
+        self.combos = GenreIndex.from_series(pd.Series(list(genres.cat.categories) + [None]))
+        self.studios = pd.Index(studios.cat.categories, name='studio')
+        self.years = pd.Index(self.years, name='year')
+        combo_codes = np.where(combo_codes >= 0, combo_codes, len(self.combos) - 1)
+        studio_codes = np.where(studio_codes >= 0, studio_codes, len(self.studios))
+        year_codes = np.where(year_codes >= 0, year_codes, len(self.years))
+
+        # Cells, with rows sorted by cell so each cell's rows are contiguous.
+        n_studio, n_year = len(self.studios) + 1, len(self.years) + 1
+        flat = (combo_codes.astype(np.int64) * n_studio + studio_codes) * n_year + year_codes
+        cells, row_cell = np.unique(flat, return_inverse=True)
+        order = np.argsort(row_cell, kind='stable')
+        self.cell_combo = cells // (n_studio * n_year)
+        self.cell_studio = cells // n_year % n_studio
+        self.cell_year = cells % n_year
+        self.cell_ptr = np.concatenate(([0], np.cumsum(np.bincount(row_cell, minlength=len(cells)))))
+
+        x = frame[RATING].to_numpy(dtype=float)[order]
+        w = frame[WEIGHT].to_numpy(dtype=float)[order]
+        ys = [frame[m].to_numpy(dtype=float)[order] for m in METRICS]
+        self.x, self.w, self.ys = x, w, ys
+        self.stats = self._sums(row_cell[order], len(cells))
+        self._slices = self._precompute()
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Index the output of ``rating_box_office``."""
+        return cls(frame)
+
+    def _valid(self, m):
+        return np.isfinite(self.x) & np.isfinite(self.ys[m])
+
+    def _sums(self, row_cell, n_cells):
+        # (cells, metrics, 12) sums.  Values are centred on their overall
+        # means first, which keeps the Σx² - (Σx)²/n differences accurate.
+        stats = np.zeros((n_cells, len(METRICS), 12))
+        for m, y in enumerate(self.ys):
+            ok = self._valid(m)
+            if not ok.any():
+                continue
+            cx = self.x[ok] - self.x[ok].mean()
+            cy = y[ok] - y[ok].mean()
+            w = np.nan_to_num(self.w[ok])
+            cells = row_cell[ok]
+            terms = (np.ones_like(cx), cx, cy, cx * cx, cy * cy, cx * cy)
+            for i, term in enumerate(terms):
+                stats[:, m, i] = np.bincount(cells, weights=term, minlength=n_cells)
+                stats[:, m, i + 6] = np.bincount(cells, weights=w * term, minlength=n_cells)
+        return stats
+
+    def _cell_mask(self, genres=None, studios=None, years=None):
+        mask = np.ones(len(self.cell_combo), dtype=bool)
+        if genres is not None:
+            allowed = np.zeros(len(self.combos), dtype=bool)
+            for genre in [genres] if isinstance(genres, str) else genres:
+                if genre in self.combos.genres:
+                    allowed |= self.combos.mask(genre)
+            mask &= allowed[self.cell_combo]
+        if studios is not None:
+            allowed = np.append(self.studios.isin([studios] if isinstance(studios, str)
+                                                  else studios), False)
+            mask &= allowed[self.cell_studio]
+        if years is not None:
+            if isinstance(years, tuple):
+                lo, hi = years
+                allowed = (self.years >= lo) & (self.years <= hi)
+            else:
+                allowed = self.years.isin(np.atleast_1d(years))
+            mask &= np.append(allowed, False)[self.cell_year]
+        return mask
+
+    def _rows(self, cell_mask):
+        cells = np.flatnonzero(cell_mask)
+        starts, stops = self.cell_ptr[cells], self.cell_ptr[cells + 1]
+        lengths = stops - starts
+        return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+    def _correlations(self, stats, rows):
+        # {metric: Correlation} for summed stats over the given rows.
+        out = {}
+        for m, metric in enumerate(METRICS):
+            valid = rows[self._valid(m)[rows]]
+            out[metric] = Correlation(int(stats[m, _N]), float(_pearson(stats[m])),
+                                      _spearman(self.x[valid], self.ys[m][valid]),
+                                      float(_pearson(stats[m], weighted=True)))
+        return out
+
+    def _precompute(self):
+        # {(dimension, value): {metric: Correlation}} for every single-value
+        # slice, plus (None, None) for all films.
+        slices = {(None, None): self._correlations(self.stats.sum(axis=0),
+                                                   np.arange(len(self.x)))}
+        for dimension, values in (('genre', self.combos.genres), ('studio', self.studios),
+                                  ('year', self.years)):
+            for value in values:
+                mask = self._cell_mask(**{dimension + 's': [value]})
+                slices[(dimension, value)] = self._correlations(
+                    self.stats[mask].sum(axis=0), self._rows(mask))
+        return slices
+
+    def correlate(self, metric='worldwide_gross', genres=None, studios=None, years=None):
+        """Rating vs. ``metric`` correlation over the films matching every filter.
+
+        ``genres`` and ``studios`` are one name or a list (a film matches if it
+        has any of the genres); ``years`` is one year, a list, or an inclusive
+        ``(first, last)`` tuple.  Returns a ``Correlation``; fewer than two
+        films give NaN correlations.
+        """
+        if metric not in METRICS:
+            raise ValueError('metric must be one of %s' % ', '.join(METRICS))
+        filters = {'genre': genres, 'studio': studios, 'year': years}
+        given = [(d, v) for d, v in filters.items() if v is not None]
+        if not given:
+            return self._slices[(None, None)][metric]
+        if len(given) == 1:
+            dimension, value = given[0]
+            if not isinstance(value, (list, tuple, np.ndarray, pd.Index)):
+                value = [value]
+            if len(value) == 1 and not isinstance(value, tuple) \
+                    and (dimension, value[0]) in self._slices:
+                return self._slices[(dimension, value[0])][metric]
+        mask = self._cell_mask(genres, studios, years)
+        return self._correlations(self.stats[mask].sum(axis=0), self._rows(mask))[metric]
+
+    def table(self, by='genre', metric='worldwide_gross'):
+        """Correlation for every value of ``by`` ('genre', 'studio' or 'year')."""
+        if by not in DIMENSIONS:
+            raise ValueError('by must be one of %s' % ', '.join(DIMENSIONS))
+        if metric not in METRICS:
+            raise ValueError('metric must be one of %s' % ', '.join(METRICS))
+        rows = {value: self._slices[(dimension, value)][metric]
+                for (dimension, value) in self._slices if dimension == by}
+        result = pd.DataFrame.from_dict(rows, orient='index', columns=Correlation._fields)
+        result.index.name = by
+        return result.sort_values('n', ascending=False)
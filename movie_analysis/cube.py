@@ -0,0 +1,278 @@
+"""Genre x year x studio cube with prefix sums along the year axis.
+
+The genre heatmap (In[25]) and the yearly revenue series (In[12]) are
+group-bys over the rows, recomputed for every filter.  ``GenreYearCube``
+aggregates the rows once into a dense cube of
+
+* ``titles``: IMDB titles, by ``start_year``;
+* ``domestic_gross``: Box Office Mojo domestic gross, by BOM ``year``;
+* ``worldwide_gross``: The Numbers worldwide gross, by release year;
+
+indexed by genre, year and studio.  Rows are linked through ``movie_id``:
+a BOM film takes its genres from the matching IMDB title, an IMDB title
+takes its studio from the matching BOM film, and a Numbers film takes both.
+A film is counted under each of its genres, as in the notebook's stacked
+genre tables, and films with no known studio go to an unnamed studio
+slot.  Two extra slots hold the totals over all genres (every film once)
+and over all studios, so unfiltered queries need no summing.
+
+The cube stores cumulative sums along the year axis, with a leading
+zero year.  A year-range total is the difference of two year planes, so a
+query costs O(selected genres x selected studios) whatever the range.
+
+``save`` writes the cube as an ``.npy`` file plus a JSON file of axis
+labels into a fresh ``vNNNNNN`` version directory and publishes it with
+``snapshot.publish``: ``CURRENT`` is replaced atomically, under the
+snapshot lock and only ever by a newer version, so a reader never pairs a
+new array with old axes and concurrent saves end at the newest cube.
+Version directories get ``snapshot.DIR_MODE``, not the owner-only mode of
+``tempfile.mkdtemp``.
+``load`` memory-maps the array read-only, so every process on the host
+shares one copy of the pages through the OS cache.
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from movie_analysis.genres import GenreIndex
+from movie_analysis.snapshot import (CURRENT, claim_version, publish, temporary_version,
+                                     version_name)
+from movie_analysis.titles import UNMATCHED, link, year_from_date
+
+MEASURES = ('titles', 'domestic_gross', 'worldwide_gross')
+ALL = '(all)'
+NO_STUDIO = ''
+
+_ARRAY_FILE = 'cube.npy'
+_AXES_FILE = 'axes.json'
+
+
+def _linked(values, positions):
+    # values[positions], with missing values where positions is UNMATCHED.
+    values = np.asarray(values, dtype=object)
+    return np.where(positions != UNMATCHED, values[positions], None)
+
+
+def _published(path):
+    # The version directory CURRENT names, or None if there is none.
+    try:
+        with open(os.path.join(path, CURRENT)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+class GenreYearCube:
+    """Prefix-summed (measure, year, genre, studio) cube.
+
+    Attributes
+    ----------
+    prefix : np.ndarray
+        ``prefix[m, i, g, s]`` is the total of measure ``MEASURES[m]`` over
+        the years before ``years[i]``; the year axis has one more entry than
+        ``years``.  The last genre is ``ALL`` and the last two studios are
+        ``NO_STUDIO`` and ``ALL``.
+    genres, studios : pd.Index
+        Axis labels, including the trailing slots.
+    first_year : int
+        Year of the first plane; the years are contiguous.
+    """
+
+    def __init__(self, prefix, genres, studios, first_year):
+        self.prefix = prefix
+        self.genres = pd.Index(genres, name='genre')
+        self.studios = pd.Index(studios, name='studio')
+        self.first_year = int(first_year)
+        # Positions of the named labels (not the ALL slot), for lookups.
+        self._codes = {axis: {label: i for i, label in enumerate(labels[:-1])}
+                       for axis, labels in (('genre', self.genres), ('studio', self.studios))}
+
+    @classmethod
+    def from_frames(cls, bom_movie_gross, imdb_title_basics, tn_movie_budgets):
+        """Build the cube from movie_id-resolved frames (see ``report.prepare_frames``)."""
+        imdb_genres = imdb_title_basics['genres'].to_numpy(dtype=object)
+        bom_studios = bom_movie_gross['studio'].to_numpy(dtype=object)
+        bom_ids, imdb_ids = bom_movie_gross['movie_id'], imdb_title_basics['movie_id']
+        tn_ids = tn_movie_budgets['movie_id']
+
+        # (years, genres, studios, weights) of the rows behind each measure.
+        sources = [
+            (imdb_title_basics['start_year'], imdb_genres,
+             _linked(bom_studios, link(imdb_ids, bom_ids)[0]), None),
+            (bom_movie_gross['year'], _linked(imdb_genres, link(bom_ids, imdb_ids)[0]),
+             bom_studios, bom_movie_gross['domestic_gross']),
+            (year_from_date(tn_movie_budgets['release_date']),
+             _linked(imdb_genres, link(tn_ids, imdb_ids)[0]),
+             _linked(bom_studios, link(tn_ids, bom_ids)[0]), tn_movie_budgets['worldwide_gross']),
+        ]
+        years = pd.concat([pd.Series(np.asarray(y, dtype=float)) for y, _, _, _ in sources])
+        first, last = int(years.min()), int(years.max())
+        genres = GenreIndex.from_series(pd.Series(imdb_genres)).genres
+        studios = pd.Index(sorted(set(bom_movie_gross['studio'].dropna())))
+
+        n_genres, n_studios = len(genres) + 1, len(studios) + 2
+        cube = np.zeros((len(MEASURES), last - first + 2, n_genres, n_studios))
+        for m, (row_years, row_genres, row_studios, weights) in enumerate(sources):
+            row_years = np.asarray(row_years, dtype=float)
+            values = np.ones(len(row_years)) if weights is None \
+                else np.asarray(weights, dtype=float)
+            keep = ~np.isnan(row_years) & ~np.isnan(values)
+            year_codes = np.where(keep, row_years, first).astype(np.int64) - first + 1
+            studio_codes = studios.get_indexer(row_studios)
+            studio_codes[studio_codes < 0] = len(studios)
+            # Every film once in the ALL genre plane, then once per genre.
+            flat = (year_codes * n_genres + len(genres)) * n_studios + studio_codes
+            index = GenreIndex.from_series(pd.Series(row_genres))
+            rows = index.row_ids
+            genre_codes = genres.get_indexer(index.genres)[index.indices]
+            per_genre = (year_codes[rows] * n_genres + genre_codes) * n_studios + studio_codes[rows]
+            flat = np.concatenate([flat[keep], per_genre[keep[rows]]])
+            weight = np.concatenate([values[keep], values[rows][keep[rows]]])
+            cube[m] = np.bincount(flat, weights=weight, minlength=cube[m].size) \
+                .reshape(cube[m].shape)
+        cube[..., -1] = cube[..., :-1].sum(axis=-1)
+        np.cumsum(cube, axis=1, out=cube)
+        return cls(cube, genres.append(pd.Index([ALL])),
+                   studios.append(pd.Index([NO_STUDIO, ALL])), first)
+
+    @property
+    def years(self):
+        """The cube's years, as an Index."""
+        return pd.RangeIndex(self.first_year, self.first_year + self.prefix.shape[1] - 1,
+                             name='year')
+
+    def save(self, path):
+        """Write the cube under directory ``path`` and publish it; returns its version.
+
+        ``cube.npy`` and ``axes.json`` go into a new ``vNNNNNN`` directory,
+        which ``CURRENT`` is then switched to with one ``os.replace``, unless
+        a concurrent save already published a newer cube.  Older versions
+        are removed; processes that have them mapped keep reading them.
+        """
+        os.makedirs(path, exist_ok=True)
+        axes = {'measures': list(MEASURES), 'genres': list(self.genres),
+                'studios': list(self.studios), 'first_year': self.first_year,
+                'shape': list(self.prefix.shape)}
+        tmp = temporary_version(path)
+        try:
+            np.save(os.path.join(tmp, _ARRAY_FILE), self.prefix)
+            with open(os.path.join(tmp, _AXES_FILE), 'w') as f:
+                json.dump(axes, f)
+            version = claim_version(path, tmp, marker=_AXES_FILE)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+        if not publish(path, version, marker=_AXES_FILE, drop_older=True):
+            # A newer cube is out; this version can never become current.
+            shutil.rmtree(os.path.join(path, version_name(version)), ignore_errors=True)
+        return version
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Open the cube published under ``path``, memory-mapped read-only unless ``mmap=False``.
+
+        A directory without ``CURRENT`` is read as a single unversioned cube.
+        """
+        while True:
+            version = _published(path)
+            directory = path if version is None else os.path.join(path, version)
+            try:
+                with open(os.path.join(directory, _AXES_FILE)) as f:
+                    axes = json.load(f)
+                prefix = np.load(os.path.join(directory, _ARRAY_FILE),
+                                 mmap_mode='r' if mmap else None)
+                break
+            except FileNotFoundError:
+                # A newer save removed this version after we read CURRENT.
+                if version is None or _published(path) == version:
+                    raise
+        if list(prefix.shape) != axes['shape'] or axes['measures'] != list(MEASURES):
+            raise ValueError('%s: cube and axes files do not match' % directory)
+        return cls(prefix, axes['genres'], axes['studios'], axes['first_year'])
+
+    def _measure(self, measure):
+        if measure not in MEASURES:
+            raise ValueError('measure must be one of %s' % ', '.join(MEASURES))
+        return MEASURES.index(measure)
+
+    def _span(self, years):
+        # Year planes [lo, hi] of the prefix sums for one year or an
+        # inclusive (first, last) tuple, clipped to the cube.
+        if years is None:
+            return 0, self.prefix.shape[1] - 1
+        first, last = years if isinstance(years, tuple) else (years, years)
+        n = self.prefix.shape[1] - 1
+        lo = min(max(int(first) - self.first_year, 0), n)
+        hi = min(max(int(last) - self.first_year + 1, 0), n)
+        return lo, max(lo, hi)
+
+    def _positions(self, axis, selected, every=False):
+        # Positions of the selected labels (a slice where possible).  None
+        # selects the trailing ALL slot, or every other slot with ``every``.
+        codes = self._codes[axis]
+        if selected is None:
+            return slice(0, len(codes)) if every else slice(len(codes), None)
+        selected = [selected] if isinstance(selected, str) else selected
+        return np.array([codes[label] for label in selected if label in codes], dtype=np.intp)
+
+    def _range(self, m, years, genre_pos, studio_pos):
+        # (genres, studios) totals over the year range.
+        lo, hi = self._span(years)
+        return self.prefix[m, hi][genre_pos][:, studio_pos] \
+            - self.prefix[m, lo][genre_pos][:, studio_pos]
+
+    def _planes(self, m, years, genre_pos, studio_pos):
+        # (lo, hi, prefix planes lo..hi restricted to the selection).
+        lo, hi = self._span(years)
+        return lo, hi, self.prefix[m, lo:hi + 1][:, genre_pos][:, :, studio_pos]
+
+    def total(self, measure='domestic_gross', genres=None, studios=None, years=None):
+        """Total of ``measure`` over the films matching every filter.
+
+        ``genres`` and ``studios`` are one name or a list; unknown names are
+        ignored.  ``years`` is one year or an inclusive ``(first, last)``
+        tuple.  With several genres, a film in two of them counts twice.
+        """
+        genre_pos = self._positions('genre', genres)
+        studio_pos = self._positions('studio', studios)
+        return float(self._range(self._measure(measure), years, genre_pos, studio_pos).sum())
+
+    def by_genre(self, measure='domestic_gross', studios=None, years=None, genres=None):
+        """``measure`` per genre over the studio and year filters."""
+        genre_pos = self._positions('genre', genres, every=True)
+        studio_pos = self._positions('studio', studios)
+        totals = self._range(self._measure(measure), years, genre_pos, studio_pos).sum(axis=1)
+        return pd.Series(totals, index=self.genres[genre_pos], name=measure)
+
+    def by_studio(self, measure='domestic_gross', genres=None, years=None, studios=None):
+        """``measure`` per studio over the genre and year filters.
+
+        The unnamed studio slot holds films with no matching BOM studio.
+        """
+        genre_pos = self._positions('genre', genres)
+        studio_pos = self._positions('studio', studios, every=True)
+        totals = self._range(self._measure(measure), years, genre_pos, studio_pos).sum(axis=0)
+        return pd.Series(totals, index=self.studios[studio_pos], name=measure)
+
+    def series(self, measure='domestic_gross', genres=None, studios=None, years=None):
+        """``measure`` by year over the genre and studio filters."""
+        lo, hi, planes = self._planes(self._measure(measure), years,
+                                      self._positions('genre', genres),
+                                      self._positions('studio', studios))
+        values = np.diff(planes.sum(axis=(1, 2)))
+        return pd.Series(values, index=self.years[lo:hi], name=measure)
+
+    def table(self, measure='titles', studios=None, years=None):
+        """Genre x year table of ``measure``; with 'titles' this is ``genre_year_count``."""
+        genre_pos = self._positions('genre', None, every=True)
+        lo, hi, planes = self._planes(self._measure(measure), years, genre_pos,
+                                      self._positions('studio', studios))
+        values = np.diff(planes.sum(axis=2), axis=0).T
+        if measure == 'titles':
+            values = values.round().astype(np.int64)
+        return pd.DataFrame(values, index=self.genres[genre_pos], columns=self.years[lo:hi])
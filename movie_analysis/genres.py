@@ -0,0 +1,144 @@
+"""Sparse genre membership index for the comma-separated ``genres`` column.
+
+The notebook used ``str.split(',', expand=True).stack()`` and a join to get
+one row per (title, genre), which copies every other column once per genre.
+``GenreIndex`` keeps the titles as they are and stores which genres each row
+belongs to as a CSR matrix (``indptr``/``indices`` arrays, one row per title,
+one column per genre).  Counts and revenue sums per genre are bincounts over
+that matrix, so no rows are ever duplicated.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class GenreIndex:
+    """Genre vocabulary plus a CSR row -> genre membership matrix.
+
+    Attributes
+    ----------
+    genres : pd.Index
+        Sorted genre vocabulary; column ``j`` of the matrix is ``genres[j]``.
+    keys : pd.Index
+        Row labels (e.g. ``tconst``), aligned with the input rows.
+    indptr, indices : np.ndarray
+        CSR structure.  Row ``i`` belongs to the genres
+        ``indices[indptr[i]:indptr[i + 1]]``.
+    """
+
+    def __init__(self, genres, keys, indptr, indices):
+        self.genres = genres
+        self.keys = keys
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def from_series(cls, genres, keys=None, sep=','):
+        """Build the index from a Series of ``sep``-joined genre strings.
+
+        Missing values give a row with no genres.  Only the distinct genre
+        strings are split in Python; rows are mapped to them through
+        categorical codes.
+        """
+        genres = pd.Series(genres, copy=False)
+        combos = genres.astype('category')
+        codes = combos.cat.codes.to_numpy()
+
+        # Split each distinct combination once and build a small CSR over
+        # the combinations.
+        split = [str(c).split(sep) for c in combos.cat.categories]
+        vocab = pd.Index(sorted({g for parts in split for g in parts}), name='genre')
+        combo_indices = vocab.get_indexer(
+            [g for parts in split for g in parts]).astype(np.int32)
+        # A trailing empty combination stands in for missing values.
+        combo_lengths = np.array([len(p) for p in split] + [0], dtype=np.int64)
+        combo_starts = np.concatenate(([0], np.cumsum(combo_lengths)[:-1]))
+        codes = np.where(codes >= 0, codes, len(split))
+
+        # Expand to one CSR row per input row.
+        row_lengths = combo_lengths[codes]
+        indptr = np.zeros(len(codes) + 1, dtype=np.int64)
+        np.cumsum(row_lengths, out=indptr[1:])
+        offsets = np.arange(indptr[-1]) - np.repeat(indptr[:-1], row_lengths)
+        indices = combo_indices[np.repeat(combo_starts[codes], row_lengths) + offsets]
+
+        keys = pd.Index(keys if keys is not None else genres.index)
+        return cls(vocab, keys, indptr, indices)
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def __repr__(self):
+        return 'GenreIndex(%d rows, %d genres)' % (len(self), len(self.genres))
+
+    @property
+    def row_ids(self):
+        """Row position of every stored (row, genre) entry."""
+        return np.repeat(np.arange(len(self)), np.diff(self.indptr))
+
+    def to_scipy(self):
+        """Return the membership matrix as a ``scipy.sparse.csr_matrix``."""
+        from scipy import sparse
+
+        data = np.ones(len(self.indices), dtype=np.int8)
+        return sparse.csr_matrix((data, self.indices, self.indptr),
+                                 shape=(len(self), len(self.genres)))
+
+    def take(self, positions):
+        """Index of the rows at ``positions`` (e.g. the IMDB rows a join matched)."""
+        positions = np.asarray(positions, dtype=np.int64)
+        lengths = np.diff(self.indptr)[positions]
+        indptr = np.zeros(len(positions) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        offsets = np.arange(indptr[-1]) - np.repeat(indptr[:-1], lengths)
+        indices = self.indices[np.repeat(self.indptr[positions], lengths) + offsets]
+        return type(self)(self.genres, self.keys[positions], indptr, indices)
+
+    def mask(self, genre):
+        """Boolean mask of the rows tagged with ``genre``."""
+        j = self.genres.get_loc(genre)
+        out = np.zeros(len(self), dtype=bool)
+        out[self.row_ids[self.indices == j]] = True
+        return out
+
+    def counts(self):
+        """Number of rows per genre, largest first (``genre_distribution``)."""
+        counts = np.bincount(self.indices, minlength=len(self.genres))
+        result = pd.Series(counts, index=self.genres, name='count')
+        return result[result > 0].sort_values(ascending=False)
+
+    def sum_by_genre(self, values):
+        """Sum a per-row value over the rows of each genre.
+
+        NaN values are skipped like in ``groupby().sum()``, so a genre
+        whose rows all have missing values totals 0.0.  Genres without any
+        row are left out, matching a groupby over an inner join.  Sorted
+        largest first.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        row_values = np.repeat(values, np.diff(self.indptr))
+        present = ~np.isnan(row_values)
+        n = len(self.genres)
+        totals = np.bincount(self.indices[present],
+                             weights=row_values[present], minlength=n)
+        seen = np.bincount(self.indices, minlength=n) > 0
+        result = pd.Series(totals, index=self.genres)[seen]
+        return result.sort_values(ascending=False)
+
+    def crosstab(self, labels):
+        """Genre x label count table (e.g. ``genre_year_count`` by start_year).
+
+        Equivalent to ``groupby(['genre', labels]).size().unstack(fill_value=0)``
+        on the exploded frame.
+        """
+        labels = pd.Series(labels, copy=False)
+        label_codes, label_values = pd.factorize(labels, sort=True)
+        row_labels = np.repeat(label_codes, np.diff(self.indptr))
+        keep = row_labels >= 0
+        n_labels = len(label_values)
+        flat = self.indices[keep].astype(np.int64) * n_labels + row_labels[keep]
+        table = np.bincount(flat, minlength=len(self.genres) * n_labels)
+        table = table.reshape(len(self.genres), n_labels)
+        used = table.sum(axis=1) > 0
+        columns = pd.Index(label_values, name=labels.name)
+        return pd.DataFrame(table[used], index=self.genres[used], columns=columns)
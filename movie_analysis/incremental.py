@@ -0,0 +1,316 @@
+"""Incremental maintenance of the box-office aggregates.
+
+``AggregateState`` holds the aggregates behind the notebook's charts:
+domestic gross per studio and per (studio, year), the studio ranking behind
+``top_50_studios``, domestic gross per genre and genre x year title counts.
+It also holds enough per-movie detail to retract a movie's old
+contribution.  A delta of new, changed or deleted rows is applied by
+subtracting what the affected movies contributed before and adding what
+they contribute now.  Only the movies named in the delta are touched;
+history is never rescanned.
+
+Box-office rows are keyed by (normalized title, year), as in
+``movie_analysis.titles``.  A delta row replaces every stored row with the
+same key, and a truthy ``deleted`` column removes the key.  Genre matching
+follows ``join_on_ids``: a movie's gross counts towards the genres of its
+IMDB title only when exactly one IMDB title resolves to it.  The match is
+recomputed for just the titles a delta touches.
+"""
+
+import bisect
+import json
+import os
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from movie_analysis.cleaning import normalize_money
+from movie_analysis.genres import GenreIndex
+from movie_analysis.stages import TOP_STUDIOS
+from movie_analysis.titles import UNMATCHED, TitleIndex, link, normalize_titles
+
+
+def _add(table, key, gross, count, rows):
+    # table[key] is [gross sum, non-missing gross count, row count].
+    entry = table[key]
+    entry[0] += gross
+    entry[1] += count
+    entry[2] += rows
+    if entry[2] <= 0:
+        del table[key]
+
+
+def _nan_sum(values):
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values)
+    return float(values[present].sum()), int(present.sum())
+
+
+def read_delta(path):
+    """Read a box-office delta CSV (bom.movie_gross.csv columns, plus an
+    optional ``deleted`` column) with money columns parsed."""
+    delta = pd.read_csv(path)
+    return normalize_money(delta, ['domestic_gross', 'foreign_gross'])
+
+
+class AggregateState:
+    """Persistent, incrementally updatable rollup state."""
+
+    def __init__(self):
+        # (title, year) -> {studio: [gross, count, rows]}
+        self.movies = {}
+        # (title, year) -> genres string of the single matching IMDB title
+        self.movie_genres = {}
+        # title -> years of the movies with that title
+        self.title_years = defaultdict(set)
+        self.studio_year = defaultdict(lambda: [0.0, 0, 0])
+        self.studio_totals = defaultdict(lambda: [0.0, 0, 0])
+        self.genre_gross = defaultdict(lambda: [0.0, 0, 0])
+        self.genre_year = defaultdict(int)
+        # Sorted (-gross, studio) pairs: the studio ranking, and the gross
+        # each studio is currently ranked by.
+        self._ranking = []
+        self._ranked = {}
+        # IMDB titles with genres, sorted by normalized title.
+        self.imdb = pd.DataFrame({'title': pd.Series(dtype=object),
+                                  'tconst': pd.Series(dtype=object),
+                                  'start_year': pd.Series(dtype=np.int64),
+                                  'genres': pd.Series(dtype=object)})
+
+    # -- building ---------------------------------------------------------
+
+    @classmethod
+    def from_frames(cls, bom_movie_gross, imdb_title_basics):
+        """Build the state from full Box Office Mojo and IMDB frames."""
+        state = cls()
+        imdb = imdb_title_basics.dropna(subset=['genres'])
+        state.imdb = pd.DataFrame({
+            'title': normalize_titles(imdb['primary_title']).to_numpy(),
+            'tconst': imdb['tconst'].astype(object).to_numpy(),
+            'start_year': imdb['start_year'].to_numpy(dtype=np.int64),
+            'genres': imdb['genres'].astype(object).to_numpy(),
+        }).sort_values(['title', 'tconst'], ignore_index=True)
+        counts = GenreIndex.from_series(state.imdb['genres']).crosstab(state.imdb['start_year'])
+        counts = counts.stack()
+        state.genre_year.update((k, int(n)) for k, n in counts[counts > 0].items())
+
+        rows = pd.DataFrame({
+            'title': normalize_titles(bom_movie_gross['title']).to_numpy(),
+            'year': bom_movie_gross['year'].to_numpy(dtype=np.int64),
+            'studio': bom_movie_gross['studio'].astype(object).to_numpy(),
+            'domestic_gross': bom_movie_gross['domestic_gross'].to_numpy(dtype=np.float64),
+        }).dropna(subset=['title'])
+        parts = (rows.groupby(['title', 'year', 'studio'], dropna=False)['domestic_gross']
+                 .agg(['sum', 'count', 'size']))
+        for (title, year, studio), gross, count, n in parts.itertuples(name=None):
+            studio = None if pd.isna(studio) else studio
+            state.movies.setdefault((title, year), {})[studio] = [gross, count, n]
+            state.title_years[title].add(year)
+            state._add_studio(studio, year, gross, count, n)
+        state._rerank(set(state.studio_totals))
+        state._match(set(state.title_years))
+        return state
+
+    # -- deltas -----------------------------------------------------------
+
+    def apply_delta(self, delta):
+        """Apply new/changed/deleted box-office rows (see module docstring)."""
+        self._upsert(delta)
+
+    def _upsert(self, rows):
+        rows = pd.DataFrame({
+            'title': normalize_titles(rows['title']).to_numpy(),
+            'year': pd.to_numeric(rows['year']).to_numpy(dtype=np.int64),
+            'studio': rows['studio'].astype(object).to_numpy(),
+            'domestic_gross': rows['domestic_gross'].to_numpy(dtype=np.float64),
+            'deleted': (rows['deleted'].fillna(False).astype(bool).to_numpy()
+                        if 'deleted' in rows else np.zeros(len(rows), dtype=bool)),
+        }).dropna(subset=['title'])
+
+        titles = set(rows['title'])
+        self._unmatch(titles)
+        touched_studios = set()
+        for key, group in rows.groupby(['title', 'year'], sort=False):
+            old = self.movies.pop(key, {})
+            self.title_years[key[0]].discard(key[1])
+            for studio, (gross, count, n) in old.items():
+                self._add_studio(studio, key[1], -gross, -count, -n)
+                touched_studios.add(studio)
+            if group['deleted'].any():
+                continue
+            new = {}
+            for studio, part in group.groupby('studio', dropna=True, sort=False):
+                gross, count = _nan_sum(part['domestic_gross'])
+                new[studio] = [gross, count, len(part)]
+                self._add_studio(studio, key[1], gross, count, len(part))
+                touched_studios.add(studio)
+            # Rows without a studio still belong to the movie.
+            no_studio = group[group['studio'].isna()]
+            if len(no_studio):
+                gross, count = _nan_sum(no_studio['domestic_gross'])
+                new[None] = [gross, count, len(no_studio)]
+            self.movies[key] = new
+            self.title_years[key[0]].add(key[1])
+        self._rerank(touched_studios)
+        self._match(titles)
+
+    def _add_studio(self, studio, year, gross, count, rows):
+        if studio is None:
+            return
+        _add(self.studio_year, (studio, year), gross, count, rows)
+        _add(self.studio_totals, studio, gross, count, rows)
+
+    def _rerank(self, studios):
+        # Move only the studios whose totals changed: O(log n) to find each.
+        for studio in studios:
+            if studio in self._ranked:
+                entry = (self._ranked.pop(studio), studio)
+                del self._ranking[bisect.bisect_left(self._ranking, entry)]
+            if studio in self.studio_totals:
+                gross = -self.studio_totals[studio][0]
+                bisect.insort(self._ranking, (gross, studio))
+                self._ranked[studio] = gross
+
+    def _movie_gross(self, key):
+        parts = self.movies.get(key, {})
+        return (sum(p[0] for p in parts.values()),
+                sum(p[1] for p in parts.values()))
+
+    def _imdb_rows(self, titles):
+        column = self.imdb['title'].to_numpy()
+        lo = np.searchsorted(column, titles, side='left')
+        hi = np.searchsorted(column, titles, side='right')
+        positions = np.concatenate([np.arange(a, b) for a, b in zip(lo, hi)] or [[]])
+        return self.imdb.iloc[positions.astype(np.int64)]
+
+    def _keys(self, titles):
+        return [(t, y) for t in titles for y in sorted(self.title_years.get(t, ()))]
+
+    def _unmatch(self, titles):
+        """Retract the genre gross of every movie with these titles."""
+        for key in self._keys(titles):
+            genres = self.movie_genres.pop(key, None)
+            if genres is None:
+                continue
+            gross, count = self._movie_gross(key)
+            for genre in genres.split(','):
+                _add(self.genre_gross, genre, -gross, -count, -1)
+
+    def _match(self, titles):
+        """Match every movie with these titles to IMDB and add its genre gross."""
+        keys = self._keys(titles)
+        if not keys:
+            return
+        index = TitleIndex.build([k[0] for k in keys], [k[1] for k in keys])
+        key_ids = index.resolve([k[0] for k in keys], [k[1] for k in keys],
+                                year_tolerance=0)
+        imdb = self._imdb_rows(np.array(sorted(titles), dtype=object))
+        imdb_ids = index.resolve(imdb['title'], imdb['start_year'])
+        positions, _ = link(key_ids, imdb_ids)
+        genres = imdb['genres'].to_numpy()
+        for key, pos in zip(keys, positions):
+            if pos == UNMATCHED:
+                continue
+            self.movie_genres[key] = genres[pos]
+            gross, count = self._movie_gross(key)
+            for genre in genres[pos].split(','):
+                _add(self.genre_gross, genre, gross, count, 1)
+
+    def apply_titles_delta(self, delta):
+        """Apply new/changed/deleted IMDB title.basics rows, keyed by tconst."""
+        deleted = (delta['deleted'].fillna(False).astype(bool)
+                   if 'deleted' in delta else pd.Series(False, index=delta.index))
+        tconsts = set(delta['tconst'])
+        old = self.imdb[self.imdb['tconst'].isin(tconsts)]
+        new = delta[~deleted.to_numpy()].dropna(subset=['genres'])
+        new = pd.DataFrame({
+            'title': normalize_titles(new['primary_title']).to_numpy(),
+            'tconst': new['tconst'].astype(object).to_numpy(),
+            'start_year': new['start_year'].to_numpy(dtype=np.int64),
+            'genres': new['genres'].astype(object).to_numpy(),
+        })
+        titles = set(old['title']) | set(new['title'])
+        self._unmatch(titles)
+        for genres, year in zip(old['genres'], old['start_year']):
+            for genre in genres.split(','):
+                self.genre_year[genre, year] -= 1
+                if not self.genre_year[genre, year]:
+                    del self.genre_year[genre, year]
+        for genres, year in zip(new['genres'], new['start_year']):
+            for genre in genres.split(','):
+                self.genre_year[genre, year] += 1
+        self.imdb = (pd.concat([self.imdb[~self.imdb['tconst'].isin(tconsts)], new])
+                     .sort_values(['title', 'tconst'], ignore_index=True))
+        self._match(titles)
+
+    # -- results ----------------------------------------------------------
+
+    def top_studios(self, k=TOP_STUDIOS):
+        """The ``k`` studios with the largest total domestic gross."""
+        return pd.Index([studio for _, studio in self._ranking[:k]], name='studio')
+
+    def results(self, top=TOP_STUDIOS):
+        """The rollups in the same shape as the notebook stages."""
+        studio_domestic_gross = pd.Series(
+            {studio: -neg for neg, studio in self._ranking}, dtype='float64',
+            name='domestic_gross')
+        studio_domestic_gross.index.name = 'studio'
+        top_studios = set(self.top_studios(top))
+        by_year = defaultdict(float)
+        for (studio, year), (gross, _, _) in self.studio_year.items():
+            if studio in top_studios:
+                by_year[year] += gross
+        revenue_by_year = pd.Series(by_year, dtype='float64', name='domestic_gross').sort_index()
+        revenue_by_year.index.name = 'year'
+        genre_gross = pd.Series({g: v[0] for g, v in self.genre_gross.items() if v[2] > 0},
+                                dtype='float64').sort_values(ascending=False)
+        genre_gross.index.name = 'genre'
+        genre_year_count = (pd.Series(self.genre_year, dtype='int64')
+                            .unstack(fill_value=0).sort_index().sort_index(axis=1))
+        genre_year_count.index.name = 'genre'
+        genre_year_count.columns.name = 'start_year'
+        return {
+            'studio_domestic_gross': studio_domestic_gross,
+            'top_50_studios': self.top_studios(top),
+            'revenue_by_year_top_50': revenue_by_year,
+            'genre_domestic_gross': genre_gross,
+            'genre_year_count': genre_year_count,
+        }
+
+    # -- persistence ------------------------------------------------------
+
+    def save(self, directory):
+        """Write the state to ``directory`` (Parquet tables plus JSON)."""
+        os.makedirs(directory, exist_ok=True)
+        movies = pd.DataFrame(
+            [(t, y, s, *v) for (t, y), parts in self.movies.items() for s, v in parts.items()],
+            columns=['title', 'year', 'studio', 'gross', 'count', 'rows'])
+        movies.to_parquet(os.path.join(directory, 'movies.parquet'), index=False)
+        self.imdb.to_parquet(os.path.join(directory, 'imdb.parquet'), index=False)
+        with open(os.path.join(directory, 'genres.json'), 'w') as f:
+            json.dump({'movie_genres': [[t, int(y), g] for (t, y), g in self.movie_genres.items()],
+                       'genre_year': [[g, int(y), n] for (g, y), n in self.genre_year.items()]}, f)
+
+    @classmethod
+    def load(cls, directory):
+        """Read a state written by ``save``."""
+        state = cls()
+        state.imdb = pd.read_parquet(os.path.join(directory, 'imdb.parquet'))
+        movies = pd.read_parquet(os.path.join(directory, 'movies.parquet'))
+        for t, y, s, gross, count, rows in movies.itertuples(index=False):
+            s = None if pd.isna(s) else s
+            state.movies.setdefault((t, int(y)), {})[s] = [gross, int(count), int(rows)]
+            state.title_years[t].add(int(y))
+            state._add_studio(s, int(y), gross, int(count), int(rows))
+        with open(os.path.join(directory, 'genres.json')) as f:
+            saved = json.load(f)
+        for t, y, g in saved['movie_genres']:
+            state.movie_genres[t, y] = g
+            gross, count = state._movie_gross((t, y))
+            for genre in g.split(','):
+                _add(state.genre_gross, genre, gross, count, 1)
+        for g, y, n in saved['genre_year']:
+            state.genre_year[g, y] = n
+        state._rerank(set(state.studio_totals))
+        return state
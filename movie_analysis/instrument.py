@@ -0,0 +1,156 @@
+"""Per-stage timings, memory and row counts.
+
+``Instrumentation.run(name, func, *args)`` calls ``func`` and records:
+
+* wall and CPU time;
+* peak and net traced memory (``tracemalloc``), plus the deep
+  ``memory_usage`` of the DataFrame/Series inputs and outputs;
+* input and output row counts, and the fan-out of the first DataFrame
+  output relative to the first input (above 1 means a join multiplied rows);
+* matched/ambiguous/unmatched counts of any ``MatchStats`` output.
+
+Each record is appended to ``records``, written as one JSON line to
+``log_path`` when given, and ``summary()`` tabulates them.  With
+``profile_dir`` set, every call is also profiled and the profile is dumped
+as ``<profile_dir>/<name>.prof`` (cProfile) or ``<name>.html``
+(pyinstrument, when installed and selected).
+
+Memory tracing is off unless ``trace_memory=True``: tracemalloc slows
+Python-level code several times over (chart rendering about 4x), so traced
+wall times are pessimistic.  Forked child processes inherit tracing, so
+calls that fork a process pool should be run with ``trace_memory=False``.
+"""
+
+import json
+import os
+import time
+import tracemalloc
+
+import pandas as pd
+
+PROFILERS = ('cprofile', 'pyinstrument')
+
+
+def _rows(value):
+    return len(value) if isinstance(value, (pd.DataFrame, pd.Series)) else None
+
+
+def _frame_bytes(values):
+    return sum(int(v.memory_usage(deep=True).sum() if isinstance(v, pd.DataFrame)
+                   else v.memory_usage(deep=True))
+               for v in values if isinstance(v, (pd.DataFrame, pd.Series)))
+
+
+class Instrumentation:
+    """Collects one metrics record per instrumented call."""
+
+    def __init__(self, log_path=None, profile_dir=None, profiler='cprofile',
+                 trace_memory=False):
+        if profiler not in PROFILERS:
+            raise ValueError('profiler must be one of %s' % ', '.join(PROFILERS))
+        self.log_path = log_path
+        self.profile_dir = profile_dir
+        self.profiler = profiler
+        self.trace_memory = trace_memory
+        self.records = []
+
+    def options(self):
+        """Settings for a worker-side copy (records are sent back, not logged)."""
+        return {'profile_dir': self.profile_dir, 'profiler': self.profiler,
+                'trace_memory': self.trace_memory}
+
+    def add(self, record):
+        """Store a record and append it to the JSON lines log."""
+        self.records.append(record)
+        if self.log_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(record, default=str) + '\n')
+
+    def _profiled(self, name, func, args):
+        if not self.profile_dir:
+            return func(*args)
+        os.makedirs(self.profile_dir, exist_ok=True)
+        if self.profiler == 'pyinstrument':
+            from pyinstrument import Profiler
+
+            profiler = Profiler()
+            profiler.start()
+            try:
+                return func(*args)
+            finally:
+                profiler.stop()
+                with open(os.path.join(self.profile_dir, name + '.html'), 'w') as f:
+                    f.write(profiler.output_html())
+        import cProfile
+
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args)
+        finally:
+            profiler.dump_stats(os.path.join(self.profile_dir, name + '.prof'))
+
+    def measure(self, name, func, *args, trace_memory=None):
+        """Call ``func(*args)``; return ``(result, record)`` without storing it.
+
+        ``trace_memory`` overrides the instance setting for this call.
+        """
+        trace_memory = self.trace_memory if trace_memory is None else trace_memory
+        started_tracing = False
+        if trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+            traced_before = tracemalloc.get_traced_memory()[0]
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            result = self._profiled(name, func, args)
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            if trace_memory:
+                traced_after, traced_peak = tracemalloc.get_traced_memory()
+                if started_tracing:
+                    tracemalloc.stop()
+
+        outputs = result if isinstance(result, tuple) and not hasattr(result, '_fields') \
+            else (result,)
+        rows_in = [_rows(a) for a in args]
+        rows_out = [_rows(o) for o in outputs]
+        record = {
+            'stage': name,
+            'pid': os.getpid(),
+            'wall_s': round(wall, 6),
+            'cpu_s': round(cpu, 6),
+            'rows_in': rows_in,
+            'rows_out': rows_out,
+            'input_bytes': _frame_bytes(args),
+            'output_bytes': _frame_bytes(outputs),
+        }
+        if trace_memory:
+            record['traced_peak_bytes'] = traced_peak - traced_before
+            record['traced_delta_bytes'] = traced_after - traced_before
+        first_in = next((r for r in rows_in if r), None)
+        first_frame_out = next((len(o) for o in outputs if isinstance(o, pd.DataFrame)), None)
+        if first_in and first_frame_out is not None:
+            record['fan_out'] = round(first_frame_out / first_in, 4)
+        for output in outputs:
+            if type(output).__name__ == 'MatchStats':
+                record['match'] = output._asdict()
+        return result, record
+
+    def run(self, name, func, *args, trace_memory=None):
+        """Call ``func(*args)``, record its metrics and return its result."""
+        result, record = self.measure(name, func, *args, trace_memory=trace_memory)
+        self.add(record)
+        return result
+
+    def summary(self):
+        """The records as a DataFrame, one row per call."""
+        if not self.records:
+            return pd.DataFrame()
+        frame = pd.DataFrame(self.records).set_index('stage')
+        for col in ('input_bytes', 'output_bytes', 'traced_peak_bytes', 'traced_delta_bytes'):
+            if col in frame:
+                frame[col.replace('_bytes', '_mb')] = (frame.pop(col) / 1024 ** 2).round(2)
+        return frame.drop(columns=['pid'])
@@ -0,0 +1,206 @@
+"""Typed, cached loading of the four source CSVs.
+
+Each CSV is parsed once with an explicit schema and written to a Parquet
+cache next to it.  Later runs read the columnar cache instead of parsing the
+CSV again.  A cache entry is reused while the source file's size and mtime
+are unchanged; if the mtime moved, the file is re-hashed and the cache is
+kept when the content is identical (e.g. after a ``touch`` or a re-download).
+"""
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from movie_analysis.cleaning import normalize_money
+
+try:
+    import pyarrow  # noqa: F401  (needed by DataFrame.to_parquet/read_parquet)
+except ImportError:  # pragma: no cover - the cache is simply disabled
+    pyarrow = None
+
+
+CACHE_DIRNAME = '.movie_cache'
+
+# Bump when SCHEMAS or the load-time cleaning changes so old caches are
+# rebuilt.
+SCHEMA_VERSION = 4
+
+# Per-file schemas: which columns to keep and what to parse them as.  Money
+# columns that carry '$' / ',' formatting are read as strings and listed under
+# 'money'; they are parsed to float64 once, before the cache is written.
+# Text columns use the 'str' dtype, which is also what Parquet reads back, so
+# a fresh parse and a cache hit give identical frames.
+SCHEMAS = {
+    'bom.movie_gross.csv': {
+        'usecols': ['title', 'studio', 'domestic_gross', 'foreign_gross', 'year'],
+        'dtype': {
+            'title': 'str',
+            'studio': 'category',
+            'domestic_gross': 'float64',
+            'foreign_gross': 'object',
+            'year': 'int16',
+        },
+        'money': ['domestic_gross', 'foreign_gross'],
+    },
+    'title.basics.csv': {
+        'usecols': ['tconst', 'primary_title', 'original_title', 'start_year',
+                    'runtime_minutes', 'genres'],
+        'dtype': {
+            'tconst': 'str',
+            'primary_title': 'str',
+            'original_title': 'str',
+            'start_year': 'int16',
+            'runtime_minutes': 'float32',
+            'genres': 'category',
+        },
+    },
+    'tmdb.movies.csv': {
+        # Drops the unnamed index column left over from the original export.
+        'usecols': ['genre_ids', 'id', 'original_language', 'original_title',
+                    'popularity', 'release_date', 'title', 'vote_average',
+                    'vote_count'],
+        'dtype': {
+            'genre_ids': 'str',
+            'id': 'int64',
+            'original_language': 'category',
+            'original_title': 'str',
+            'popularity': 'float64',
+            'release_date': 'str',
+            'title': 'str',
+            'vote_average': 'float64',
+            'vote_count': 'int64',
+        },
+    },
+    'tn.movie_budgets.csv': {
+        'usecols': ['id', 'release_date', 'movie', 'production_budget',
+                    'domestic_gross', 'worldwide_gross'],
+        'dtype': {
+            'id': 'int64',
+            'release_date': 'str',
+            'movie': 'str',
+            'production_budget': 'object',
+            'domestic_gross': 'object',
+            'worldwide_gross': 'object',
+        },
+        'money': ['production_budget', 'domestic_gross', 'worldwide_gross'],
+    },
+}
+
+
+def _conform(df, schema):
+    # Cast columns back to the schema where a round trip changed them.
+    money = set(schema.get('money', ()))
+    dtypes = {name: dtype for name, dtype in schema['dtype'].items()
+              if name in df.columns and name not in money and dtype != 'category'
+              and df[name].dtype != pd.api.types.pandas_dtype(dtype)}
+    return df.astype(dtypes) if dtypes else df
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Return the hex SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_csv_typed(path, name=None):
+    """Parse one source CSV with its schema from SCHEMAS.
+
+    Money columns are normalized to float64 here, so every consumer sees
+    numeric values.
+    """
+    schema = SCHEMAS[name or os.path.basename(path)]
+    df = pd.read_csv(path, usecols=schema['usecols'], dtype=schema['dtype'])
+    return _conform(normalize_money(df, schema.get('money', ())), schema)
+
+
+def iter_csv_typed(path, chunksize, name=None):
+    """Yield one source CSV in typed, money-normalized chunks of ``chunksize`` rows.
+
+    Categorical columns are categorical per chunk; their categories can
+    differ between chunks.
+    """
+    schema = SCHEMAS[name or os.path.basename(path)]
+    reader = pd.read_csv(path, usecols=schema['usecols'], dtype=schema['dtype'],
+                         chunksize=chunksize)
+    with reader:
+        for chunk in reader:
+            yield normalize_money(chunk, schema.get('money', ()))
+
+
+def _cache_paths(path, cache_dir):
+    base = os.path.basename(path)
+    stem = os.path.join(cache_dir, base)
+    return stem + '.parquet', stem + '.meta.json'
+
+
+def _source_stat(path):
+    st = os.stat(path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def _cache_is_fresh(path, meta_path):
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if meta.get('schema_version') != SCHEMA_VERSION:
+        return False
+    stat = _source_stat(path)
+    if stat['size'] != meta.get('size'):
+        return False
+    if stat['mtime_ns'] == meta.get('mtime_ns'):
+        return True
+    # The file was touched: only a content change invalidates the cache.
+    if file_sha256(path) == meta.get('sha256'):
+        meta.update(stat)
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f)
+        return True
+    return False
+
+
+def load_dataset(name, data_dir='.', cache_dir=None, use_cache=True):
+    """Load one of the source CSVs by file name, going through the cache.
+
+    ``cache_dir`` defaults to ``<data_dir>/.movie_cache``.  When pyarrow is
+    not installed, or ``use_cache`` is False, the CSV is parsed directly.
+    """
+    path = os.path.join(data_dir, name)
+    if not use_cache or pyarrow is None:
+        return read_csv_typed(path, name)
+
+    cache_dir = cache_dir or os.path.join(data_dir, CACHE_DIRNAME)
+    parquet_path, meta_path = _cache_paths(path, cache_dir)
+    fresh = _cache_is_fresh(path, meta_path)
+    if fresh and os.path.exists(parquet_path):
+        return _conform(pd.read_parquet(parquet_path), SCHEMAS[name])
+
+    df = read_csv_typed(path, name)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = parquet_path + '.tmp'
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, parquet_path)
+    meta = dict(_source_stat(path), sha256=file_sha256(path),
+                schema_version=SCHEMA_VERSION)
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+    return df
+
+
+def load_all(data_dir='.', cache_dir=None, use_cache=True):
+    """Load the four source tables used by the analysis.
+
+    Returns ``(bom_movie_gross, imdb_title_basics, tmdb_movies,
+    tn_movie_budgets)`` in the same order as the original notebook cell.
+    """
+    return tuple(
+        load_dataset(name, data_dir, cache_dir, use_cache)
+        for name in ('bom.movie_gross.csv', 'title.basics.csv',
+                     'tmdb.movies.csv', 'tn.movie_budgets.csv')
+    )
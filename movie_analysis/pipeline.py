@@ -0,0 +1,310 @@
+"""Stage DAG and process-pool scheduler for the analysis.
+
+A ``Stage`` names a module-level function, the inputs it reads and the
+outputs it returns.  ``run_pipeline`` resolves the dependency graph and runs
+every stage whose inputs are ready, in parallel on a
+``concurrent.futures.ProcessPoolExecutor``.
+
+DataFrames and Series do not travel between processes as pickles: they are
+written once to uncompressed Arrow IPC files in a scratch directory and
+workers open them memory-mapped.  Array-backed values go the same way:
+numeric ndarrays as ``.npy`` files loaded with ``mmap_mode='r'``, Index
+objects as one-column Arrow files, and a ``GenreIndex`` (the largest
+intermediate) as a directory of both.  Small values (scalars, match
+statistics) are passed as ordinary pickles.  Cached outputs are hard-linked
+into the scratch directory before workers read them, so the cache can evict
+its copy meanwhile.
+"""
+
+import os
+import shutil
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+from movie_analysis.genres import GenreIndex
+from movie_analysis.instrument import Instrumentation
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - frames are pickled instead
+    pa = None
+
+
+class Stage(NamedTuple):
+    """One step of the analysis.
+
+    ``func`` is called with the values of ``inputs`` as positional arguments
+    and returns one value per name in ``outputs`` (a bare value when there is
+    a single output).
+    """
+
+    name: str
+    func: Callable
+    inputs: Tuple[str, ...]
+    outputs: Tuple[str, ...]
+
+
+class PipelineError(ValueError):
+    """The stage graph is invalid (missing input, duplicate output, cycle)."""
+
+
+class FrameRef(NamedTuple):
+    """A DataFrame or Series spilled to an Arrow IPC file."""
+
+    path: str
+    series_name: object = None
+    is_series: bool = False
+
+
+class ArrayRef(NamedTuple):
+    """An ndarray, Index or ``GenreIndex`` spilled to a file or directory.
+
+    ``kind`` is 'ndarray', 'index' or 'genre_index'.
+    """
+
+    path: str
+    kind: str
+
+
+_SERIES_COLUMN = '__series__'
+_GENRE_INDEX_PARTS = ('indptr', 'indices')
+
+
+def _write_arrow(frame, path):
+    table = pa.Table.from_pandas(frame, preserve_index=True)
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _read_arrow(path):
+    # The map is left open: Arrow buffers may still point into it.
+    source = pa.memory_map(path, 'r')
+    return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+def _write_index(index, path):
+    # The one column is named after the index, so the name round-trips.
+    column = index.name if isinstance(index.name, str) else _SERIES_COLUMN
+    _write_arrow(pd.DataFrame({column: index}), path)
+    return path
+
+
+def _read_index(path):
+    frame = _read_arrow(path)
+    column = frame.columns[0]
+    return pd.Index(frame[column], name=None if column == _SERIES_COLUMN else column)
+
+
+def spill(value, directory, name):
+    """Write a frame or array-backed value to ``directory`` and return a reference.
+
+    DataFrames and Series give a ``FrameRef``; numeric ndarrays, Index
+    objects and ``GenreIndex`` give an ``ArrayRef``.  Anything else is
+    returned unchanged.
+    """
+    if isinstance(value, np.ndarray) and value.dtype.kind in 'biufcmM':
+        path = os.path.join(directory, name + '.npy')
+        np.save(path, value)
+        return ArrayRef(path, 'ndarray')
+    if pa is None:
+        return value
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        is_series = isinstance(value, pd.Series)
+        path = os.path.join(directory, name + '.arrow')
+        _write_arrow(value.to_frame(_SERIES_COLUMN) if is_series else value, path)
+        return FrameRef(path, value.name if is_series else None, is_series)
+    if isinstance(value, GenreIndex):
+        path = os.path.join(directory, name + '.genres')
+        os.mkdir(path)
+        for part in _GENRE_INDEX_PARTS:
+            np.save(os.path.join(path, part + '.npy'), getattr(value, part))
+        for part in ('genres', 'keys'):
+            _write_index(getattr(value, part), os.path.join(path, part + '.arrow'))
+        return ArrayRef(path, 'genre_index')
+    if isinstance(value, pd.Index) and not isinstance(value, pd.MultiIndex):
+        return ArrayRef(_write_index(value, os.path.join(directory, name + '.arrow')), 'index')
+    return value
+
+
+def materialize(value):
+    """Inverse of ``spill``: open a ``FrameRef`` or ``ArrayRef`` memory-mapped."""
+    if isinstance(value, FrameRef):
+        frame = _read_arrow(value.path)
+        if value.is_series:
+            return frame[_SERIES_COLUMN].rename(value.series_name)
+        return frame
+    if not isinstance(value, ArrayRef):
+        return value
+    if value.kind == 'ndarray':
+        return np.load(value.path, mmap_mode='r')
+    if value.kind == 'index':
+        return _read_index(value.path)
+    parts = {part: np.load(os.path.join(value.path, part + '.npy'), mmap_mode='r')
+             for part in _GENRE_INDEX_PARTS}
+    return GenreIndex(_read_index(os.path.join(value.path, 'genres.arrow')),
+                      _read_index(os.path.join(value.path, 'keys.arrow')), **parts)
+
+
+def _link_or_copy(source, target):
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+    return target
+
+
+def relocate(value, directory, name):
+    """Hard-link (or copy) the files behind a spilled reference into ``directory``.
+
+    Other values are returned unchanged.
+    """
+    if not isinstance(value, (FrameRef, ArrayRef)):
+        return value
+    target = os.path.join(directory, name + os.path.splitext(value.path)[1])
+    if os.path.isdir(value.path):
+        shutil.copytree(value.path, target, copy_function=_link_or_copy)
+    else:
+        _link_or_copy(value.path, target)
+    return value._replace(path=target)
+
+
+def _as_tuple(result, n_outputs):
+    if n_outputs == 1:
+        return (result,)
+    result = tuple(result)
+    if len(result) != n_outputs:
+        raise PipelineError('stage returned %d values, expected %d'
+                            % (len(result), n_outputs))
+    return result
+
+
+def _call(stage, args, instrumentation):
+    # Returns (outputs tuple, metrics record or None).
+    if instrumentation is None:
+        return _as_tuple(stage.func(*args), len(stage.outputs)), None
+    result, record = instrumentation.measure(stage.name, stage.func, *args)
+    return _as_tuple(result, len(stage.outputs)), record
+
+
+def _run_in_worker(stage, values, spill_dir, instrument_options=None):
+    args = [materialize(v) for v in values]
+    instrumentation = None if instrument_options is None else Instrumentation(**instrument_options)
+    result, record = _call(stage, args, instrumentation)
+    outputs = {name: spill(v, spill_dir, name) for name, v in zip(stage.outputs, result)}
+    return outputs, record
+
+
+def check_graph(stages, available):
+    """Validate ``stages`` and return them in a dependency-respecting order."""
+    producers = {}
+    for stage in stages:
+        for out in stage.outputs:
+            if out in producers or out in available:
+                raise PipelineError('output %r is produced twice' % out)
+            producers[out] = stage.name
+
+    ordered, done, remaining = [], set(available), list(stages)
+    while remaining:
+        ready = [s for s in remaining if all(i in done for i in s.inputs)]
+        if not ready:
+            missing = {i for s in remaining for i in s.inputs
+                       if i not in done and i not in producers}
+            if missing:
+                raise PipelineError('no stage produces %s' % ', '.join(sorted(missing)))
+            raise PipelineError('cycle between stages %s'
+                                % ', '.join(s.name for s in remaining))
+        for stage in ready:
+            ordered.append(stage)
+            done.update(stage.outputs)
+            remaining.remove(stage)
+    return ordered
+
+
+def run_pipeline(stages, data, workers=1, cache=None, instrumentation=None):
+    """Run ``stages`` over the named inputs in ``data``.
+
+    With ``workers <= 1`` stages run one after another in this process.
+    Otherwise ready stages run concurrently on up to ``workers`` processes.
+    When a ``movie_analysis.cache.ResultCache`` is given, stages whose code
+    and inputs are unchanged are served from it instead of being run.
+    With a ``movie_analysis.instrument.Instrumentation``, every stage that
+    runs (in this process or a worker) adds a metrics record to it.
+    Returns a dict with ``data`` plus every stage output.
+    """
+    ordered = check_graph(stages, data)
+    results = dict(data)
+    fingerprints = {}
+    if cache is not None:
+        fingerprints = {name: cache.fingerprint(value) for name, value in data.items()}
+
+    def lookup(stage, load):
+        # Returns (cache key, cached outputs or None).
+        if cache is None:
+            return None, None
+        key = cache.key(stage, [fingerprints[i] for i in stage.inputs])
+        for out in stage.outputs:
+            fingerprints[out] = cache.output_fingerprint(key, out)
+        cached = cache.get(stage.name, key, load=load)
+        if cached is not None and instrumentation is not None:
+            instrumentation.add({'stage': stage.name, 'pid': os.getpid(), 'cache_hit': True})
+        return key, cached
+
+    def record(metrics):
+        if metrics is not None:
+            if cache is not None:
+                metrics['cache_hit'] = False
+            instrumentation.add(metrics)
+
+    if workers <= 1 or len(ordered) <= 1:
+        for stage in ordered:
+            key, cached = lookup(stage, load=True)
+            if cached is None:
+                values, metrics = _call(stage, [results[i] for i in stage.inputs],
+                                        instrumentation)
+                record(metrics)
+                cached = dict(zip(stage.outputs, values))
+                if cache is not None:
+                    cache.put(key, cached)
+            results.update(cached)
+        return results
+
+    spill_dir = tempfile.mkdtemp(prefix='movie-pipeline-')
+    try:
+        refs = {name: spill(value, spill_dir, name) for name, value in data.items()}
+        pending = list(ordered)
+        running = {}
+        with ProcessPoolExecutor(max_workers=min(workers, len(ordered))) as pool:
+            while pending or running:
+                for stage in [s for s in pending if all(i in refs for i in s.inputs)]:
+                    pending.remove(stage)
+                    key, cached = lookup(stage, load=False)
+                    if cached is not None:
+                        # Link cached files into spill_dir: the cache may
+                        # evict its copy while workers still need it.
+                        refs.update({name: spill(relocate(v, spill_dir, name), spill_dir, name)
+                                     for name, v in cached.items()})
+                        continue
+                    values = [refs[i] for i in stage.inputs]
+                    options = None if instrumentation is None else instrumentation.options()
+                    future = pool.submit(_run_in_worker, stage, values, spill_dir, options)
+                    running[future] = (stage, key)
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage, key = running.pop(future)
+                    outputs, metrics = future.result()
+                    record(metrics)
+                    if cache is not None:
+                        cache.put(key, outputs)
+                    refs.update(outputs)
+        for name in refs:
+            if name not in results:
+                results[name] = materialize(refs[name])
+        return results
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
@@ -0,0 +1,99 @@
+"""Shared steps of the notebook, the CLI and the benchmarks.
+
+``prepare_frames`` drops repeated source rows of one film, resolves every
+table's ``movie_id`` and drops IMDB titles without genres (In[5]);
+``chart_specs`` builds the notebook's figures from the pipeline results, in
+notebook order.  Neither imports a plotting
+library: the specs are rendered by ``movie_analysis.charts.render_charts``.
+"""
+
+from movie_analysis.charts import Chart
+from movie_analysis.correlation import CorrelationIndex
+from movie_analysis.stages import TOP_STUDIOS
+from movie_analysis.titles import TitleIndex, year_from_date
+
+# Each source's own film id.  TMDB lists some films more than once under
+# the same id; ``link`` would count such a film as ambiguous and drop it.
+SOURCE_IDS = {'imdb_title_basics': 'tconst', 'tmdb_movies': 'id'}
+
+
+def prepare_frames(bom_movie_gross, imdb_title_basics, tmdb_movies, tn_movie_budgets):
+    """The pipeline's source frames with ``movie_id`` resolved, by stage input name.
+
+    Rows repeating a film's ``SOURCE_IDS`` id are dropped first (the first
+    row is kept).  The ids come from one normalized title + year index built
+    from Box Office Mojo.  ``movie_id`` columns are added to the frames in
+    place where no rows were dropped.
+    """
+    imdb_title_basics = _first_per_id(imdb_title_basics, SOURCE_IDS['imdb_title_basics'])
+    tmdb_movies = _first_per_id(tmdb_movies, SOURCE_IDS['tmdb_movies'])
+    index = TitleIndex.build(bom_movie_gross['title'], bom_movie_gross['year'])
+    bom_movie_gross['movie_id'] = index.resolve(bom_movie_gross['title'], bom_movie_gross['year'])
+    imdb_title_basics['movie_id'] = index.resolve(imdb_title_basics['primary_title'],
+                                                  imdb_title_basics['start_year'])
+    tmdb_movies['movie_id'] = index.resolve(tmdb_movies['title'],
+                                            year_from_date(tmdb_movies['release_date']))
+    tn_movie_budgets['movie_id'] = index.resolve(tn_movie_budgets['movie'],
+                                                 year_from_date(tn_movie_budgets['release_date']))
+    return {
+        'bom_movie_gross': bom_movie_gross,
+        # The genre analyses only use titles that have genres.
+        'imdb_title_basics': imdb_title_basics.dropna(subset=['genres']),
+        'tmdb_movies': tmdb_movies,
+        'tn_movie_budgets': tn_movie_budgets,
+    }
+
+
+def _first_per_id(frame, column):
+    repeated = frame[column].duplicated()
+    return frame[~repeated.to_numpy()].copy() if repeated.any() else frame
+
+
+def chart_specs(results, scatter_mode='points'):
+    """Every figure of the notebook as a ``Chart``, keyed by name, in notebook order.
+
+    ``results`` is the output of ``run_pipeline(ANALYSIS_STAGES, ...)``.  The
+    summary charts of In[18]-In[20] repeat earlier specs under new names,
+    so the renderer draws them once.
+    """
+    rating_by_genre = CorrelationIndex.from_frame(results['rating_box_office']) \
+        .table('genre', 'worldwide_gross')
+    budget_data = results['budget_data']
+    specs = [
+        Chart('rating_gross_correlation_by_genre', 'barh',
+              rating_by_genre['spearman'].dropna().sort_values(ascending=False),
+              'Rating vs. Worldwide Gross (Spearman) by Genre',
+              'Spearman correlation', 'Genre', figsize=(10, 8)),
+        Chart('genre_distribution', 'barh', results['genre_distribution'], 'Genre Distribution',
+              'Number of Movies', 'Genre', figsize=(10, 6)),
+        Chart('genre_trends', 'heatmap', results['genre_year_count'], 'Genre Trends Over Time',
+              'Year', 'Genre', figsize=(12, 8)),
+        Chart('genre_box_office', 'barh', results['genre_box_office'], 'Box Office Revenue by Genre',
+              'Total Domestic Gross Revenue ($)', 'Genre', figsize=(10, 6)),
+        Chart('production_budget_box', 'box', budget_data['production_budget'],
+              'Distribution of Movie Production Budgets', '', 'Production Budget ($)',
+              figsize=(8, 6)),
+        Chart('budget_vs_worldwide_gross', 'scatter',
+              budget_data[['production_budget', 'worldwide_gross']],
+              'Production Budget vs. Worldwide Gross', 'Production Budget ($)',
+              'Worldwide Gross ($)', figsize=(10, 6),
+              options=(('grid', True), ('mode', scatter_mode))),
+        Chart('median_roi_by_budget_band', 'bar', results['roi_by_budget_band']['median_roi'],
+              'Median ROI by Production Budget Band', 'Production Budget',
+              'Median ROI (worldwide gross / budget - 1)', figsize=(10, 6)),
+        Chart('top_50_studios', 'bar', results['studio_domestic_gross'].head(TOP_STUDIOS),
+              'Total Domestic Gross Revenue by Top 50 Studios',
+              'Studio', 'Total Domestic Gross Revenue ($)', figsize=(12, 6)),
+        Chart('genre_domestic_gross', 'bar', results['genre_box_office'],
+              'Total Domestic Gross Revenue by Genre', 'Genre',
+              'Total Domestic Gross Revenue ($)', figsize=(12, 6)),
+        Chart('revenue_by_year_top_50', 'line', results['revenue_by_year_top_50'],
+              'Total Domestic Gross Revenue by Year for Top 50 Studios', 'Year',
+              'Total Domestic Gross Revenue ($)', figsize=(12, 6), options=(('grid', True),)),
+    ]
+    charts = {chart.name: chart for chart in specs}
+    for original, summary in (('top_50_studios', 'studio_domestic_gross_top_50'),
+                              ('genre_domestic_gross', 'genre_domestic_gross_summary'),
+                              ('revenue_by_year_top_50', 'revenue_by_year_top_50_summary')):
+        charts[summary] = charts[original]._replace(name=summary)
+    return charts
@@ -0,0 +1,324 @@
+"""Async HTTP query service over the studio/genre/year aggregates.
+
+At startup the data is loaded once into an ``AggregateIndex``: dense
+studio x year and genre x year matrices of domestic gross and title counts,
+each with cumulative sums along the year axis.  A year-range total is then
+the difference of two prefix-sum columns, so every query is O(studios) or
+O(genres) array work; top-k uses ``np.partition``.
+
+``QueryService`` sits in front of the index.  It keeps an LRU cache of
+encoded JSON responses and coalesces identical concurrent queries: the
+first request computes the answer in a worker thread, and requests for the
+same key that arrive meanwhile await the same future.
+
+The HTTP layer uses aiohttp (``pip install movie-analysis[service]``).  Run
+it with ``movie-analysis serve --port 8080``:
+
+    GET /studios/top?k=50&start=2014&end=2016     studio_domestic_gross
+    GET /genres/top?k=10&start=2012               genre_domestic_gross
+    GET /studios/revenue_by_year?k=50             revenue_by_year_top_50
+    GET /genres/{genre}/revenue?start=2010        one genre's gross by year
+    GET /genres/{genre}/titles                    genre_year_count row
+    GET /stats                                    cache hits/misses
+
+``start`` and ``end`` are inclusive years; either may be left out.
+"""
+
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from movie_analysis.genres import GenreIndex
+from movie_analysis.titles import join_on_ids
+
+try:
+    from aiohttp import web
+except ImportError:  # pragma: no cover - the index and service still work
+    web = None
+
+DEFAULT_PORT = 8080
+CACHE_ENTRIES = 4096
+MAX_K = 1000
+
+
+class QueryError(ValueError):
+    """A query with invalid or unknown parameters."""
+
+
+def _prefix(matrix):
+    # Cumulative sums along the year axis with a leading zero column, so the
+    # total over columns [lo, hi) is prefix[:, hi] - prefix[:, lo].
+    out = np.zeros((matrix.shape[0], matrix.shape[1] + 1))
+    np.cumsum(matrix, axis=1, out=out[:, 1:])
+    return out
+
+
+def _bincount2(rows, cols, n_cols, shape_rows, weights=None):
+    flat = rows.astype(np.int64) * n_cols + cols
+    return np.bincount(flat, weights=weights, minlength=shape_rows * n_cols) \
+        .reshape(shape_rows, n_cols)
+
+
+class AggregateIndex:
+    """Studio x year and genre x year rollups with prefix sums over years.
+
+    ``studio_gross``/``studio_rows`` come from Box Office Mojo;
+    ``genre_gross``/``genre_rows`` from the BOM titles matched to IMDB (as in
+    ``stages.genre_box_office``, by BOM year); ``genre_titles`` counts IMDB
+    titles by ``start_year`` (``stages.genre_year_count``).  ``*_rows``
+    decide whether a studio or genre has any data in a range.  They count
+    every row, with or without a gross, as the stages' group-bys do, so a
+    studio or genre whose grosses are all missing is listed with a total
+    of 0.0.
+    """
+
+    def __init__(self, years, studios, genres, studio_gross, studio_rows,
+                 genre_gross, genre_rows, genre_titles):
+        self.years = years
+        self.studios = studios
+        self.genres = genres
+        self.studio_gross = _prefix(studio_gross)
+        self.studio_rows = _prefix(studio_rows)
+        self.genre_gross = _prefix(genre_gross)
+        self.genre_rows = _prefix(genre_rows)
+        self.genre_titles = _prefix(genre_titles)
+
+    @classmethod
+    def from_frames(cls, bom_movie_gross, imdb_title_basics):
+        """Build the index from movie_id-resolved frames (see ``report.prepare_frames``)."""
+        merged, _ = join_on_ids(bom_movie_gross, imdb_title_basics)
+        years = np.union1d(bom_movie_gross['year'].to_numpy(),
+                           imdb_title_basics['start_year'].to_numpy()).astype(np.int64)
+        n_years = len(years)
+
+        studio_codes, studios = pd.factorize(bom_movie_gross['studio'], sort=True)
+        gross = bom_movie_gross['domestic_gross'].to_numpy(dtype=float)
+        year_codes = np.searchsorted(years, bom_movie_gross['year'].to_numpy())
+        keep = studio_codes >= 0
+        valued = keep & ~np.isnan(gross)
+        studio_gross = _bincount2(studio_codes[valued], year_codes[valued], n_years,
+                                  len(studios), gross[valued])
+        studio_rows = _bincount2(studio_codes[keep], year_codes[keep], n_years, len(studios))
+
+        titles = GenreIndex.from_series(imdb_title_basics['genres'])
+        matched = GenreIndex.from_series(merged['genres'])
+        genres = titles.genres.union(matched.genres)
+        title_genres = genres.get_indexer(titles.genres)[titles.indices]
+        title_years = np.searchsorted(years, imdb_title_basics['start_year'].to_numpy())
+        genre_titles = _bincount2(title_genres, title_years[titles.row_ids], n_years, len(genres))
+
+        matched_genres = genres.get_indexer(matched.genres)[matched.indices]
+        rows = matched.row_ids
+        merged_gross = merged['domestic_gross'].to_numpy(dtype=float)[rows]
+        merged_years = np.searchsorted(years, merged['year'].to_numpy())[rows]
+        ok = ~np.isnan(merged_gross)
+        genre_gross = _bincount2(matched_genres[ok], merged_years[ok], n_years, len(genres),
+                                 merged_gross[ok])
+        genre_rows = _bincount2(matched_genres, merged_years, n_years, len(genres))
+
+        return cls(years, pd.Index(studios, name='studio'), pd.Index(genres, name='genre'),
+                   studio_gross, studio_rows, genre_gross, genre_rows, genre_titles)
+
+    def _span(self, start=None, end=None):
+        # Column range [lo, hi) of the years in [start, end].
+        lo = 0 if start is None else int(np.searchsorted(self.years, start, side='left'))
+        hi = len(self.years) if end is None else int(np.searchsorted(self.years, end, side='right'))
+        if hi < lo:
+            raise QueryError('start must not be after end')
+        return lo, hi
+
+    def _genre(self, genre):
+        try:
+            return self.genres.get_loc(genre)
+        except KeyError:
+            raise QueryError('unknown genre %r' % genre) from None
+
+    @staticmethod
+    def _top(labels, totals, present, k):
+        # The k largest totals among present labels, largest first (ties by label).
+        candidates = np.flatnonzero(present)
+        if k < len(candidates):
+            cut = np.partition(totals[candidates], len(candidates) - k)[len(candidates) - k]
+            candidates = candidates[totals[candidates] >= cut]
+        order = np.lexsort((labels[candidates], -totals[candidates]))[:k]
+        chosen = candidates[order]
+        return pd.Series(totals[chosen], index=labels[chosen])
+
+    def top_studios(self, k=50, start=None, end=None):
+        """Studios by total domestic gross over the years (``studio_domestic_gross``)."""
+        lo, hi = self._span(start, end)
+        totals = self.studio_gross[:, hi] - self.studio_gross[:, lo]
+        present = self.studio_rows[:, hi] > self.studio_rows[:, lo]
+        return self._top(self.studios, totals, present, k).rename('domestic_gross')
+
+    def top_genres(self, k=10, start=None, end=None):
+        """Genres by total domestic gross of matched titles (``genre_domestic_gross``)."""
+        lo, hi = self._span(start, end)
+        totals = self.genre_gross[:, hi] - self.genre_gross[:, lo]
+        present = self.genre_rows[:, hi] > self.genre_rows[:, lo]
+        return self._top(self.genres, totals, present, k).rename('domestic_gross')
+
+    def _series(self, prefix, row, lo, hi, name):
+        values = np.diff(prefix[row, lo:hi + 1], axis=-1)
+        return pd.Series(values, index=pd.Index(self.years[lo:hi], name='year'), name=name)
+
+    def revenue_by_year(self, k=50, start=None, end=None):
+        """Yearly domestic gross of the top ``k`` studios of the range (``revenue_by_year_top_50``)."""
+        lo, hi = self._span(start, end)
+        rows = self.studios.get_indexer(self.top_studios(k, start, end).index)
+        gross = np.diff(self.studio_gross[rows, lo:hi + 1], axis=1).sum(axis=0)
+        seen = np.diff(self.studio_rows[rows, lo:hi + 1], axis=1).sum(axis=0) > 0
+        series = pd.Series(gross, index=pd.Index(self.years[lo:hi], name='year'),
+                           name='domestic_gross')
+        return series[seen]
+
+    def genre_revenue(self, genre, start=None, end=None):
+        """One genre's domestic gross by year."""
+        lo, hi = self._span(start, end)
+        return self._series(self.genre_gross, self._genre(genre), lo, hi, 'domestic_gross')
+
+    def genre_title_counts(self, genre, start=None, end=None):
+        """One genre's IMDB title count by start year (a ``genre_year_count`` row)."""
+        lo, hi = self._span(start, end)
+        series = self._series(self.genre_titles, self._genre(genre), lo, hi, 'titles')
+        return series.round().astype(np.int64)
+
+
+def _int_param(params, name, default=None, low=None, high=None):
+    value = params.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise QueryError('%s must be an integer' % name) from None
+    if (low is not None and value < low) or (high is not None and value > high):
+        raise QueryError('%s must be between %s and %s' % (name, low, high))
+    return value
+
+
+def _records(series, label):
+    return [{label: (key.item() if isinstance(key, np.generic) else key),
+             series.name: float(value)} for key, value in series.items()]
+
+
+class QueryService:
+    """Cached, coalescing front end of an ``AggregateIndex``.
+
+    ``await query(name, params)`` returns the JSON-encoded answer as bytes.
+    Answers are computed in a thread pool, kept in an LRU of
+    ``cache_entries`` responses, and identical queries in flight share one
+    computation.
+    """
+
+    QUERIES = ('top_studios', 'top_genres', 'revenue_by_year', 'genre_revenue',
+               'genre_title_counts')
+
+    def __init__(self, index, cache_entries=CACHE_ENTRIES, executor=None):
+        self.index = index
+        self.cache_entries = cache_entries
+        self.executor = executor or ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1))
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0}
+
+    def _normalize(self, name, params):
+        # Validated keyword arguments of the query; also the cache key.
+        if name not in self.QUERIES:
+            raise QueryError('unknown query %r' % name)
+        kwargs = {'start': _int_param(params, 'start'), 'end': _int_param(params, 'end')}
+        if name in ('genre_revenue', 'genre_title_counts'):
+            kwargs['genre'] = params.get('genre')
+        else:
+            kwargs['k'] = _int_param(params, 'k', 10 if name == 'top_genres' else 50, 1, MAX_K)
+        return kwargs
+
+    def compute(self, name, kwargs):
+        """Run one query against the index and encode it as JSON bytes."""
+        series = getattr(self.index, name)(**kwargs)
+        label = series.index.name
+        body = {'query': name, 'params': kwargs, 'data': _records(series, label)}
+        return json.dumps(body).encode()
+
+    async def query(self, name, params):
+        kwargs = self._normalize(name, params)
+        key = (name, tuple(sorted(kwargs.items())))
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.stats['hits'] += 1
+            return cached
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(pending)
+
+        self.stats['misses'] += 1
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, self.compute, name, kwargs)
+        self._inflight[key] = future
+        try:
+            body = await asyncio.shield(future)
+        finally:
+            del self._inflight[key]
+        self._cache[key] = body
+        if len(self._cache) > self.cache_entries:
+            self._cache.popitem(last=False)
+        return body
+
+
+def load_index(data_dir='.', cache_dir=None):
+    """Load the four CSVs from ``data_dir`` and build an ``AggregateIndex``."""
+    from movie_analysis.loader import load_all
+    from movie_analysis.report import prepare_frames
+
+    frames = prepare_frames(*load_all(data_dir, cache_dir=cache_dir))
+    return AggregateIndex.from_frames(frames['bom_movie_gross'], frames['imdb_title_basics'])
+
+
+def _require_aiohttp():
+    if web is None:
+        raise ImportError('the query service needs aiohttp: pip install aiohttp')
+
+
+def make_app(service):
+    """aiohttp application serving ``service``."""
+    _require_aiohttp()
+
+    def handler(name):
+        async def handle(request):
+            params = dict(request.query)
+            params.update(request.match_info)
+            try:
+                body = await service.query(name, params)
+            except QueryError as exc:
+                raise web.HTTPBadRequest(text=str(exc)) from None
+            return web.Response(body=body, content_type='application/json')
+        return handle
+
+    async def stats(request):
+        return web.json_response(dict(service.stats, cached=len(service._cache)))
+
+    app = web.Application()
+    app.add_routes([
+        web.get('/studios/top', handler('top_studios')),
+        web.get('/studios/revenue_by_year', handler('revenue_by_year')),
+        web.get('/genres/top', handler('top_genres')),
+        web.get('/genres/{genre}/revenue', handler('genre_revenue')),
+        web.get('/genres/{genre}/titles', handler('genre_title_counts')),
+        web.get('/stats', stats),
+    ])
+    return app
+
+
+def serve(data_dir='.', host='127.0.0.1', port=DEFAULT_PORT, cache_dir=None):
+    """Load the data, build the index and serve it until interrupted."""
+    _require_aiohttp()
+    service = QueryService(load_index(data_dir, cache_dir))
+    web.run_app(make_app(service), host=host, port=port)
+
@@ -0,0 +1,272 @@
+"""Versioned, memory-mapped snapshots of the cleaned and joined frames.
+
+Every consumer used to re-derive ``merged_data``, the genre-bearing IMDB
+titles and the cleaned Numbers budgets from the CSVs, and every process
+kept a private copy.  ``write_snapshot`` saves them once in the
+``MovieStore`` layout (numbers uncompacted), one file per array:
+
+    root/
+      CURRENT                     name of the current version directory
+      v000001/
+        manifest.json             tables, columns, kinds, dtypes, row counts
+        strings.data.npy          StringDictionary buffer (uint8)
+        strings.offsets.npy       StringDictionary offsets
+        <table>.<position>.npy    one fixed-width column, by its position
+                                  in the table (names are in the manifest)
+
+Numeric columns keep their dtype; string columns are int32 codes into the
+one shared ``StringDictionary``; ``tconst``-style ids are integers (see
+``store.PREFIXED_IDS``).  ``open_snapshot`` maps every file read-only with
+``np.load(mmap_mode='r')``, so forked workers and separate jobs on one
+host share the pages through the OS cache instead of each holding a copy.
+The result is a ``MovieStore``, so the group-by accessors work on the
+mapped codes directly and ``frame`` decodes a table when needed.
+
+A new version is written into a temporary directory, renamed to the next
+``vNNNNNN`` name and then published by atomically replacing ``CURRENT``.
+Publishing compares against ``CURRENT`` under an exclusive lock on
+``root/.lock``, so ``CURRENT`` only moves forward even when writers finish
+out of order.  Readers never see a partial version, and readers that have an older
+version open keep their mappings even after ``prune`` removes it.  Version
+directories get ``DIR_MODE`` rather than the owner-only mode of
+``tempfile.mkdtemp``, so other users' jobs can open them.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not POSIX; publishing is unlocked
+    fcntl = None
+
+from movie_analysis.store import MovieStore, StringDictionary
+
+FORMAT = 'movie-analysis-snapshot'
+FORMAT_VERSION = 1
+CURRENT = 'CURRENT'
+MANIFEST = 'manifest.json'
+LOCK = '.lock'
+DIR_MODE = 0o755
+
+# The frames a snapshot is normally made of, by snapshot table name.
+TABLES = ('merged_data', 'imdb_genre_data', 'tn_movie_budgets')
+
+
+class SnapshotError(Exception):
+    """A snapshot directory is missing, incomplete or of another format."""
+
+
+def version_name(version):
+    """Directory name of version number ``version``."""
+    return 'v%06d' % version
+
+
+def temporary_version(root):
+    """A new scratch directory under ``root`` with mode ``DIR_MODE``.
+
+    Fill it, then rename it to its version name; ``cube`` does the same.
+    """
+    tmp = tempfile.mkdtemp(dir=root, prefix='.tmp-')
+    os.chmod(tmp, DIR_MODE)
+    return tmp
+
+
+def _save_array(directory, name, values):
+    values = np.asarray(values)
+    if values.dtype.kind not in 'biuf':
+        raise ValueError('%s has dtype %s; snapshots only hold fixed-width numbers'
+                         % (name, values.dtype))
+    np.save(os.path.join(directory, name + '.npy'), np.ascontiguousarray(values))
+    return name + '.npy'
+
+
+def _load_array(directory, filename, mmap=True):
+    return np.load(os.path.join(directory, filename), mmap_mode='r' if mmap else None)
+
+
+class Snapshot(MovieStore):
+    """A ``MovieStore`` opened from a snapshot version.
+
+    Attributes
+    ----------
+    path : str
+        The version directory.
+    version : int
+        Version number.
+    manifest : dict
+        The parsed ``manifest.json``.
+    """
+
+    def __init__(self, tables, strings, string_columns, id_columns, path, manifest):
+        super().__init__(tables, strings, string_columns, id_columns)
+        self.path = path
+        self.manifest = manifest
+        self.version = manifest['version']
+
+
+def versions(root, marker=MANIFEST):
+    """Version numbers present under ``root``, oldest first.
+
+    A version counts once its directory holds the file ``marker``.
+    """
+    if not os.path.isdir(root):
+        return []
+    found = []
+    for name in os.listdir(root):
+        if name.startswith('v') and name[1:].isdigit() \
+                and os.path.exists(os.path.join(root, name, marker)):
+            found.append(int(name[1:]))
+    return sorted(found)
+
+
+def current_version(root):
+    """The version ``CURRENT`` points to, or None if nothing was published."""
+    try:
+        with open(os.path.join(root, CURRENT)) as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return int(name[1:])
+
+
+def write_snapshot(root, frames):
+    """Write ``{table: DataFrame}`` as a new version under ``root`` and publish it.
+
+    Returns the new version number.  The frames' index is not stored; the
+    tables come back with a RangeIndex.  Concurrent writers each get their
+    own version, and ``CURRENT`` ends at the newest of them: a writer that
+    finishes after a newer version was published leaves ``CURRENT`` alone.
+    """
+    store = MovieStore.from_frames(frames, compact=False)
+    os.makedirs(root, exist_ok=True)
+    tmp = temporary_version(root)
+    try:
+        manifest = {'format': FORMAT, 'format_version': FORMAT_VERSION,
+                    'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'tables': {}}
+        for table, columns in store.tables.items():
+            entries = []
+            for position, (name, values) in enumerate(columns.items()):
+                entry = {'name': name, 'dtype': values.dtype.str, 'kind': 'number',
+                         'file': _save_array(tmp, '%s.%d' % (table, position), values)}
+                if name in store.string_columns[table]:
+                    entry['kind'] = 'string'
+                elif name in store.id_columns[table]:
+                    prefix, digits = store.id_columns[table][name]
+                    entry.update(kind='id', prefix=prefix, digits=digits)
+                entries.append(entry)
+            manifest['tables'][table] = {'rows': store.rows(table), 'columns': entries}
+        manifest['strings'] = {
+            'data': _save_array(tmp, 'strings.data', store.strings.data),
+            'offsets': _save_array(tmp, 'strings.offsets', store.strings.offsets)}
+
+        def stamp(version):
+            manifest['version'] = version
+            with open(os.path.join(tmp, MANIFEST), 'w') as f:
+                json.dump(manifest, f, indent=1)
+
+        version = claim_version(root, tmp, stamp=stamp)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    publish(root, version)
+    return version
+
+
+def claim_version(root, tmp, marker=MANIFEST, stamp=None):
+    """Rename the filled directory ``tmp`` to the next free version; returns it.
+
+    Another writer may take a number first, in which case the rename fails
+    and the next number is tried.  ``stamp(version)`` is called before each
+    attempt, e.g. to record the number in the manifest.
+    """
+    version = max(versions(root, marker), default=0) + 1
+    while True:
+        if stamp is not None:
+            stamp(version)
+        try:
+            os.rename(tmp, os.path.join(root, version_name(version)))
+            return version
+        except OSError:
+            if not os.path.isdir(os.path.join(root, version_name(version))):
+                raise
+            version += 1
+
+
+def publish(root, version, marker=MANIFEST, drop_older=False):
+    """Point ``CURRENT`` at ``version`` unless a newer version is published.
+
+    The read-compare-replace runs under an exclusive lock on ``root/.lock``.
+    Returns whether ``CURRENT`` moved.  With ``drop_older``, versions older
+    than the one published are deleted under the same lock: since
+    ``CURRENT`` only moves forward, none of them can be published again.
+    """
+    with open(os.path.join(root, LOCK), 'a') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        current = current_version(root)
+        if current is not None and current >= version:
+            return False
+        pointer = os.path.join(root, '.%s.%d.tmp' % (CURRENT, os.getpid()))
+        with open(pointer, 'w') as f:
+            f.write(version_name(version) + '\n')
+        os.replace(pointer, os.path.join(root, CURRENT))
+        if drop_older:
+            for old in versions(root, marker):
+                if old < version:
+                    shutil.rmtree(os.path.join(root, version_name(old)), ignore_errors=True)
+        return True
+
+
+def open_snapshot(root, version=None, mmap=True):
+    """Open the current (or the given) version under ``root`` as a ``Snapshot``.
+
+    Columns are memory-mapped read-only unless ``mmap=False``.
+    """
+    if version is None:
+        version = current_version(root)
+        if version is None:
+            raise SnapshotError('%s: no snapshot has been published' % root)
+    path = os.path.join(root, version_name(version))
+    try:
+        with open(os.path.join(path, MANIFEST)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise SnapshotError('%s: no such snapshot version' % path) from None
+    if manifest.get('format') != FORMAT or manifest.get('format_version') != FORMAT_VERSION:
+        raise SnapshotError('%s: unsupported snapshot format %s/%s'
+                            % (path, manifest.get('format'), manifest.get('format_version')))
+
+    strings = StringDictionary(_load_array(path, manifest['strings']['data'], mmap),
+                               _load_array(path, manifest['strings']['offsets'], mmap))
+    tables, string_columns, id_columns = {}, {}, {}
+    for table, spec in manifest['tables'].items():
+        tables[table], string_columns[table], id_columns[table] = {}, set(), {}
+        for entry in spec['columns']:
+            tables[table][entry['name']] = _load_array(path, entry['file'], mmap)
+            if entry['kind'] == 'string':
+                string_columns[table].add(entry['name'])
+            elif entry['kind'] == 'id':
+                id_columns[table][entry['name']] = (entry['prefix'], entry['digits'])
+    return Snapshot(tables, strings, string_columns, id_columns, path, manifest)
+
+
+def prune(root, keep=2):
+    """Delete all but the newest ``keep`` versions (never the current one).
+
+    Processes that still have a deleted version open keep reading it: the
+    mapped files stay valid until they are unmapped.
+    """
+    current = current_version(root)
+    removed = []
+    for version in versions(root)[:-keep] if keep else versions(root):
+        if version != current:
+            shutil.rmtree(os.path.join(root, version_name(version)))
+            removed.append(version)
+    return removed
@@ -0,0 +1,97 @@
+"""The notebook's analysis steps as pipeline stages.
+
+Each function takes already loaded (and title-resolved) frames and returns
+the values the plotting cells use.  ``ANALYSIS_STAGES`` wires them into the
+DAG run by ``movie_analysis.pipeline.run_pipeline``.
+"""
+
+from movie_analysis.correlation import rating_box_office
+from movie_analysis.genres import GenreIndex
+from movie_analysis.pipeline import Stage
+from movie_analysis.roi import BudgetBands
+from movie_analysis.titles import UNMATCHED, join_on_ids, link
+
+TOP_STUDIOS = 50
+BUDGET_BANDS = 5
+
+
+def bom_tmdb_join(bom_movie_gross, tmdb_movies):
+    """In[5]: Box Office Mojo joined to TMDB, plus match statistics."""
+    return join_on_ids(bom_movie_gross, tmdb_movies)
+
+
+def imdb_genre_index(imdb_title_basics):
+    """In[23]: the IMDB titles' genres as one ``GenreIndex`` keyed by ``tconst``."""
+    return GenreIndex.from_series(imdb_title_basics['genres'], keys=imdb_title_basics['tconst'])
+
+
+def genre_distribution(imdb_genre_index):
+    """In[23]: number of IMDB titles per genre."""
+    return imdb_genre_index.counts()
+
+
+def genre_year_count(imdb_title_basics, imdb_genre_index):
+    """In[25]: genre x start_year title counts."""
+    return imdb_genre_index.crosstab(imdb_title_basics['start_year'])
+
+
+def genre_box_office(bom_movie_gross, imdb_title_basics, imdb_genre_index):
+    """In[26]/In[10]: domestic gross per genre over matched titles."""
+    positions, stats = link(bom_movie_gross['movie_id'], imdb_title_basics['movie_id'])
+    matched = positions != UNMATCHED
+    gross = imdb_genre_index.take(positions[matched]) \
+        .sum_by_genre(bom_movie_gross['domestic_gross'].to_numpy(dtype=float)[matched])
+    return gross, stats
+
+
+def budget_data(tn_movie_budgets):
+    """In[6]/In[7]: The Numbers rows with a production budget."""
+    return tn_movie_budgets.dropna(subset=['production_budget'])
+
+
+def rating_vs_box_office(merged_data, imdb_title_basics, tn_movie_budgets):
+    """TMDB ratings next to domestic/foreign/worldwide gross, one row per film."""
+    return rating_box_office(merged_data, imdb_title_basics, tn_movie_budgets)
+
+
+def roi_by_budget_band(budget_data):
+    """Median/mean/p90 worldwide ROI per budget quintile, with bootstrap CIs."""
+    return BudgetBands.from_frame(budget_data).summary(bands=BUDGET_BANDS)
+
+
+def studio_domestic_gross(bom_movie_gross):
+    """In[9]: total domestic gross per studio, largest first."""
+    return (bom_movie_gross.groupby('studio', observed=True)['domestic_gross']
+            .sum().sort_values(ascending=False))
+
+
+def revenue_by_year_top_50(bom_movie_gross, studio_domestic_gross):
+    """In[12]: yearly domestic gross of the top 50 studios."""
+    top_50_studios = studio_domestic_gross.head(TOP_STUDIOS).index
+    top_50_data = bom_movie_gross[bom_movie_gross['studio'].isin(top_50_studios)]
+    return top_50_data.groupby('year')['domestic_gross'].sum()
+
+
+ANALYSIS_STAGES = [
+    Stage('bom_tmdb_join', bom_tmdb_join,
+          ('bom_movie_gross', 'tmdb_movies'), ('merged_data', 'tmdb_match_stats')),
+    Stage('imdb_genre_index', imdb_genre_index,
+          ('imdb_title_basics',), ('imdb_genre_index',)),
+    Stage('genre_distribution', genre_distribution,
+          ('imdb_genre_index',), ('genre_distribution',)),
+    Stage('genre_year_count', genre_year_count,
+          ('imdb_title_basics', 'imdb_genre_index'), ('genre_year_count',)),
+    Stage('genre_box_office', genre_box_office,
+          ('bom_movie_gross', 'imdb_title_basics', 'imdb_genre_index'),
+          ('genre_box_office', 'imdb_match_stats')),
+    Stage('budget_data', budget_data,
+          ('tn_movie_budgets',), ('budget_data',)),
+    Stage('rating_vs_box_office', rating_vs_box_office,
+          ('merged_data', 'imdb_title_basics', 'tn_movie_budgets'), ('rating_box_office',)),
+    Stage('roi_by_budget_band', roi_by_budget_band,
+          ('budget_data',), ('roi_by_budget_band',)),
+    Stage('studio_domestic_gross', studio_domestic_gross,
+          ('bom_movie_gross',), ('studio_domestic_gross',)),
+    Stage('revenue_by_year_top_50', revenue_by_year_top_50,
+          ('bom_movie_gross', 'studio_domestic_gross'), ('revenue_by_year_top_50',)),
+]
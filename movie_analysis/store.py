@@ -0,0 +1,310 @@
+"""Compact, array-backed in-memory store of the four source tables.
+
+A loaded DataFrame keeps every title, tconst and date as its own Python
+string object (about 60-80 bytes each), and the joins copy them again.
+``MovieStore`` keeps each table as a dict of NumPy columns instead:
+
+* every string column (titles, studio, genres, dates, language) is an
+  int32 code into one ``StringDictionary`` shared by all tables.  Its
+  sorted distinct strings are packed into a single UTF-8 byte buffer with
+  an offsets array, so a string that appears in several columns or tables
+  (``primary_title``/``original_title``, the same film in BOM and TMDB) is
+  stored once;
+* IMDB ``tconst`` ids ('tt0063540') are stored as integers;
+* money columns stay float64, other floats become float32 and int64
+  columns become int32 where the values fit;
+* tables refer to each other by the integer ``movie_id`` resolved by
+  ``TitleIndex``; ``link`` turns it into row positions, so no denormalized
+  copies are made.
+
+The group-by accessors (``group_sum``, ``group_count``, ``genre_index``)
+work on the codes directly and return the same Series/``GenreIndex`` the
+stage functions build from frames; ``frame`` decodes a table back into a
+DataFrame (strings as categoricals) for code that needs one.
+
+The pipeline stages still run on DataFrames; the store is the layout
+``snapshot`` writes and memory-maps for sharing between processes.  Against
+pandas 3 frames, whose strings are already Arrow-backed, it is about 2.3x
+smaller; the 5-7x savings hold only against object-dtype string columns.
+"""
+
+import bisect
+
+import numpy as np
+import pandas as pd
+
+from movie_analysis.genres import GenreIndex
+from movie_analysis.titles import UNMATCHED, link
+
+MONEY_COLUMNS = frozenset(['domestic_gross', 'foreign_gross', 'production_budget',
+                           'worldwide_gross'])
+MISSING = -1
+
+# String id columns stored as integers: ``{column: (prefix, digits)}`` for
+# values like 'tt0063540'.  A column is only converted when every value
+# round-trips, otherwise it goes into the string dictionary.
+PREFIXED_IDS = {'tconst': ('tt', 7)}
+
+
+def _is_string(column):
+    return not (pd.api.types.is_numeric_dtype(column) or pd.api.types.is_bool_dtype(column))
+
+
+def _factorize(column):
+    # (codes, distinct values) of one string column; missing values get -1.
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.codes.to_numpy(), np.asarray(column.cat.categories, dtype=object)
+    codes, uniques = pd.factorize(column)
+    return codes, np.asarray(uniques, dtype=object)
+
+
+def _parse_ids(column, prefix, digits):
+    # int64 ids of a prefixed id column, or None if it does not round-trip.
+    values = pd.Series(column, copy=False).astype(object)
+    if values.isna().any() or not values.str.startswith(prefix).all():
+        return None
+    numbers = pd.to_numeric(values.str.slice(len(prefix)), errors='coerce')
+    if numbers.isna().any():
+        return None
+    numbers = numbers.to_numpy(dtype=np.int64)
+    if not (_format_ids(numbers, prefix, digits) == values.to_numpy()).all():
+        return None
+    return numbers
+
+
+def _format_ids(numbers, prefix, digits):
+    return pd.Series(numbers).map(('%s%%0%dd' % (prefix, digits)).__mod__).to_numpy(dtype=object)
+
+
+def _compact_numeric(name, column):
+    values = column.to_numpy()
+    if values.dtype.kind == 'f':
+        return values.astype(np.float64 if name in MONEY_COLUMNS else np.float32, copy=False)
+    if values.dtype.kind in 'iu' and values.dtype.itemsize > 4 and values.size \
+            and np.iinfo(np.int32).min <= values.min() and values.max() <= np.iinfo(np.int32).max:
+        return values.astype(np.int32)
+    return values
+
+
+class StringDictionary:
+    """Sorted distinct strings packed into one UTF-8 buffer.
+
+    String ``i`` is ``data[offsets[i]:offsets[i + 1]]``.  UTF-8 preserves
+    code point order, so the byte strings are sorted too and ``find`` is a
+    binary search on the buffer.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        """Pack already sorted, distinct ``strings``."""
+        encoded = [s.encode('utf-8') for s in strings]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        dtype = np.int32 if lengths.sum() < np.iinfo(np.int32).max else np.int64
+        offsets = np.zeros(len(encoded) + 1, dtype=dtype)
+        np.cumsum(lengths, out=offsets[1:])
+        data = np.frombuffer(b''.join(encoded), dtype=np.uint8).copy()
+        return cls(data, offsets)
+
+    @classmethod
+    def encode(cls, columns):
+        """Build one dictionary for several string columns.
+
+        Returns ``(dictionary, codes)`` with one int32 code array per
+        column (``MISSING`` for missing values).
+        """
+        factorized = [_factorize(column) for column in columns]
+        # One sorted factorize over every column's distinct values maps
+        # them all to dictionary codes at once.
+        mapping, strings = pd.factorize(
+            np.concatenate([np.array([], dtype=object)] + [u for _, u in factorized]), sort=True)
+        ends = np.cumsum([len(u) for _, u in factorized], dtype=np.int64)
+        codes = []
+        for (column_codes, _), column_mapping in zip(factorized, np.split(mapping, ends[:-1])):
+            codes.append(np.where(column_codes >= 0, column_mapping[column_codes], MISSING)
+                         .astype(np.int32))
+        return cls.from_strings(strings), codes
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _bytes(self, code):
+        return self.data[self.offsets[code]:self.offsets[code + 1]].tobytes()
+
+    def __getitem__(self, code):
+        return self._bytes(code).decode('utf-8')
+
+    def strings(self, codes):
+        """The strings for ``codes``, as an object array (None for ``MISSING``)."""
+        codes = np.asarray(codes)
+        distinct, inverse = np.unique(codes, return_inverse=True)
+        values = np.array([None if c == MISSING else self[c] for c in distinct], dtype=object)
+        return values[inverse.reshape(codes.shape)]
+
+    def find(self, value):
+        """Code of ``value``, or ``MISSING`` when it is not in the dictionary."""
+        key = value.encode('utf-8')
+        pos = bisect.bisect_left(range(len(self)), key, key=self._bytes)
+        return pos if pos < len(self) and self._bytes(pos) == key else MISSING
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + self.offsets.nbytes
+
+
+class MovieStore:
+    """Dictionary-encoded, array-backed copies of the source tables.
+
+    Attributes
+    ----------
+    tables : dict
+        ``{table: {column: np.ndarray}}``; string columns hold int32 codes.
+    strings : StringDictionary
+        Strings of every string column of every table.
+    string_columns : dict
+        ``{table: set of column names}`` holding dictionary codes.
+    id_columns : dict
+        ``{table: {column: (prefix, digits)}}`` for ``PREFIXED_IDS`` columns
+        stored as integers.
+    """
+
+    def __init__(self, tables, strings, string_columns, id_columns=None):
+        self.tables = tables
+        self.strings = strings
+        self.string_columns = string_columns
+        self.id_columns = id_columns or {table: {} for table in tables}
+        self._links = {}
+
+    @classmethod
+    def from_frames(cls, frames, compact=True):
+        """Build a store from ``{table name: DataFrame}``.
+
+        Use the pipeline's names (``bom_movie_gross``, ``imdb_title_basics``,
+        ``tmdb_movies``, ``tn_movie_budgets``) after ``movie_id`` has been
+        resolved, so the tables can be linked.  ``compact=False`` keeps
+        numeric columns in their original dtype.
+        """
+        tables = {table: {} for table in frames}
+        id_columns = {table: {} for table in frames}
+        string_cols = []
+        for table, frame in frames.items():
+            for name in frame.columns:
+                column = frame[name]
+                if not _is_string(column):
+                    tables[table][name] = _compact_numeric(name, column) if compact \
+                        else column.to_numpy()
+                    continue
+                ids = _parse_ids(column, *PREFIXED_IDS[name]) if name in PREFIXED_IDS else None
+                if ids is None:
+                    string_cols.append((table, name, column))
+                else:
+                    tables[table][name] = _compact_numeric(name, pd.Series(ids))
+                    id_columns[table][name] = PREFIXED_IDS[name]
+        strings, codes = StringDictionary.encode([column for _, _, column in string_cols])
+        string_columns = {table: set() for table in frames}
+        for (table, name, _), column_codes in zip(string_cols, codes):
+            tables[table][name] = column_codes
+            string_columns[table].add(name)
+        # Keep each table's original column order.
+        tables = {table: {name: tables[table][name] for name in frames[table].columns}
+                  for table in frames}
+        return cls(tables, strings, string_columns, id_columns)
+
+    def __len__(self):
+        return len(self.tables)
+
+    def rows(self, table):
+        """Number of rows of ``table``."""
+        return len(next(iter(self.tables[table].values()), ()))
+
+    def column(self, table, name):
+        """One column as a Series; string columns come back as categoricals."""
+        values = self.tables[table][name]
+        if name in self.id_columns[table]:
+            return pd.Series(_format_ids(values, *self.id_columns[table][name]), name=name)
+        if name not in self.string_columns[table]:
+            return pd.Series(values, name=name)
+        used, inverse = np.unique(values, return_inverse=True)
+        if used.size and used[0] == MISSING:
+            used, inverse = used[1:], inverse - 1
+        categories = pd.Index(self.strings.strings(used), dtype=object)
+        return pd.Series(pd.Categorical.from_codes(inverse.astype(np.int32), categories),
+                         name=name)
+
+    def frame(self, table, columns=None):
+        """Decode ``table`` (or some of its columns) into a DataFrame."""
+        columns = list(self.tables[table]) if columns is None else columns
+        return pd.DataFrame({name: self.column(table, name) for name in columns})
+
+    def link(self, left, right, on='movie_id'):
+        """Row position in ``right`` of every ``left`` row (-1 if none or ambiguous).
+
+        Positions come from ``titles.link`` over the integer ``on`` keys and
+        are cached per pair of tables.
+        """
+        key = (left, right, on)
+        if key not in self._links:
+            self._links[key], _ = link(self.tables[left][on], self.tables[right][on])
+        return self._links[key]
+
+    def _keys(self, table, by):
+        # (group number per row, -1 for missing; group labels)
+        values = self.tables[table][by]
+        if by in self.string_columns[table]:
+            used, inverse = np.unique(values, return_inverse=True)
+            if used.size and used[0] == MISSING:
+                used, inverse = used[1:], inverse - 1
+            return inverse, pd.Index(self.strings.strings(used), name=by)
+        inverse, labels = pd.factorize(values, sort=True)
+        return inverse, pd.Index(labels, name=by)
+
+    def group_count(self, table, by):
+        """Rows per value of ``by`` (missing keys skipped), in key order."""
+        groups, labels = self._keys(table, by)
+        counts = np.bincount(groups[groups >= 0], minlength=len(labels))
+        return pd.Series(counts, index=labels, name='count')
+
+    def group_sum(self, table, by, value):
+        """Sum of ``value`` per value of ``by``, like ``groupby(by)[value].sum()``.
+
+        Missing keys are skipped and NaN values count as zero.
+        """
+        groups, labels = self._keys(table, by)
+        values = self.tables[table][value].astype(np.float64)
+        keep = (groups >= 0) & ~np.isnan(values)
+        totals = np.bincount(groups[keep], weights=values[keep], minlength=len(labels))
+        return pd.Series(totals, index=labels, name=value)
+
+    def genre_index(self, table, column='genres', rows=None):
+        """``GenreIndex`` over a genres column, without decoding each row.
+
+        With ``rows`` (e.g. ``link('bom_movie_gross', 'imdb_title_basics')``)
+        the index has one row per position, taken from ``table``; -1 gives a
+        row with no genres.
+        """
+        codes = self.tables[table][column]
+        if rows is not None:
+            rows = np.asarray(rows)
+            codes = np.where(rows != UNMATCHED, codes[rows], MISSING)
+        used, inverse = np.unique(codes, return_inverse=True)
+        if used.size and used[0] == MISSING:
+            used, inverse = used[1:], inverse - 1
+        categories = pd.Index(self.strings.strings(used), dtype=object)
+        combos = pd.Categorical.from_codes(inverse.astype(np.int32), categories)
+        return GenreIndex.from_series(pd.Series(combos))
+
+    @property
+    def nbytes(self):
+        """Bytes held by all columns plus the shared string dictionary."""
+        return self.strings.nbytes + sum(values.nbytes for table in self.tables.values()
+                                         for values in table.values())
+
+    def memory_usage(self):
+        """Bytes per table (codes and numbers), plus the string dictionary."""
+        usage = {table: sum(values.nbytes for values in columns.values())
+                 for table, columns in self.tables.items()}
+        usage['strings'] = self.strings.nbytes
+        return pd.Series(usage, name='bytes')
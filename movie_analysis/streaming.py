@@ -0,0 +1,164 @@
+"""Chunked, bounded-memory versions of the box-office and genre rollups.
+
+The source CSVs are read ``chunksize`` rows at a time and reduced to
+mergeable partial aggregates (sum, count, min, max per key).  Only the
+partials are kept, so memory grows with the number of distinct studios,
+years, genres and movies rather than with the number of rows.
+
+The results match the in-memory notebook path: the same title index, the
+same NaN handling as ``groupby().sum()`` and the same one-partner join rule
+as ``join_on_ids``.  Money values are whole dollars or tenths, so the
+partial sums are exact and independent of the chunk size.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from movie_analysis.genres import GenreIndex
+from movie_analysis.loader import iter_csv_typed
+from movie_analysis.stages import TOP_STUDIOS
+from movie_analysis.titles import TitleIndex, UNMATCHED, normalize_titles
+
+DEFAULT_CHUNKSIZE = 1_000_000
+
+
+class PartialAggregate:
+    """Mergeable sum/count/min/max of a value per key.
+
+    ``count`` counts non-missing values, so a key whose values are all NaN
+    has ``sum == 0`` and ``count == 0``, as ``groupby().sum()`` would give.
+    """
+
+    _HOW = {'sum': 'sum', 'count': 'sum', 'min': 'min', 'max': 'max'}
+
+    def __init__(self, frame=None):
+        self.frame = frame if frame is not None else pd.DataFrame(
+            columns=list(self._HOW), dtype='float64')
+
+    @classmethod
+    def from_values(cls, keys, values):
+        """Reduce one chunk: ``keys`` is a Series or list of Series."""
+        values = pd.Series(values, copy=False).astype('float64')
+        grouped = values.groupby(keys, observed=True, dropna=True)
+        frame = grouped.agg(['sum', 'count', 'min', 'max'])
+        return cls(frame.astype('float64'))
+
+    def merge(self, other):
+        """Combine two partials into a new one."""
+        if self.frame.empty:
+            return PartialAggregate(other.frame)
+        if other.frame.empty:
+            return PartialAggregate(self.frame)
+        both = pd.concat([self.frame, other.frame])
+        levels = list(range(both.index.nlevels))
+        return PartialAggregate(both.groupby(level=levels).agg(self._HOW))
+
+    def __add__(self, other):
+        return self.merge(other)
+
+    @property
+    def sum(self):
+        return self.frame['sum']
+
+    @property
+    def count(self):
+        return self.frame['count']
+
+
+def stream_box_office(data_dir='.', chunksize=DEFAULT_CHUNKSIZE):
+    """One pass over bom.movie_gross.csv.
+
+    Returns ``(studio_year, movie)``: partial domestic gross per
+    (studio, year) and per (normalized title, year).
+    """
+    studio_year = PartialAggregate()
+    movie = PartialAggregate()
+    path = os.path.join(data_dir, 'bom.movie_gross.csv')
+    for chunk in iter_csv_typed(path, chunksize):
+        studio = chunk['studio'].astype('object')
+        studio_year += PartialAggregate.from_values(
+            [studio, chunk['year']], chunk['domestic_gross'])
+        movie += PartialAggregate.from_values(
+            [normalize_titles(chunk['title']), chunk['year']], chunk['domestic_gross'])
+    return studio_year, movie
+
+
+def studio_rollups(studio_year, top=TOP_STUDIOS):
+    """studio_domestic_gross, top studios and revenue_by_year_top_50."""
+    sums = studio_year.sum
+    studio_domestic_gross = (sums.groupby(level=0).sum()
+                             .sort_values(ascending=False))
+    studio_domestic_gross.index.name = 'studio'
+    studio_domestic_gross.name = 'domestic_gross'
+    top_studios = studio_domestic_gross.head(top).index
+    in_top = sums.index.get_level_values(0).isin(top_studios)
+    revenue_by_year = sums[in_top].groupby(level=1).sum().sort_index()
+    revenue_by_year.index.name = 'year'
+    revenue_by_year.name = 'domestic_gross'
+    return studio_domestic_gross, top_studios, revenue_by_year
+
+
+def stream_genres(movie, data_dir='.', chunksize=DEFAULT_CHUNKSIZE):
+    """One pass over title.basics.csv against the box-office movie partials.
+
+    Returns ``(genre_distribution, genre_year_count, genre_domestic_gross)``.
+    """
+    keys = movie.frame.index
+    title_index = TitleIndex.build(keys.get_level_values(0), keys.get_level_values(1))
+    # Movie partials in title-index order.
+    movie_ids = title_index.resolve(keys.get_level_values(0), keys.get_level_values(1),
+                                    year_tolerance=0)
+    movie_gross = np.full(len(title_index), np.nan)
+    counted = movie.count.to_numpy() > 0
+    movie_gross[movie_ids[counted]] = movie.sum.to_numpy()[counted]
+
+    imdb_matches = np.zeros(len(title_index), dtype=np.int64)
+    movie_genres = np.full(len(title_index), None, dtype=object)
+    year_count = None
+    path = os.path.join(data_dir, 'title.basics.csv')
+    for chunk in iter_csv_typed(path, chunksize):
+        chunk = chunk.dropna(subset=['genres'])
+        index = GenreIndex.from_series(chunk['genres'])
+        table = index.crosstab(chunk['start_year'])
+        year_count = table if year_count is None else year_count.add(table, fill_value=0)
+
+        ids = title_index.resolve(chunk['primary_title'], chunk['start_year'])
+        matched = ids != UNMATCHED
+        imdb_matches += np.bincount(ids[matched], minlength=len(title_index))
+        first = matched & (movie_genres[np.where(matched, ids, 0)] == None)  # noqa: E711
+        movie_genres[ids[first]] = chunk['genres'].astype('object').to_numpy()[first]
+
+    if year_count is None:
+        year_count = pd.DataFrame(dtype='int64')
+    year_count = year_count.fillna(0).astype('int64').sort_index().sort_index(axis=1)
+    year_count.index.name = 'genre'
+    genre_distribution = year_count.sum(axis=1).rename('count').sort_values(ascending=False)
+
+    # As in join_on_ids: only movies with exactly one IMDB title count.
+    unique = imdb_matches == 1
+    matched_index = GenreIndex.from_series(pd.Series(movie_genres[unique]))
+    genre_domestic_gross = matched_index.sum_by_genre(movie_gross[unique])
+    return genre_distribution, year_count, genre_domestic_gross
+
+
+def stream_rollups(data_dir='.', chunksize=DEFAULT_CHUNKSIZE):
+    """Compute the notebook's rollups with bounded memory.
+
+    Returns a dict with ``studio_domestic_gross``, ``top_50_studios``,
+    ``revenue_by_year_top_50``, ``genre_distribution``, ``genre_year_count``
+    and ``genre_domestic_gross``.
+    """
+    studio_year, movie = stream_box_office(data_dir, chunksize)
+    studio_domestic_gross, top_studios, revenue_by_year = studio_rollups(studio_year)
+    genre_distribution, genre_year_count, genre_domestic_gross = stream_genres(
+        movie, data_dir, chunksize)
+    return {
+        'studio_domestic_gross': studio_domestic_gross,
+        'top_50_studios': top_studios,
+        'revenue_by_year_top_50': revenue_by_year,
+        'genre_distribution': genre_distribution,
+        'genre_year_count': genre_year_count,
+        'genre_domestic_gross': genre_domestic_gross,
+    }
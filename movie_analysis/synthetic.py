@@ -0,0 +1,195 @@
+"""Synthetic versions of the four source CSVs, for benchmarks.
+
+``generate`` writes bom.movie_gross.csv, title.basics.csv, tmdb.movies.csv
+and tn.movie_budgets.csv with exactly the columns and formatting the
+analysis reads: '$1,234' money strings in The Numbers, '1,131.6' foreign
+grosses in Box Office Mojo, comma-joined IMDB genres and the unnamed index
+column of the TMDB export.  The distributions follow the real files:
+
+* titles are drawn from a shared pool with a Zipf-like popularity, so a few
+  titles (remakes, common names) appear many times, and the same film
+  appears across datasets under the same or a re-punctuated title;
+* each IMDB title has 1-3 of the 26 IMDB genres, weighted towards Drama,
+  Documentary and Comedy as in title.basics;
+* studios follow a long tail dominated by a handful of majors;
+* grosses and budgets are log-normal.
+
+Files are written in chunks, so row counts up to 10^8 run in bounded memory.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+GENRES = np.array([
+    'Drama', 'Documentary', 'Comedy', 'Thriller', 'Horror', 'Action',
+    'Romance', 'Biography', 'Crime', 'Adventure', 'Family', 'History',
+    'Mystery', 'Music', 'Fantasy', 'Sci-Fi', 'Animation', 'Sport', 'News',
+    'War', 'Musical', 'Western', 'Reality-TV', 'Talk-Show', 'Adult',
+    'Game-Show',
+])
+# Relative frequency of each genre in title.basics.
+GENRE_WEIGHTS = np.array([
+    49883, 32185, 25312, 11883, 10805, 10335, 9372, 8722, 6753, 6465, 6227,
+    6225, 4659, 4314, 3516, 3365, 2799, 2234, 1551, 853, 721, 467, 98, 50,
+    25, 2,
+], dtype=float)
+MAJOR_STUDIOS = ['BV', 'Uni.', 'WB', 'Fox', 'Sony', 'Par.', 'LGF', 'WB (NL)',
+                 'LG/S', 'P/DW', 'Wein.', 'FoxS', 'SGem', 'Rela.', 'SPC', 'IFC']
+N_STUDIOS = 257
+
+# Rows of each file per unit of ``rows`` (title.basics is the largest file,
+# as in the real data).
+RATIOS = {
+    'title.basics.csv': 1.0,
+    'tmdb.movies.csv': 0.2,
+    'bom.movie_gross.csv': 0.05,
+    'tn.movie_budgets.csv': 0.05,
+}
+
+_WORDS = np.array(['The', 'Last', 'Night', 'Love', 'Dark', 'House', 'Man',
+                   'Girl', 'Story', 'Day', 'World', 'Dead', 'Life', 'Home',
+                   'Blood', 'King', 'Lost', 'City', 'Time', 'Wild'])
+
+
+def _titles(idx):
+    # Title number i is '<word> <word> i': readable, with many near-collisions
+    # between words, and computed from i so no title pool is held in memory.
+    first = pd.Series(_WORDS[idx % len(_WORDS)])
+    second = pd.Series(_WORDS[(idx // len(_WORDS)) % len(_WORDS)])
+    return first.str.cat([second, pd.Series(idx).astype(str)], sep=' ').to_numpy(dtype=object)
+
+
+def _pick_titles(pool_size, n, rng):
+    # Zipf-like popularity: low title numbers are drawn far more often.
+    ranks = np.minimum(rng.zipf(1.3, n) - 1, pool_size - 1)
+    uniform = rng.integers(0, pool_size, n)
+    titles = _titles(np.where(rng.random(n) < 0.3, ranks, uniform))
+    # Some titles get punctuation, as the same film does across sources.
+    punct = rng.random(n) < 0.05
+    titles[punct] = pd.Series(titles[punct]).add(':').to_numpy()
+    return titles
+
+
+def _money(values, prefix='$'):
+    return pd.Series(values).map(lambda v: '%s%s' % (prefix, format(int(v), ',')))
+
+
+def _genres(n, rng):
+    # title.basics lists a title's genres in alphabetical order.
+    order = np.argsort(GENRES)
+    names = GENRES[order]
+    p = GENRE_WEIGHTS[order] / GENRE_WEIGHTS.sum()
+    k = rng.choice([1, 2, 3], size=n, p=[0.45, 0.3, 0.25])
+    picks = np.sort(rng.choice(len(names), size=(n, 3), p=p), axis=1)
+    parts = [pd.Series(names[picks[:, j]], dtype=object) for j in range(3)]
+    out = parts[0].copy()
+    # Repeated picks collapse, giving some titles fewer genres.
+    for j, use in ((1, (k >= 2) & (picks[:, 1] != picks[:, 0])),
+                   (2, (k >= 3) & (picks[:, 2] != picks[:, 1]))):
+        out[use] = out[use] + ',' + parts[j][use]
+    out[rng.random(n) < 0.04] = None
+    return out
+
+
+def _studios(n, rng):
+    names = np.array(MAJOR_STUDIOS + ['Studio%d' % i for i in range(N_STUDIOS - len(MAJOR_STUDIOS))])
+    ranks = np.minimum(rng.zipf(1.6, n) - 1, len(names) - 1)
+    studios = pd.Series(names[ranks], dtype=object)
+    studios[rng.random(n) < 0.002] = None
+    return studios
+
+
+def _bom(n, pool_size, rng, start):
+    domestic = np.round(rng.lognormal(15.5, 2.0, n), -2)
+    domestic[rng.random(n) < 0.01] = np.nan
+    foreign = pd.Series(np.round(rng.lognormal(16.5, 1.8, n) / 1e6, 1) * 1e6)
+    # Box Office Mojo writes grosses over $1bn in millions: '1,131.6'.
+    foreign = foreign.map(lambda v: format(v / 1e6, ',.1f') if v >= 1e9 else str(int(v)))
+    foreign[rng.random(n) < 0.4] = None
+    return pd.DataFrame({
+        'title': _pick_titles(pool_size, n, rng),
+        'studio': _studios(n, rng),
+        'domestic_gross': domestic,
+        'foreign_gross': foreign,
+        'year': rng.integers(2010, 2019, n),
+    })
+
+
+def _imdb(n, pool_size, rng, start):
+    runtime = rng.normal(95, 25, n).clip(3, 400).round()
+    runtime[rng.random(n) < 0.2] = np.nan
+    titles = _pick_titles(pool_size, n, rng)
+    return pd.DataFrame({
+        'tconst': pd.Series(np.arange(start, start + n)).map('tt{:07d}'.format),
+        'primary_title': titles,
+        'original_title': titles,
+        'start_year': rng.integers(2010, 2020, n),
+        'runtime_minutes': runtime,
+        'genres': _genres(n, rng),
+    })
+
+
+def _tmdb(n, pool_size, rng, start):
+    titles = _pick_titles(pool_size, n, rng)
+    day = pd.Timestamp('2010-01-01') + pd.to_timedelta(rng.integers(0, 3287, n), unit='D')
+    frame = pd.DataFrame({
+        'genre_ids': pd.Series(rng.integers(12, 10770, n)).map('[{}]'.format),
+        'id': np.arange(start, start + n),
+        'original_language': np.where(rng.random(n) < 0.85, 'en', 'fr'),
+        'original_title': titles,
+        'popularity': np.round(rng.lognormal(1.0, 1.0, n), 3),
+        'release_date': day.strftime('%Y-%m-%d'),
+        'title': titles,
+        'vote_average': np.round(rng.normal(6.0, 1.5, n).clip(0, 10), 1),
+        'vote_count': rng.zipf(1.5, n).clip(1, 25000),
+    })
+    frame.index = np.arange(start, start + n)
+    return frame
+
+
+def _tn(n, pool_size, rng, start):
+    budget = np.round(rng.lognormal(16.5, 1.3, n).clip(1100, 4.25e8), -3)
+    domestic = np.round(budget * rng.lognormal(0.0, 1.2, n), -2)
+    worldwide = domestic + np.round(budget * rng.lognormal(-0.2, 1.3, n), -2)
+    day = pd.Timestamp('1990-01-01') + pd.to_timedelta(rng.integers(0, 10957, n), unit='D')
+    return pd.DataFrame({
+        'id': rng.integers(1, 101, n),
+        'release_date': day.strftime('%b %d, %Y'),
+        'movie': _pick_titles(pool_size, n, rng),
+        'production_budget': _money(budget),
+        'domestic_gross': _money(domestic),
+        'worldwide_gross': _money(worldwide),
+    })
+
+
+_WRITERS = {
+    'bom.movie_gross.csv': (_bom, False),
+    'title.basics.csv': (_imdb, False),
+    'tmdb.movies.csv': (_tmdb, True),
+    'tn.movie_budgets.csv': (_tn, False),
+}
+
+
+def generate(data_dir, rows, seed=0, chunksize=1_000_000):
+    """Write the four synthetic CSVs for a dataset of ``rows`` IMDB titles.
+
+    The other files get ``RATIOS`` times as many rows (at least one).  The
+    output is deterministic for a given ``rows``, ``seed`` and ``chunksize``.
+    Returns ``{file name: row count}``.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    pool_size = max(int(rows * 0.6), 1)
+    written = {}
+    for name, (make, keep_index) in _WRITERS.items():
+        total = max(int(rows * RATIOS[name]), 1)
+        path = os.path.join(data_dir, name)
+        for start in range(0, total, chunksize):
+            n = min(chunksize, total - start)
+            frame = make(n, pool_size, rng, start)
+            frame.to_csv(path, mode='w' if start == 0 else 'a', header=start == 0,
+                         index=keep_index)
+        written[name] = total
+    return written
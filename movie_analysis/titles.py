@@ -0,0 +1,180 @@
+"""Normalized title + year index used to join the movie datasets.
+
+The notebook joined Box Office Mojo to TMDB and IMDB with ``pd.merge`` on raw
+title strings.  That rebuilt a hash table on every join and matched every
+same-named film (remakes, re-releases) against every other, which multiplied
+rows and inflated the genre revenue sums.
+
+``TitleIndex`` assigns an integer movie id to each distinct (normalized
+title, year) pair of a reference dataset.  Every dataset is resolved against
+it once, after which joins are integer lookups (``link``, ``join_on_ids``)
+that keep at most one partner per row and report what could not be matched.
+"""
+
+import re
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+_WHITESPACE = re.compile(r'\s+')
+_YEAR = re.compile(r'(\d{4})')
+
+# Keys pack a title code and a year into one int64: code * YEAR_BASE + year.
+YEAR_BASE = 10000
+UNMATCHED = -1
+
+
+class MatchStats(NamedTuple):
+    """How the rows of one dataset matched another."""
+
+    matched: int
+    ambiguous: int
+    unmatched: int
+
+
+def normalize_titles(titles):
+    """Casefold titles, strip punctuation and collapse whitespace.
+
+    The string work is done once per distinct title.
+    """
+    titles = pd.Series(titles, copy=False)
+    codes, uniques = pd.factorize(titles)
+    cleaned = (pd.Series(uniques, dtype='object').astype(str)
+               .str.casefold()
+               .str.replace(_PUNCTUATION, ' ', regex=True)
+               .str.replace(_WHITESPACE, ' ', regex=True)
+               .str.strip())
+    # Code -1 (missing title) picks the trailing None.
+    lookup = np.append(cleaned.to_numpy(dtype=object), None)
+    return pd.Series(lookup[codes], index=titles.index, dtype='object')
+
+
+def year_from_date(dates):
+    """Extract the four-digit year from date strings such as 'Dec 18, 2009'.
+
+    Returns a float Series so that missing years are NaN.
+    """
+    dates = pd.Series(dates, copy=False).astype('string')
+    years = pd.to_numeric(dates.str.extract(_YEAR, expand=False), errors='coerce')
+    return years.astype('float64')
+
+
+def _year_array(years, n):
+    if years is None:
+        return np.zeros(n, dtype=np.int64)
+    years = pd.to_numeric(pd.Series(years, copy=False), errors='coerce')
+    return years.fillna(0).to_numpy(dtype=np.int64)
+
+
+class TitleIndex:
+    """Sorted (normalized title, year) keys with integer movie ids.
+
+    The movie id of a key is its position in ``keys``.  A year of 0 stands
+    for "unknown".
+    """
+
+    def __init__(self, titles, keys):
+        self.titles = pd.Index(titles)
+        self.keys = np.asarray(keys, dtype=np.int64)
+
+    @classmethod
+    def build(cls, titles, years=None):
+        """Build the index from the titles and years of a reference dataset."""
+        normalized = normalize_titles(titles)
+        vocab = pd.Index(normalized.dropna().unique())
+        codes = vocab.get_indexer(normalized)
+        year_values = _year_array(years, len(codes))
+        keys = codes[codes >= 0] * YEAR_BASE + year_values[codes >= 0]
+        return cls(vocab, np.unique(keys))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _lookup(self, keys):
+        if not len(self.keys):
+            return np.full(len(keys), UNMATCHED, dtype=np.int64)
+        pos = np.searchsorted(self.keys, keys).clip(max=len(self.keys) - 1)
+        return np.where(self.keys[pos] == keys, pos, UNMATCHED)
+
+    def resolve(self, titles, years=None, year_tolerance=1):
+        """Map titles/years to movie ids, ``UNMATCHED`` (-1) when absent.
+
+        Rows are matched on the exact year first and then on years up to
+        ``year_tolerance`` away (IMDB start years and box-office years often
+        differ by one).  Without ``years`` only the title is compared, and
+        only when the index holds a single year for it.
+        """
+        codes = self.titles.get_indexer(normalize_titles(titles))
+        known = codes >= 0
+        ids = np.full(len(codes), UNMATCHED, dtype=np.int64)
+        if years is None:
+            lo = np.searchsorted(self.keys, codes * YEAR_BASE)
+            hi = np.searchsorted(self.keys, (codes + 1) * YEAR_BASE)
+            single = known & (hi - lo == 1)
+            ids[single] = lo[single]
+            return ids
+
+        year_values = _year_array(years, len(codes))
+        base = codes * YEAR_BASE
+        for delta in [0] + [d for k in range(1, year_tolerance + 1) for d in (-k, k)]:
+            todo = known & (ids == UNMATCHED)
+            if not todo.any():
+                break
+            ids[todo] = self._lookup(base[todo] + year_values[todo] + delta)
+        return ids
+
+    def save(self, path):
+        """Write the index to an ``.npz`` file."""
+        np.savez(path, titles=np.asarray(self.titles, dtype=str), keys=self.keys)
+
+    @classmethod
+    def load(cls, path):
+        """Read an index written by ``save``."""
+        with np.load(path) as data:
+            return cls(data['titles'].astype(object), data['keys'])
+
+
+def link(left_ids, right_ids):
+    """For every left row, find the single right row with the same movie id.
+
+    Returns ``(positions, stats)``: ``positions[i]`` is the row position in
+    the right dataset, or -1 when the id is unmatched or ambiguous (shared by
+    several right rows).  Ambiguous rows are never expanded into duplicates.
+    Repeated rows of one source film must be dropped first, or the film is
+    counted as ambiguous (``report.prepare_frames`` does this).
+    """
+    left_ids = np.asarray(left_ids, dtype=np.int64)
+    right_ids = np.asarray(right_ids, dtype=np.int64)
+    order = np.argsort(right_ids, kind='stable')
+    sorted_ids = right_ids[order]
+    lo = np.searchsorted(sorted_ids, left_ids, side='left')
+    hi = np.searchsorted(sorted_ids, left_ids, side='right')
+    n_found = np.where(left_ids == UNMATCHED, 0, hi - lo)
+
+    positions = np.full(len(left_ids), UNMATCHED, dtype=np.int64)
+    unique = n_found == 1
+    positions[unique] = order[lo[unique]]
+    stats = MatchStats(matched=int(unique.sum()),
+                       ambiguous=int((n_found > 1).sum()),
+                       unmatched=int((n_found == 0).sum()))
+    return positions, stats
+
+
+def join_on_ids(left, right, on='movie_id', suffixes=('_x', '_y')):
+    """Inner-join two frames on a resolved movie id column.
+
+    Each left row is paired with at most one right row (see ``link``), so
+    the result never has more rows than ``left``.  As with ``pd.merge``, the
+    ``on`` column appears once and other overlapping column names get
+    ``suffixes``.  Returns ``(joined, stats)``.
+    """
+    positions, stats = link(left[on], right[on])
+    keep = positions != UNMATCHED
+    left_part = left.iloc[np.flatnonzero(keep)].reset_index(drop=True)
+    right_part = right.iloc[positions[keep]].drop(columns=on).reset_index(drop=True)
+    overlap = left_part.columns.intersection(right_part.columns)
+    left_part = left_part.rename(columns={c: c + suffixes[0] for c in overlap})
+    right_part = right_part.rename(columns={c: c + suffixes[1] for c in overlap})
+    return pd.concat([left_part, right_part], axis=1), stats
@@ -0,0 +1,41 @@
+"""Shared fixtures: one small synthetic dataset per test session."""
+
+import shutil
+
+import pytest
+
+from movie_analysis.loader import load_all
+from movie_analysis.pipeline import run_pipeline
+from movie_analysis.report import prepare_frames
+from movie_analysis.stages import ANALYSIS_STAGES
+from movie_analysis.synthetic import generate
+
+ROWS = 10_000
+
+
+@pytest.fixture(scope='session')
+def data_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp('data')
+    generate(str(path), ROWS)
+    return str(path)
+
+
+@pytest.fixture
+def fresh_data_dir(data_dir, tmp_path):
+    """A private copy of the CSVs, with no Parquet cache yet."""
+    for name in ('bom.movie_gross.csv', 'title.basics.csv', 'tmdb.movies.csv',
+                 'tn.movie_budgets.csv'):
+        shutil.copy(f'{data_dir}/{name}', tmp_path / name)
+    return str(tmp_path)
+
+
+@pytest.fixture
+def frames(data_dir):
+    """Source frames with movie_id resolved, by stage input name."""
+    return prepare_frames(*load_all(data_dir, use_cache=False))
+
+
+@pytest.fixture
+def results(frames):
+    """Every analysis stage's output over ``frames``: the in-memory reference."""
+    return run_pipeline(ANALYSIS_STAGES, frames, workers=1)
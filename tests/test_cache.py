@@ -0,0 +1,85 @@
+"""The result cache serves unchanged stages and recomputes changed ones."""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+from movie_analysis import stages
+from movie_analysis.cache import ResultCache
+from movie_analysis.pipeline import run_pipeline
+
+STAGES = [s for s in stages.ANALYSIS_STAGES
+          if s.name in ('budget_data', 'roi_by_budget_band', 'studio_domestic_gross',
+                        'revenue_by_year_top_50')]
+
+
+def _run(frames, cache):
+    data = {name: frames[name] for name in ('tn_movie_budgets', 'bom_movie_gross')}
+    return run_pipeline(STAGES, data, cache=cache)
+
+
+def test_unchanged_rerun_hits(frames, tmp_path):
+    _run(frames, ResultCache(str(tmp_path)))
+    cache = ResultCache(str(tmp_path))
+    _run(frames, cache)
+    assert all(counts == {'hits': 1, 'misses': 0} for counts in cache.stats.values())
+
+
+def test_changed_parameter_invalidates(frames, tmp_path, monkeypatch):
+    before = _run(frames, ResultCache(str(tmp_path)))
+    monkeypatch.setattr(stages, 'BUDGET_BANDS', stages.BUDGET_BANDS + 2)
+    monkeypatch.setattr(stages, 'TOP_STUDIOS', 3)
+    cache = ResultCache(str(tmp_path))
+    after = _run(frames, cache)
+
+    assert cache.stats['budget_data'] == {'hits': 1, 'misses': 0}
+    assert cache.stats['roi_by_budget_band'] == {'hits': 0, 'misses': 1}
+    assert cache.stats['revenue_by_year_top_50'] == {'hits': 0, 'misses': 1}
+    assert len(after['roi_by_budget_band']) == len(before['roi_by_budget_band']) + 2
+    expected = stages.revenue_by_year_top_50(frames['bom_movie_gross'],
+                                             after['studio_domestic_gross'])
+    assert after['revenue_by_year_top_50'].equals(expected)
+    assert not after['revenue_by_year_top_50'].equals(before['revenue_by_year_top_50'])
+
+
+_RUN = '''
+import json, sys
+from movie_analysis.cache import ResultCache
+from movie_analysis.loader import load_all
+from movie_analysis.pipeline import run_pipeline
+from movie_analysis.report import prepare_frames
+from movie_analysis.stages import ANALYSIS_STAGES
+cache = ResultCache(sys.argv[2])
+run_pipeline(ANALYSIS_STAGES, prepare_frames(*load_all(sys.argv[1], use_cache=False)), cache=cache)
+print(json.dumps(cache.stats))
+'''
+
+
+def _edit(path, old, new):
+    with open(path) as f:
+        text = f.read()
+    assert old in text
+    with open(path, 'w') as f:
+        f.write(text.replace(old, new))
+
+
+def test_editing_charts_keeps_stage_hits(data_dir, tmp_path):
+    package = tmp_path / 'src' / 'movie_analysis'
+    shutil.copytree(os.path.dirname(stages.__file__), package,
+                    ignore=shutil.ignore_patterns('__pycache__'))
+    env = dict(os.environ, PYTHONPATH=str(package.parent))
+
+    def run():
+        out = subprocess.run([sys.executable, '-c', _RUN, data_dir, str(tmp_path / 'cache')],
+                             env=env, cwd=str(tmp_path), capture_output=True, text=True,
+                             check=True).stdout
+        return {name: counts['misses'] for name, counts in json.loads(out).items()}
+
+    assert all(run().values())
+    _edit(package / 'report.py', "'Genre Distribution'", "'Genres'")
+    _edit(package / 'charts.py', 'def ', '# edited\ndef ')
+    assert not any(run().values())
+    _edit(package / 'roi.py', 'n_boot=1000, ci=0.95', 'n_boot=1000, ci=0.9')
+    assert {name for name, misses in run().items() if misses} == {'roi_by_budget_band'}
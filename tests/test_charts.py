@@ -0,0 +1,58 @@
+"""Chart specs are deduplicated and rendered headless to files."""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from movie_analysis.charts import Chart, chart_key, render_charts
+from movie_analysis.report import chart_specs
+
+
+def _specs():
+    rng = np.random.default_rng(0)
+    points = pd.DataFrame({'budget': rng.lognormal(16, 1, 2000),
+                           'gross': rng.lognormal(17, 1.5, 2000)})
+    bars = pd.Series([3.0, 2.0, 1.0], index=['Drama', 'Comedy', 'Action'])
+    return [Chart('scatter_' + mode, 'scatter', points, 'Budget vs. Gross',
+                  options=(('mode', mode),))
+            for mode in ('points', 'rasterized', 'density')] + [
+        Chart('genres', 'bar', bars, 'Genres'),
+        Chart('genres_summary', 'bar', bars.copy(), 'Genres'),
+    ]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_render_charts_writes_each_distinct_chart_once(tmp_path, workers):
+    paths = render_charts(_specs(), str(tmp_path), formats=('png', 'svg'), workers=workers)
+
+    assert paths['genres_summary'] == paths['genres']
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        '%s.%s' % (name, fmt) for name in ('scatter_points', 'scatter_rasterized',
+                                           'scatter_density', 'genres')
+        for fmt in ('png', 'svg'))
+    for files in paths.values():
+        assert all(os.path.getsize(path) > 0 for path in files)
+
+    def svg(name):
+        with open(tmp_path / (name + '.svg')) as f:
+            return f.read()
+    # Rasterized and density scatters embed one image instead of a path per point.
+    assert '<image' not in svg('scatter_points')
+    assert '<image' in svg('scatter_rasterized')
+    assert '<image' in svg('scatter_density')
+    assert len(svg('scatter_density')) < len(svg('scatter_points')) / 2
+
+
+def test_render_charts_rejects_unknown_kind(tmp_path):
+    with pytest.raises(ValueError):
+        render_charts([Chart('pie', 'pie', pd.Series([1]), 'Pie')], str(tmp_path))
+
+
+def test_summary_charts_repeat_earlier_specs(results):
+    charts = chart_specs(results)
+    keys = {name: chart_key(chart) for name, chart in charts.items()}
+    assert keys['studio_domestic_gross_top_50'] == keys['top_50_studios']
+    assert keys['genre_domestic_gross_summary'] == keys['genre_domestic_gross']
+    assert len(set(keys.values())) == len(keys) - 3
@@ -0,0 +1,18 @@
+import numpy as np
+import pandas as pd
+
+from movie_analysis.cleaning import normalize_money, parse_money
+
+
+def test_parse_money_formats():
+    parsed = parse_money(['$425,000,000', '652000000', None, 'nan', ' $1,500 '])
+    np.testing.assert_array_equal(parsed, [425e6, 652e6, np.nan, np.nan, 1500.0])
+
+
+def test_foreign_gross_in_millions():
+    frame = pd.DataFrame({'foreign_gross': ['1,131.6', '652000000', None],
+                          'domestic_gross': ['1,131.6', '1', '2']})
+    normalize_money(frame, ['foreign_gross', 'domestic_gross'])
+    np.testing.assert_allclose(frame['foreign_gross'], [1_131_600_000.0, 652e6, np.nan])
+    # Only foreign_gross uses the millions notation.
+    assert frame['domestic_gross'][0] == 1131.6
@@ -0,0 +1,91 @@
+"""The ``movie-analysis`` subcommands on the synthetic data."""
+
+import os
+import subprocess
+import sys
+import tomllib
+
+import pandas as pd
+
+import movie_analysis
+from movie_analysis import cli
+from movie_analysis.cube import GenreYearCube
+from movie_analysis.snapshot import TABLES, open_snapshot, versions
+from movie_analysis.stages import ANALYSIS_STAGES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(movie_analysis.__file__)))
+
+# Makes every process of the child interpreter start its pools with spawn.
+_SPAWN = "import multiprocessing\nmultiprocessing.set_start_method('spawn', force=True)\n"
+
+
+def _main(capsys, *argv):
+    assert cli.main(list(argv)) == 0
+    return capsys.readouterr().out
+
+
+def _run(command, *argv, env=None, cwd=None):
+    return subprocess.run([sys.executable, *command, *argv], env=env, cwd=cwd,
+                          capture_output=True, text=True, check=True).stdout
+
+
+def test_entry_point_and_help(tmp_path):
+    with open(os.path.join(ROOT, 'pyproject.toml'), 'rb') as f:
+        target = tomllib.load(f)['project']['scripts']['movie-analysis']
+    assert target == 'movie_analysis.cli:main'
+
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    out = _run(['-m', 'movie_analysis'], '--help', env=env, cwd=str(tmp_path))
+    for command in ('load', 'aggregate', 'report', 'cube', 'snapshot', 'serve'):
+        assert command in out
+    assert cli.build_parser().parse_args(['aggregate']).workers == 1
+
+
+def test_load_and_aggregate(fresh_data_dir, tmp_path, capsys):
+    base = ['--data-dir', fresh_data_dir, '--cache-dir', str(tmp_path / 'cache')]
+    out = _main(capsys, *base, 'load')
+    assert [line.split()[0] for line in out.splitlines()] == [
+        'bom_movie_gross', 'imdb_title_basics', 'tmdb_movies', 'tn_movie_budgets']
+
+    out = _main(capsys, *base, 'aggregate', '--output', str(tmp_path / 'results'))
+    lines = dict(line.split(None, 1) for line in out.splitlines())
+    assert list(lines) == [name for stage in ANALYSIS_STAGES for name in stage.outputs]
+    tables = [name for name, text in lines.items() if text.endswith(' rows')]
+    assert sorted(os.listdir(tmp_path / 'results')) == sorted(name + '.csv' for name in tables)
+    written = pd.read_csv(tmp_path / 'results' / 'studio_domestic_gross.csv', index_col=0)
+    assert lines['studio_domestic_gross'] == '%d rows' % len(written)
+    assert os.listdir(tmp_path / 'cache' / 'results')
+
+
+def test_aggregate_with_spawned_workers(fresh_data_dir, tmp_path):
+    # Spawned workers re-import the file that was run as __main__; its
+    # guard must keep them from running the command again.
+    (tmp_path / 'site').mkdir()
+    (tmp_path / 'site' / 'sitecustomize.py').write_text(_SPAWN)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(tmp_path / 'site'), ROOT]))
+    main_file = os.path.join(ROOT, 'movie_analysis', '__main__.py')
+    out = _run([main_file], '--data-dir', fresh_data_dir, '--cache-dir',
+               str(tmp_path / 'cache'), 'aggregate', '--workers', '2', '--no-cache',
+               env=env, cwd=str(tmp_path))
+    names = [line.split()[0] for line in out.splitlines()]
+    assert names == [name for stage in ANALYSIS_STAGES for name in stage.outputs]
+
+
+def test_report_cube_and_snapshot(fresh_data_dir, tmp_path, capsys):
+    base = ['--data-dir', fresh_data_dir, '--cache-dir', str(tmp_path / 'cache')]
+    out = _main(capsys, *base, 'report', '--output-dir', str(tmp_path / 'figures'),
+                '--scatter-mode', 'density')
+    files = dict(line.split(' ', 1) for line in out.splitlines())
+    assert os.path.exists(files['budget_vs_worldwide_gross'])
+    assert files['genre_domestic_gross_summary'] == files['genre_domestic_gross']
+
+    _main(capsys, *base, 'cube', '--output', str(tmp_path / 'cube'))
+    cube = GenreYearCube.load(str(tmp_path / 'cube'))
+    assert cube.total('titles') > 0
+
+    snapshots = str(tmp_path / 'snapshots')
+    for _ in range(2):
+        out = _main(capsys, *base, 'snapshot', '--output', snapshots, '--keep', '1')
+    assert out.splitlines() == ['%s: published version 2' % snapshots, 'removed version 1']
+    assert versions(snapshots) == [2]
+    assert set(open_snapshot(snapshots).tables) == set(TABLES)
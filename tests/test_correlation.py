@@ -0,0 +1,54 @@
+"""CorrelationIndex slices equal correlations computed from the rows."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from movie_analysis.correlation import CorrelationIndex
+
+
+def _brute_force(frame, metric):
+    x = frame['vote_average'].to_numpy(dtype=float)
+    y = frame[metric].to_numpy(dtype=float)
+    w = np.nan_to_num(frame['vote_count'].to_numpy(dtype=float))
+    ok = np.isfinite(x) & np.isfinite(y)
+    x, y, w = x[ok], y[ok], w[ok]
+    if x.size < 2:
+        return x.size, np.nan, np.nan, np.nan
+    dx, dy = x - np.average(x, weights=w), y - np.average(y, weights=w)
+    weighted = (w * dx * dy).sum() / np.sqrt((w * dx * dx).sum() * (w * dy * dy).sum())
+    spearman = np.corrcoef(pd.Series(x).rank(), pd.Series(y).rank())[0, 1]
+    return x.size, np.corrcoef(x, y)[0, 1], spearman, weighted
+
+
+SLICES = [
+    {},
+    {'genres': 'Drama'},
+    {'genres': ['Comedy', 'Horror']},
+    {'studios': 'BV'},
+    {'years': (2012, 2015)},
+    {'studios': ['BV', 'Uni.', 'WB'], 'years': [2011, 2013, 2016]},
+]
+
+
+def _select(frame, genres=None, studios=None, years=None):
+    keep = np.ones(len(frame), dtype=bool)
+    if genres is not None:
+        wanted = {genres} if isinstance(genres, str) else set(genres)
+        listed = frame['genres'].fillna('').str.split(',')
+        keep &= listed.map(lambda names: bool(wanted.intersection(names))).to_numpy()
+    if studios is not None:
+        keep &= frame['studio'].isin([studios] if isinstance(studios, str) else studios).to_numpy()
+    if years is not None:
+        keep &= (frame['year'].between(*years) if isinstance(years, tuple)
+                 else frame['year'].isin(years)).to_numpy()
+    return frame[keep]
+
+
+@pytest.mark.parametrize('metric', ['domestic_gross', 'worldwide_gross'])
+@pytest.mark.parametrize('filters', SLICES)
+def test_correlate_matches_brute_force(results, filters, metric):
+    frame = results['rating_box_office']
+    got = CorrelationIndex.from_frame(frame).correlate(metric, **filters)
+    np.testing.assert_allclose(tuple(got), _brute_force(_select(frame, **filters), metric),
+                               rtol=1e-9, atol=1e-12)
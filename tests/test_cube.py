@@ -0,0 +1,79 @@
+"""Saving and loading the genre x year x studio cube."""
+
+import multiprocessing
+import os
+
+import numpy as np
+
+from movie_analysis.cube import GenreYearCube, _published
+from movie_analysis import snapshot
+from movie_analysis.snapshot import DIR_MODE, current_version, versions
+
+
+def _cube(frames):
+    return GenreYearCube.from_frames(frames['bom_movie_gross'], frames['imdb_title_basics'],
+                                     frames['tn_movie_budgets'])
+
+
+def test_save_publishes_array_and_axes_together(frames, tmp_path):
+    cube = _cube(frames)
+    cube.save(str(tmp_path))
+    old = GenreYearCube.load(str(tmp_path))
+
+    smaller = GenreYearCube(cube.prefix[:, :, :, -3:], cube.genres,
+                            cube.studios[-3:], cube.first_year)
+    smaller.save(str(tmp_path))
+    new = GenreYearCube.load(str(tmp_path))
+    assert os.stat(tmp_path / _published(str(tmp_path))).st_mode & 0o777 == DIR_MODE
+
+    assert list(new.studios) == list(smaller.studios)
+    np.testing.assert_array_equal(new.prefix, smaller.prefix)
+    # The replaced version is gone, but a reader that mapped it keeps it.
+    assert versions(str(tmp_path), 'axes.json') == [2]
+    np.testing.assert_array_equal(old.prefix, cube.prefix)
+    assert old.total() == cube.total()
+
+
+
+def _save(cube, path, times):
+    for _ in range(times):
+        cube.save(path)
+
+
+def test_concurrent_saves_keep_the_newest_cube(frames, tmp_path):
+    path = str(tmp_path)
+    cube = _cube(frames)
+    ctx = multiprocessing.get_context('fork')
+    writers = [ctx.Process(target=_save, args=(cube, path, 3)) for _ in range(4)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    assert all(writer.exitcode == 0 for writer in writers)
+
+    # Every older version was dropped by the save that published a newer one.
+    assert versions(path, 'axes.json') == [current_version(path)]
+    np.testing.assert_array_equal(GenreYearCube.load(path).prefix, cube.prefix)
+    # A save that finishes after a newer one leaves CURRENT alone.
+    newest = current_version(path)
+    assert not snapshot.publish(path, newest - 1, marker='axes.json')
+    assert current_version(path) == newest
+
+
+def test_cube_matches_stages(frames, results):
+    cube = _cube(frames)
+    studio_gross = results['studio_domestic_gross']
+    studios = list(studio_gross.index.astype(object))
+    np.testing.assert_array_equal(cube.by_studio()[studios], studio_gross)
+
+    genre_gross = results['genre_box_office']
+    np.testing.assert_array_equal(cube.by_genre()[list(genre_gross.index)], genre_gross)
+
+    year_count = results['genre_year_count']
+    years = (year_count.columns.min(), year_count.columns.max())
+    table = cube.table('titles', years=years)
+    np.testing.assert_array_equal(table.loc[year_count.index, year_count.columns], year_count)
+
+    revenue = results['revenue_by_year_top_50']
+    series = cube.series(studios=studios[:50])
+    np.testing.assert_array_equal(series[revenue.index], revenue)
@@ -0,0 +1,52 @@
+"""Applying deltas gives the same aggregates as a full recompute."""
+
+import numpy as np
+import pandas as pd
+
+from movie_analysis.incremental import AggregateState
+from movie_analysis.titles import normalize_titles
+
+
+def _assert_same(state, expected):
+    got, expected = state.results(), expected.results()
+    assert list(got['top_50_studios']) == list(expected['top_50_studios'])
+    for name in ('studio_domestic_gross', 'revenue_by_year_top_50', 'genre_domestic_gross'):
+        pd.testing.assert_series_equal(got[name].sort_index(), expected[name].sort_index(),
+                                       check_names=False, check_index_type=False)
+    pd.testing.assert_frame_equal(got['genre_year_count'], expected['genre_year_count'])
+
+
+def _split(bom, fraction, seed=0):
+    # Mask of the rows of a random ``fraction`` of the (title, year) keys:
+    # a delta replaces whole keys, so a key's rows stay together.
+    keys = pd.Series(list(zip(normalize_titles(bom['title']), bom['year'])))
+    chosen = keys.drop_duplicates().sample(frac=fraction, random_state=seed)
+    return keys.isin(set(chosen)).to_numpy()
+
+
+def test_delta_matches_full_recompute(frames):
+    bom, imdb = frames['bom_movie_gross'], frames['imdb_title_basics']
+    late = _split(bom, 0.3)
+    state = AggregateState.from_frames(bom[~late], imdb)
+    state.apply_delta(bom[late])
+    _assert_same(state, AggregateState.from_frames(bom, imdb))
+
+
+def test_deleting_rows_matches_full_recompute(frames):
+    bom, imdb = frames['bom_movie_gross'], frames['imdb_title_basics']
+    gone = _split(bom, 0.2, seed=1)
+    state = AggregateState.from_frames(bom, imdb)
+    state.apply_delta(bom[gone].assign(deleted=True))
+    _assert_same(state, AggregateState.from_frames(bom[~gone], imdb))
+
+
+def test_title_delta_matches_full_recompute(frames):
+    bom, imdb = frames['bom_movie_gross'], frames['imdb_title_basics']
+    rng = np.random.default_rng(2)
+    changed = imdb.sample(n=500, random_state=3).copy()
+    changed['genres'] = rng.choice(['Drama', 'Comedy,Drama', 'Horror'], len(changed))
+    state = AggregateState.from_frames(bom, imdb)
+    state.apply_titles_delta(changed)
+    updated = imdb.copy()
+    updated.loc[changed.index, 'genres'] = changed['genres']
+    _assert_same(state, AggregateState.from_frames(bom, updated))
@@ -0,0 +1,84 @@
+"""Per-stage metrics records: logging, cache hits, workers and profiles."""
+
+import json
+import os
+import pstats
+
+import pandas as pd
+
+from movie_analysis import stages
+from movie_analysis.cache import ResultCache
+from movie_analysis.instrument import Instrumentation
+from movie_analysis.pipeline import run_pipeline
+from movie_analysis.titles import join_on_ids
+
+STAGES = [s for s in stages.ANALYSIS_STAGES
+          if s.name in ('budget_data', 'roi_by_budget_band', 'studio_domestic_gross',
+                        'revenue_by_year_top_50')]
+
+
+def _data(frames):
+    return {name: frames[name] for name in ('tn_movie_budgets', 'bom_movie_gross')}
+
+
+def _log(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_run_logs_json_lines(tmp_path):
+    log = str(tmp_path / 'logs' / 'metrics.jsonl')
+    instrumentation = Instrumentation(log_path=log)
+    left = pd.DataFrame({'movie_id': [0, 1, 2, -1], 'gross': [1.0, 2.0, 3.0, 4.0]})
+    right = pd.DataFrame({'movie_id': [1, 2, 2], 'genres': ['Drama', 'Comedy', 'Action']})
+    joined = instrumentation.run('join', join_on_ids, left, right)[0]
+    instrumentation.run('traced', lambda frame: frame.copy(), left, trace_memory=True)
+
+    records = _log(log)
+    assert records == instrumentation.records
+    join, traced = records
+    assert join['stage'] == 'join' and join['pid'] == os.getpid()
+    assert join['rows_in'] == [4, 3] and join['rows_out'] == [len(joined), None]
+    assert join['fan_out'] == 0.25
+    assert join['match'] == {'matched': 1, 'ambiguous': 1, 'unmatched': 2}
+    assert join['input_bytes'] > 0 and join['wall_s'] >= 0
+    # Memory is only traced when asked for.
+    assert 'traced_peak_bytes' not in join
+    assert traced['traced_peak_bytes'] >= 0
+
+    summary = instrumentation.summary()
+    assert list(summary.index) == ['join', 'traced']
+    assert {'input_mb', 'output_mb', 'traced_peak_mb'} <= set(summary.columns)
+    assert 'pid' not in summary
+
+
+def test_cache_hits_are_logged(frames, tmp_path):
+    run_pipeline(STAGES, _data(frames), cache=ResultCache(str(tmp_path / 'cache')),
+                 instrumentation=Instrumentation())
+    instrumentation = Instrumentation(log_path=str(tmp_path / 'metrics.jsonl'))
+    run_pipeline(STAGES, _data(frames), cache=ResultCache(str(tmp_path / 'cache')),
+                 instrumentation=instrumentation)
+
+    records = _log(tmp_path / 'metrics.jsonl')
+    assert sorted(r['stage'] for r in records) == sorted(s.name for s in STAGES)
+    assert all(r['cache_hit'] for r in records)
+    assert not any('wall_s' in r for r in records)
+
+
+def test_worker_records_and_profiles(frames, tmp_path):
+    profiles = tmp_path / 'profiles'
+    instrumentation = Instrumentation(log_path=str(tmp_path / 'metrics.jsonl'),
+                                      profile_dir=str(profiles))
+    run_pipeline(STAGES, _data(frames), workers=2, instrumentation=instrumentation)
+
+    records = _log(tmp_path / 'metrics.jsonl')
+    assert records == instrumentation.records
+    assert sorted(r['stage'] for r in records) == sorted(s.name for s in STAGES)
+    # The records were measured in the workers and sent back to the parent.
+    assert all(r['pid'] != os.getpid() for r in records)
+    assert all(r['rows_in'] and r['wall_s'] >= 0 for r in records)
+    assert 'traced_peak_bytes' not in records[0]
+
+    for stage in STAGES:
+        stats = pstats.Stats(str(profiles / (stage.name + '.prof')))
+        assert any(name == stage.func.__name__ for _, _, name in stats.stats)
@@ -0,0 +1,12 @@
+import pandas as pd
+
+from movie_analysis.cache import fingerprint
+from movie_analysis.loader import load_all
+
+
+def test_cached_load_matches_fresh_parse(fresh_data_dir):
+    parsed = load_all(fresh_data_dir)
+    cached = load_all(fresh_data_dir)
+    for first, second in zip(parsed, cached):
+        pd.testing.assert_frame_equal(first, second)
+        assert fingerprint(first) == fingerprint(second)
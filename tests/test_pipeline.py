@@ -0,0 +1,47 @@
+"""The process-pool scheduler gives the same outputs as a sequential run."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from movie_analysis.cache import ResultCache
+from movie_analysis.genres import GenreIndex
+from movie_analysis.pipeline import PipelineError, Stage, run_pipeline
+from movie_analysis.stages import ANALYSIS_STAGES
+
+
+def _assert_same(got, expected):
+    assert set(got) == set(expected)
+    for name, value in expected.items():
+        if isinstance(value, pd.DataFrame):
+            pd.testing.assert_frame_equal(got[name], value)
+        elif isinstance(value, pd.Series):
+            pd.testing.assert_series_equal(got[name], value)
+        elif isinstance(value, GenreIndex):
+            assert isinstance(got[name], GenreIndex)
+            pd.testing.assert_index_equal(got[name].genres, value.genres)
+            pd.testing.assert_index_equal(got[name].keys, value.keys)
+            np.testing.assert_array_equal(got[name].indptr, value.indptr)
+            np.testing.assert_array_equal(got[name].indices, value.indices)
+        else:
+            assert got[name] == value, name
+
+
+def test_parallel_matches_sequential(frames, results, tmp_path):
+    _assert_same(run_pipeline(ANALYSIS_STAGES, frames, workers=2), results)
+
+    cache = ResultCache(str(tmp_path))
+    _assert_same(run_pipeline(ANALYSIS_STAGES, frames, workers=2, cache=cache), results)
+    rerun = ResultCache(str(tmp_path))
+    _assert_same(run_pipeline(ANALYSIS_STAGES, frames, workers=2, cache=rerun), results)
+    assert all(counts == {'hits': 1, 'misses': 0} for counts in rerun.stats.values())
+    # A sequential run reads the same entries.
+    _assert_same(run_pipeline(ANALYSIS_STAGES, frames, cache=ResultCache(str(tmp_path))),
+                 results)
+
+
+def test_graph_errors(frames):
+    with pytest.raises(PipelineError, match='no stage produces'):
+        run_pipeline([Stage('s', len, ('missing',), ('n',))], frames)
+    with pytest.raises(PipelineError, match='produced twice'):
+        run_pipeline([Stage('s', len, ('tmdb_movies',), ('bom_movie_gross',))], frames)
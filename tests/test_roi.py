@@ -0,0 +1,23 @@
+"""The batched Poisson bootstrap equals resampling each band explicitly."""
+
+import numpy as np
+
+from movie_analysis.roi import STATISTICS, BudgetBands
+
+
+def test_bootstrap_matches_explicit_resamples(frames):
+    bands = BudgetBands.from_frame(frames['tn_movie_budgets'])
+    n_boot, seed, ci = 200, 3, 0.9
+    summary = bands.summary(bands=5, n_boot=n_boot, seed=seed, ci=ci)
+    counts = bands.weights(n_boot, seed)
+    bounds = bands.bounds(bands.edges(5))
+
+    for band, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+        resamples = [np.repeat(bands.roi[start:stop], row[start:stop]) for row in counts]
+        stats = np.array([(np.quantile(s, 0.5), s.mean(), np.quantile(s, 0.9)) if s.size
+                          else (np.nan,) * 3 for s in resamples])
+        low, high = np.nanquantile(stats, [(1 - ci) / 2, (1 + ci) / 2], axis=0)
+        row = summary.iloc[band]
+        np.testing.assert_allclose([row[s + '_roi_low'] for s in STATISTICS], low, rtol=1e-12)
+        np.testing.assert_allclose([row[s + '_roi_high'] for s in STATISTICS], high, rtol=1e-12)
+        assert row['films'] == stop - start
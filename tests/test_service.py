@@ -0,0 +1,91 @@
+"""The query service's index answers the same as the stages, and the service
+coalesces and caches queries."""
+
+import asyncio
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from movie_analysis import stages
+from movie_analysis.service import AggregateIndex, QueryError, QueryService
+
+
+def _by_label(series):
+    return series.sort_index().astype(float)
+
+
+def test_top_studios_keeps_studios_without_grosses(frames):
+    bom = frames['bom_movie_gross'].copy()
+    studio = bom['studio'].cat.add_categories(['Ungrossed'])
+    studio.iloc[:3] = 'Ungrossed'
+    bom['studio'] = studio
+    bom.loc[bom.index[:3], 'domestic_gross'] = np.nan
+    index = AggregateIndex.from_frames(bom, frames['imdb_title_basics'])
+
+    expected = stages.studio_domestic_gross(bom)
+    top = index.top_studios(k=len(index.studios))
+    assert top['Ungrossed'] == 0.0
+    pd.testing.assert_series_equal(_by_label(top), _by_label(expected),
+                                   check_names=False, check_index_type=False)
+
+
+def test_index_matches_stages(frames, results):
+    index = AggregateIndex.from_frames(frames['bom_movie_gross'], frames['imdb_title_basics'])
+    pd.testing.assert_series_equal(
+        _by_label(index.top_studios(k=len(index.studios))),
+        _by_label(results['studio_domestic_gross']),
+        check_names=False, check_index_type=False)
+    pd.testing.assert_series_equal(
+        _by_label(index.top_genres(k=len(index.genres))),
+        _by_label(results['genre_box_office']),
+        check_names=False, check_index_type=False)
+    pd.testing.assert_series_equal(index.revenue_by_year(50), results['revenue_by_year_top_50'],
+                                   check_names=False, check_index_type=False)
+    year_count = results['genre_year_count']
+    for genre in year_count.index:
+        np.testing.assert_array_equal(index.genre_title_counts(genre), year_count.loc[genre])
+
+
+class _CountingService(QueryService):
+    def __init__(self, index, **kwargs):
+        super().__init__(index, **kwargs)
+        self.computed = []
+        self.release = threading.Event()
+
+    def compute(self, name, kwargs):
+        self.computed.append((name, kwargs))
+        self.release.wait(5)
+        return super().compute(name, kwargs)
+
+
+def test_query_service_coalesces_and_caches(frames):
+    index = AggregateIndex.from_frames(frames['bom_movie_gross'], frames['imdb_title_basics'])
+    service = _CountingService(index, cache_entries=1)
+
+    async def run():
+        # Equal parameters spelled differently are the same query.
+        params = [{'k': '5', 'start': '2012'}, {'k': 5, 'start': 2012, 'end': ''}] * 4
+        tasks = [asyncio.ensure_future(service.query('top_studios', p)) for p in params]
+        while not service.computed:
+            await asyncio.sleep(0.01)
+        service.release.set()
+        bodies = await asyncio.gather(*tasks)
+        assert service.stats == {'hits': 0, 'misses': 1, 'coalesced': 7}
+        assert len(set(bodies)) == 1
+
+        assert await service.query('top_studios', {'start': 2012, 'k': 5}) == bodies[0]
+        assert service.stats['hits'] == 1
+        await service.query('top_genres', {})
+        await service.query('top_studios', {'start': 2012, 'k': 5})  # evicted by top_genres
+        with pytest.raises(QueryError):
+            await service.query('top_studios', {'k': 'many'})
+        return bodies[0]
+
+    body = json.loads(asyncio.run(run()))
+    assert [name for name, _ in service.computed] == ['top_studios', 'top_genres', 'top_studios']
+    expected = index.top_studios(k=5, start=2012)
+    assert [r['studio'] for r in body['data']] == list(expected.index)
+    service.executor.shutdown()
@@ -0,0 +1,46 @@
+"""Snapshot round-trip and publishing."""
+
+import os
+
+import pandas as pd
+
+from movie_analysis import snapshot
+from movie_analysis.snapshot import TABLES, current_version, open_snapshot, write_snapshot
+
+
+def _values(column):
+    # Decoded strings come back as categoricals; compare plain values.
+    column = column.astype(object)
+    return column.where(column.notna(), None)
+
+
+def test_round_trip(frames, results, tmp_path):
+    tables = dict(zip(TABLES, (results['merged_data'], frames['imdb_title_basics'],
+                               results['budget_data'])))
+    version = write_snapshot(str(tmp_path), tables)
+    snap = open_snapshot(str(tmp_path))
+    assert snap.version == version
+    assert os.stat(snap.path).st_mode & 0o777 == snapshot.DIR_MODE
+
+    for table, frame in tables.items():
+        decoded = snap.frame(table)
+        assert list(decoded.columns) == list(frame.columns)
+        for column in frame.columns:
+            pd.testing.assert_series_equal(_values(decoded[column]),
+                                           _values(frame[column].reset_index(drop=True)))
+    totals = snap.group_sum('merged_data', 'studio', 'domestic_gross')
+    expected = results['merged_data'].groupby('studio', observed=True)['domestic_gross'].sum()
+    expected.index = expected.index.astype(object)
+    pd.testing.assert_series_equal(totals.sort_index(), expected.sort_index(),
+                                   check_names=False, check_index_type=False)
+
+
+def test_late_writer_does_not_move_current_back(frames, tmp_path):
+    root = str(tmp_path)
+    budgets = {'tn_movie_budgets': frames['tn_movie_budgets']}
+    write_snapshot(root, budgets)
+    # A writer that claimed version 2 publishes after version 3 is out.
+    newer = write_snapshot(root, budgets)
+    assert not snapshot.publish(root, newer - 1)
+    assert current_version(root) == newer
+    assert open_snapshot(root).version == newer
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from movie_analysis.genres import GenreIndex
+from movie_analysis.pipeline import run_pipeline
+from movie_analysis.stages import ANALYSIS_STAGES
+from movie_analysis.titles import join_on_ids
+
+
+def _exploded(frame):
+    # The notebook's original one-row-per-genre frame.
+    genres = frame['genres'].astype(object).str.split(',').explode().rename('genre')
+    return frame.drop(columns='genres').join(genres)
+
+
+def test_genre_stages_match_exploded_frame(frames):
+    imdb = frames['imdb_title_basics']
+    results = run_pipeline(ANALYSIS_STAGES, frames, workers=1)
+    index = results['imdb_genre_index']
+    assert isinstance(index, GenreIndex)
+    assert index.keys.equals(pd.Index(imdb['tconst']))
+
+    exploded = _exploded(imdb)
+    distribution = exploded['genre'].value_counts()
+    pd.testing.assert_series_equal(results['genre_distribution'].sort_index(),
+                                   distribution.sort_index().rename('count').rename_axis('genre'),
+                                   check_dtype=False)
+
+    by_year = exploded.groupby(['genre', 'start_year']).size().unstack(fill_value=0)
+    np.testing.assert_array_equal(results['genre_year_count'].loc[by_year.index, by_year.columns],
+                                  by_year)
+
+    merged, _ = join_on_ids(frames['bom_movie_gross'], imdb)
+    gross = _exploded(merged).groupby('genre')['domestic_gross'].sum()
+    np.testing.assert_allclose(results['genre_box_office'].sort_index(), gross.sort_index())
+
+
+def test_genre_index_take():
+    index = GenreIndex.from_series(pd.Series(['Drama,Action', None, 'Comedy']),
+                                   keys=['tt1', 'tt2', 'tt3'])
+    taken = index.take([2, 0, 1])
+    assert list(taken.keys) == ['tt3', 'tt1', 'tt2']
+    assert list(taken.counts().sort_index().items()) == [('Action', 1), ('Comedy', 1),
+                                                          ('Drama', 1)]
+    np.testing.assert_array_equal(taken.mask('Drama'), [False, True, False])
+
+
+def test_sum_by_genre_keeps_genres_without_values():
+    frame = pd.DataFrame({'genres': ['Drama,Action', 'Horror', 'Drama', None],
+                          'gross': [10.0, np.nan, np.nan, 5.0]})
+    totals = GenreIndex.from_series(frame['genres']).sum_by_genre(frame['gross'])
+    expected = _exploded(frame).groupby('genre')['gross'].sum()
+    pd.testing.assert_series_equal(totals.sort_index(), expected, check_names=False,
+                                   check_index_type=False)
+    assert totals['Horror'] == 0.0
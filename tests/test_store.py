@@ -0,0 +1,64 @@
+"""The compact store's accessors answer the same as the stages."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from movie_analysis.store import MovieStore
+
+TABLES = ('bom_movie_gross', 'imdb_title_basics', 'tmdb_movies', 'tn_movie_budgets')
+
+
+@pytest.fixture
+def store(frames):
+    return MovieStore.from_frames({table: frames[table] for table in TABLES})
+
+
+def _by_label(series):
+    series = series.copy()
+    series.index = series.index.astype(object)
+    return series.sort_index()
+
+
+def test_group_sum_and_count_match_stages(store, frames, results):
+    pd.testing.assert_series_equal(
+        _by_label(store.group_sum('bom_movie_gross', 'studio', 'domestic_gross')),
+        _by_label(results['studio_domestic_gross']), check_names=False)
+
+    bom = frames['bom_movie_gross']
+    counts = bom.groupby('studio', observed=True).size()
+    pd.testing.assert_series_equal(_by_label(store.group_count('bom_movie_gross', 'studio')),
+                                   _by_label(counts), check_names=False, check_dtype=False)
+    years = frames['imdb_title_basics'].groupby('start_year').size()
+    np.testing.assert_array_equal(store.group_count('imdb_title_basics', 'start_year'), years)
+
+
+def test_genre_index_matches_stages(store, results):
+    index = store.genre_index('imdb_title_basics')
+    pd.testing.assert_series_equal(_by_label(index.counts()),
+                                   _by_label(results['genre_distribution']), check_names=False)
+    year_count = results['genre_year_count']
+    table = index.crosstab(store.column('imdb_title_basics', 'start_year'))
+    np.testing.assert_array_equal(table.loc[year_count.index, year_count.columns], year_count)
+
+    linked = store.genre_index('imdb_title_basics',
+                               rows=store.link('bom_movie_gross', 'imdb_title_basics'))
+    gross = linked.sum_by_genre(store.tables['bom_movie_gross']['domestic_gross'])
+    pd.testing.assert_series_equal(_by_label(gross), _by_label(results['genre_box_office']),
+                                   check_names=False)
+
+
+def test_frame_decodes_every_table(store, frames):
+    for table in TABLES:
+        decoded, original = store.frame(table), frames[table].reset_index(drop=True)
+        assert list(decoded.columns) == list(original.columns)
+        for column in original.columns:
+            expected = original[column].astype(object)
+            actual = decoded[column].astype(object)
+            if pd.api.types.is_numeric_dtype(original[column]):
+                np.testing.assert_allclose(actual.astype(float), expected.astype(float),
+                                           rtol=1e-6)
+            else:
+                assert list(actual.where(actual.notna(), None)) \
+                    == list(expected.where(expected.notna(), None))
+    assert store.tables['imdb_title_basics']['tconst'].dtype.kind == 'i'
@@ -0,0 +1,27 @@
+"""Chunked rollups equal the in-memory stages."""
+
+import pandas as pd
+import pytest
+
+from movie_analysis.streaming import stream_rollups
+
+
+def _by_label(series):
+    series = series.astype(float)
+    series.index = series.index.astype(object)
+    return series.sort_index()
+
+
+@pytest.mark.parametrize('chunksize', [1_000, 100_000])
+def test_streaming_matches_in_memory(data_dir, results, chunksize):
+    streamed = stream_rollups(data_dir, chunksize=chunksize)
+
+    for name, stage in (('studio_domestic_gross', 'studio_domestic_gross'),
+                        ('revenue_by_year_top_50', 'revenue_by_year_top_50'),
+                        ('genre_distribution', 'genre_distribution'),
+                        ('genre_domestic_gross', 'genre_box_office')):
+        pd.testing.assert_series_equal(_by_label(streamed[name]), _by_label(results[stage]),
+                                       check_names=False, check_index_type=False)
+    pd.testing.assert_frame_equal(streamed['genre_year_count'], results['genre_year_count'],
+                                  check_dtype=False, check_names=False,
+                                  check_index_type=False, check_column_type=False)
@@ -0,0 +1,66 @@
+"""Title normalization, year tolerance and one-partner joins."""
+
+import numpy as np
+import pandas as pd
+
+from movie_analysis.report import prepare_frames
+from movie_analysis.titles import (UNMATCHED, MatchStats, TitleIndex, join_on_ids, link,
+                                   normalize_titles)
+
+
+def test_normalize_titles():
+    titles = pd.Series(['Spider-Man: Far From Home', '  THE  Dark Knight!', None,
+                        'spider man far from home'])
+    assert list(normalize_titles(titles)) == ['spider man far from home', 'the dark knight',
+                                              None, 'spider man far from home']
+
+
+def test_resolve_year_tolerance():
+    index = TitleIndex.build(['Up', 'Up', 'Heat'], [2009, 2015, 1995])
+    ids = index.resolve(['up', 'UP!', 'Up', 'Heat', 'Heat', 'Heat', 'Cars'],
+                        [2009, 2010, 2013, 1996, 1997, None, 2006])
+    up_2009, up_2015, heat = (index.resolve([t], [y])[0]
+                              for t, y in [('Up', 2009), ('Up', 2015), ('Heat', 1995)])
+    # An exact year wins over a neighbouring one; two years off is too far.
+    assert list(ids) == [up_2009, up_2009, UNMATCHED, heat, UNMATCHED, UNMATCHED, UNMATCHED]
+    assert len({up_2009, up_2015, heat}) == 3
+    # Without years a title only matches when the index holds one year for it.
+    assert list(index.resolve(['Heat', 'Up'])) == [heat, UNMATCHED]
+
+
+def test_link_drops_ambiguous_and_unmatched():
+    positions, stats = link([0, 1, 2, UNMATCHED, 0], [1, 0, 1, 5])
+    assert list(positions) == [1, UNMATCHED, UNMATCHED, UNMATCHED, 1]
+    assert stats == MatchStats(matched=2, ambiguous=1, unmatched=2)
+
+
+def test_join_on_ids():
+    left = pd.DataFrame({'movie_id': [0, 1, 2], 'title': ['a', 'b', 'c']})
+    right = pd.DataFrame({'movie_id': [2, 1, 1], 'title': ['C', 'B', 'B2'],
+                          'score': [3.0, 2.0, 2.5]})
+    joined, stats = join_on_ids(left, right)
+    assert stats == MatchStats(matched=1, ambiguous=1, unmatched=1)
+    assert joined.to_dict('list') == {'movie_id': [2], 'title_x': ['c'], 'title_y': ['C'],
+                                      'score': [3.0]}
+
+
+def test_prepare_frames_keeps_films_with_repeated_rows():
+    bom = pd.DataFrame({'title': ['Up', 'Heat'], 'year': [2009, 1995]})
+    imdb = pd.DataFrame({'tconst': ['tt1', 'tt1', 'tt2'], 'primary_title': ['Up', 'Up', 'Heat'],
+                         'start_year': [2009, 2009, 1995], 'genres': ['Drama'] * 3})
+    # 'Up' is listed twice under one id; 'Heat' twice under different ids.
+    tmdb = pd.DataFrame({'id': [7, 7, 8, 9], 'title': ['Up', 'Up', 'Heat', 'Heat'],
+                         'release_date': ['2009-05-29', '2009-05-29', '1995-12-15',
+                                          '1995-12-15']})
+    tn = pd.DataFrame({'movie': ['Up'], 'release_date': ['May 29, 2009']})
+    frames = prepare_frames(bom, imdb, tmdb, tn)
+
+    assert list(frames['tmdb_movies']['id']) == [7, 8, 9]
+    assert list(frames['imdb_title_basics']['tconst']) == ['tt1', 'tt2']
+    joined, stats = join_on_ids(frames['bom_movie_gross'], frames['tmdb_movies'])
+    assert stats == MatchStats(matched=1, ambiguous=1, unmatched=0)
+    assert list(joined['id']) == [7]
+    _, stats = join_on_ids(frames['bom_movie_gross'], frames['imdb_title_basics'])
+    assert stats == MatchStats(matched=2, ambiguous=0, unmatched=0)
+    np.testing.assert_array_equal(frames['tn_movie_budgets']['movie_id'],
+                                  frames['bom_movie_gross']['movie_id'][:1])